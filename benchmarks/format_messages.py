@@ -0,0 +1,161 @@
+"""
+Microbenchmark: building the chat-history prompt with format_recent_messages.
+
+Compares the per-message implementation the bot used before (parses every
+timestamp, looks up the timezone and rebuilds every line on each call) with
+the current one, cold (empty line cache) and warm (every message already
+formatted, as on the next summary of the same chat). Both must produce the
+same prompt.
+
+Usage:
+    python -m benchmarks.format_messages --messages 300 --rounds 200
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import pytz
+
+from bot.utils import format_utils
+from bot.utils.format_utils import format_recent_messages
+
+NAMES = ["Ana", "Luis", "Marta", None, "Pepe", "Lucía", None, "Javi"]
+WORDS = "vale pues mañana quedamos en el bar a las ocho y luego ya vemos qué hacemos".split()
+
+
+def format_recent_messages_before(recent_messages: List[Dict]) -> str:
+    """format_recent_messages as it was before formatted lines were cached."""
+    if not recent_messages:
+        return "No messages to format"
+
+    message_lookup = {}
+    for msg in recent_messages:
+        message_lookup[msg["telegram_message_id"]] = msg
+
+    formatted_messages = []
+    for message in recent_messages:
+        user_name = (
+            message.get("first_name") or
+            message.get("username") or
+            f"User{message.get('user_id', 'Unknown')}"
+        )
+        timestamp_str = ""
+        if message.get("created_at"):
+            try:
+                dt = datetime.fromisoformat(message["created_at"].replace('Z', '+00:00'))
+                madrid_tz = pytz.timezone("Europe/Madrid")
+                dt_madrid = dt.astimezone(madrid_tz)
+                timestamp_str = f"[{dt_madrid.strftime('%H:%M')}] "
+            except Exception:
+                pass
+
+        message_text = message.get("message_text", "")
+        if message.get("telegram_reply_to_message_id"):
+            reply_id = message["telegram_reply_to_message_id"]
+            if reply_id in message_lookup:
+                replied_msg = message_lookup[reply_id]
+                replied_user = (
+                    replied_msg.get("first_name") or
+                    replied_msg.get("username") or
+                    f"User{replied_msg.get('user_id', 'Unknown')}"
+                )
+                replied_text = replied_msg.get("message_text", "")
+                if len(replied_text) > 100:
+                    replied_text = replied_text[:100] + "..."
+                formatted_message = (
+                    f"{timestamp_str}{user_name} "
+                    f"(replying to {replied_user}: \"{replied_text}\"): {message_text}"
+                )
+            else:
+                formatted_message = (
+                    f"{timestamp_str}{user_name} "
+                    f"(replying to message #{reply_id}): {message_text}"
+                )
+        else:
+            formatted_message = f"{timestamp_str}{user_name}: {message_text}"
+        formatted_messages.append(formatted_message)
+
+    total_messages = len(formatted_messages)
+    unique_users = len(set(
+        msg.get("first_name") or msg.get("username") or f"User{msg.get('user_id', 'Unknown')}"
+        for msg in recent_messages
+    ))
+    result = f"=== CONVERSATION CONTEXT ===\n"
+    result += f"Total messages: {total_messages}\n"
+    result += f"Participants: {unique_users}\n"
+    result += f"=== MESSAGES ===\n\n"
+    result += "\n".join(formatted_messages)
+    return result
+
+
+def make_messages(count: int, seed: int = 1) -> List[Dict]:
+    """Rows shaped like db_service.get_recent_messages() results."""
+    rng = random.Random(seed)
+    start = datetime(2024, 5, 1, 8, 0)
+    messages = []
+    for i in range(count):
+        user_id = rng.randrange(len(NAMES))
+        message_id = 1000 + i
+        reply_to = None
+        if i and rng.random() < 0.3:
+            # Mostly recent messages, sometimes one outside the window
+            reply_to = message_id - rng.randint(1, 40)
+        messages.append({
+            "message_text": " ".join(rng.choices(WORDS, k=rng.randint(3, 60))),
+            "telegram_message_id": message_id,
+            "telegram_reply_to_message_id": reply_to,
+            "user_id": user_id,
+            "first_name": NAMES[user_id],
+            "last_name": None,
+            "username": f"user{user_id}" if user_id % 2 else None,
+            "created_at": (start + timedelta(seconds=37 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return messages
+
+
+def _time(function: Callable[[], str], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(name: str, timings: List[float], baseline: float) -> None:
+    ms = sorted(value * 1000 for value in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{name:8s} mean={statistics.mean(ms):7.3f} ms  p50={statistics.median(ms):7.3f} ms  "
+        f"p95={p95:7.3f} ms  speedup x{baseline / statistics.mean(timings):.1f}"
+    )
+
+
+def main(args) -> None:
+    messages = make_messages(args.messages)
+    format_utils.logger.disabled = True
+    if format_recent_messages(messages) != format_recent_messages_before(messages):
+        raise SystemExit("The two implementations produce different prompts")
+
+    print(f"Chat-history prompt of {args.messages} messages, {args.rounds} rounds")
+    before = _time(lambda: format_recent_messages_before(messages), args.rounds)
+    baseline = statistics.mean(before)
+    _report("before", before, baseline)
+
+    def cold() -> str:
+        format_utils._formatted_messages.clear()
+        return format_recent_messages(messages)
+
+    _report("cold", _time(cold, args.rounds), baseline)
+    _report("warm", _time(lambda: format_recent_messages(messages), args.rounds), baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
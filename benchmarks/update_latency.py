@@ -0,0 +1,259 @@
+"""
+Local benchmark: update-to-handler latency with long polling vs webhook.
+
+A fake Bot API server runs on localhost. In polling mode it answers the bot's
+getUpdates long poll as soon as an update is injected; in webhook mode the
+benchmark POSTs the update to PTB's webhook server, the way Telegram does.
+Both modes run the real PTB Application (same builder options as the bot)
+with a handler that records when each update arrives.
+
+--latency-ms adds a one-way network delay to every fake Bot API response and
+to every webhook delivery, to approximate the round trips to Telegram.
+--burst sends several updates at once; with polling, updates that arrive
+while a getUpdates response is in flight wait for the next poll.
+
+Usage:
+    python -m benchmarks.update_latency --updates 200 --burst 5 --latency-ms 40
+
+Webhook mode needs python-telegram-bot[webhooks] (tornado).
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from typing import Dict, List
+
+from aiohttp import ClientSession, web
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder, ContextTypes, TypeHandler
+
+TOKEN = "123456:BENCHMARK"
+SECRET_TOKEN = "benchmark-secret"
+BOT_USER = {
+    "id": 123456,
+    "is_bot": True,
+    "first_name": "Benchmark",
+    "username": "benchmark_bot",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -100, "type": "group", "title": "bench"},
+            "from": {"id": 1, "is_bot": False, "first_name": "User"},
+            "text": f"message {update_id}",
+        },
+    }
+
+
+class FakeBotApi:
+    """Minimal Bot API: getMe, getUpdates (long poll), and True for everything else."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.updates: "asyncio.Queue[dict]" = asyncio.Queue()
+        self.port = _free_port()
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _params(self, request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            params = await self._params(request)
+            result = await self._get_updates(float(params.get("timeout", 0) or 0))
+        else:
+            result = True
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, timeout: float) -> List[dict]:
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=timeout or 0.01)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while not self.updates.empty():
+            batch.append(self.updates.get_nowait())
+        return batch
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    def expect(self, update_id: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[update_id] = future
+        self.sent_at[update_id] = time.perf_counter()
+        return future
+
+    async def handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        received = time.perf_counter()
+        self.latencies.append(received - self.sent_at[update.update_id])
+        future = self._pending.pop(update.update_id, None)
+        if future and not future.done():
+            future.set_result(None)
+
+
+def _build_application(api: FakeBotApi, recorder: LatencyRecorder) -> Application:
+    application = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .base_url(api.base_url)
+        .read_timeout(30)
+        .write_timeout(30)
+        .connect_timeout(30)
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, recorder.handler))
+    return application
+
+
+async def _drive(updates: int, burst: int, send) -> None:
+    """Send `updates` updates in bursts, waiting for each burst to be handled."""
+    update_id = 1
+    while update_id <= updates:
+        batch = list(range(update_id, min(update_id + burst, updates + 1)))
+        update_id += len(batch)
+        await asyncio.wait_for(asyncio.gather(*(send(i) for i in batch)), timeout=30)
+
+
+async def bench_polling(updates: int, burst: int, latency: float) -> List[float]:
+    api = FakeBotApi(latency)
+    recorder = LatencyRecorder()
+    await api.start()
+    application = _build_application(api, recorder)
+    try:
+        await application.initialize()
+        await application.start()
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+
+        async def send(update_id: int):
+            handled = recorder.expect(update_id)
+            await api.updates.put(_make_update(update_id))
+            await handled
+
+        await _drive(updates, burst, send)
+    finally:
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        await api.stop()
+    return recorder.latencies
+
+
+async def bench_webhook(updates: int, burst: int, latency: float) -> List[float]:
+    api = FakeBotApi(latency)
+    recorder = LatencyRecorder()
+    await api.start()
+    application = _build_application(api, recorder)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/telegram"
+    try:
+        await application.initialize()
+        await application.start()
+        await application.updater.start_webhook(
+            listen="127.0.0.1",
+            port=port,
+            url_path="telegram",
+            webhook_url=url,
+            secret_token=SECRET_TOKEN,
+            max_connections=40,
+        )
+
+        async with ClientSession() as session:
+
+            async def send(update_id: int):
+                handled = recorder.expect(update_id)
+                if latency:
+                    await asyncio.sleep(latency)
+                async with session.post(
+                    url,
+                    json=_make_update(update_id),
+                    headers={"X-Telegram-Bot-Api-Secret-Token": SECRET_TOKEN},
+                ) as response:
+                    response.raise_for_status()
+                await handled
+
+            await _drive(updates, burst, send)
+    finally:
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        await api.stop()
+    return recorder.latencies
+
+
+def _report(mode: str, latencies: List[float]) -> None:
+    ms = sorted(value * 1000 for value in latencies)
+    if not ms:
+        print(f"{mode:8s} no updates handled")
+        return
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{mode:8s} n={len(ms):4d}  mean={statistics.mean(ms):7.2f} ms  "
+        f"p50={statistics.median(ms):7.2f} ms  p95={p95:7.2f} ms  max={ms[-1]:7.2f} ms"
+    )
+
+
+async def main(args) -> None:
+    latency = args.latency_ms / 1000
+    print(
+        f"Update-to-handler latency: {args.updates} updates, bursts of {args.burst}, "
+        f"{args.latency_ms} ms simulated one-way network latency"
+    )
+    _report("polling", await bench_polling(args.updates, args.burst, latency))
+    try:
+        import tornado  # noqa: F401
+    except ImportError:
+        print("webhook  skipped: install python-telegram-bot[webhooks]")
+        return
+    _report("webhook", await bench_webhook(args.updates, args.burst, latency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -13,6 +13,10 @@ from bot.commands import (
     summarize_command,
     configure_summary_command,
     export_chat_command,
+    metrics_command,
+    errors_command,
+    scheduler_command,
+    usage_command,
 )
 from bot.handlers import (
     error_handler,
@@ -20,12 +24,22 @@ from bot.handlers import (
 )
 from bot.callbacks import configure_summary_callback
 from bot.utils.logger import logger
+from bot.config import config
 from bot.services.database_service import db_service
 from bot.services.scheduler_service import scheduler_service
 from bot.services.message_service import message_service
+from bot.services.http_service import http_service
+from bot.services.outbound_dispatcher import outbound_dispatcher
+from bot.services.update_processor import ChatOrderedUpdateProcessor
+from bot.services.notification_service import notification_service
+from bot.services.job_service import job_service
+from bot.services.rate_limit_service import rate_limit_service
+from bot.services.usage_service import usage_service
+from bot.utils.executors import shutdown_executors
 from telegram import Update
 from telegram.ext import ContextTypes
 import asyncio
+import signal
 
 
 class TelegramBot:
@@ -45,6 +59,24 @@ class TelegramBot:
             self.application: Optional[Application] = None
             self.initialized = True
 
+    async def _after_startup(self, application: Application):
+        """Called by PTB's post_init, once the bot is initialized."""
+        # The frontend only queues jobs; the worker process runs them
+        workers = 0 if config.PROCESS_ROLE == "frontend" else config.JOB_WORKERS
+        if config.PROCESS_ROLE == "worker":
+            workers = max(1, workers)
+        else:
+            # Only processes that handle updates check limits; post_init runs before the first one
+            await rate_limit_service.start()
+            if config.CHAT_DAILY_TOKEN_BUDGET > 0:
+                await usage_service.refresh_chat_tokens()
+        await job_service.start(application, workers)
+
+    async def _before_shutdown(self, application: Optional[Application] = None):
+        """Called by PTB's post_stop, while the bot can still send messages."""
+        await job_service.stop()
+        await notification_service.close()
+
     async def _custom_cleanup(self, application: Optional[Application] = None):
         """Custom cleanup logic to be called by PTB's post_shutdown."""
         self.logger.info("Executing custom cleanup via PTB post_shutdown...")
@@ -54,6 +86,10 @@ class TelegramBot:
             self.logger.info("Scheduler service stop initiated.")
         else:
             self.logger.info("Scheduler service was not running or already stopped.")
+        # Before closing the database: next run times of jobs that just ran
+        await scheduler_service.flush()
+        await rate_limit_service.flush()
+        await usage_service.flush()
 
         if db_service and not db_service.closed:
             self.logger.info("Closing database service connection...")
@@ -66,6 +102,9 @@ class TelegramBot:
                 )
         else:
             self.logger.info("Database service was already closed or not initialized.")
+
+        await http_service.close()
+        shutdown_executors()
         self.logger.info("Custom cleanup via PTB post_shutdown finished.")
 
     def register_handlers(self):
@@ -83,6 +122,10 @@ class TelegramBot:
             CommandHandler("configurar_resumen", configure_summary_command)
         )
         self.application.add_handler(CommandHandler("export_chat", export_chat_command))
+        self.application.add_handler(CommandHandler("metrics", metrics_command))
+        self.application.add_handler(CommandHandler("errors", errors_command))
+        self.application.add_handler(CommandHandler("scheduler", scheduler_command))
+        self.application.add_handler(CommandHandler("usage", usage_command))
         self.logger.debug("Core command handlers registered")
 
         # Callback handlers
@@ -109,12 +152,81 @@ class TelegramBot:
     async def _start_scheduler(self):
         """Start scheduler in the running event loop"""
         try:
-            await scheduler_service.start()
+            await scheduler_service.start(
+                daily_summaries=config.PROCESS_ROLE != "frontend"
+            )
             self.logger.info("Scheduler started successfully")
         except Exception as e:
             self.logger.error(f"Failed to start scheduler: {e}", exc_info=True)
             raise
 
+    def _build_application(self):
+        self.logger.info("Building Telegram Bot application...")
+        self.application = (
+            ApplicationBuilder()
+            .token(self.token)
+            .read_timeout(30)
+            .write_timeout(30)
+            .connect_timeout(30)
+            .rate_limiter(outbound_dispatcher)
+            .concurrent_updates(
+                ChatOrderedUpdateProcessor(
+                    config.UPDATE_CONCURRENCY, config.HANDLER_CONCURRENCY
+                )
+            )
+            .post_init(self._after_startup)
+            .post_stop(self._before_shutdown)
+            .post_shutdown(self._custom_cleanup)
+            .build()
+        )
+        self.logger.debug(
+            "Application builder configured with timeouts, concurrency and cleanup"
+        )
+
+    def start_worker(self):
+        """Worker role: scheduler, daily summaries and background jobs, no updates.
+
+        Frontend processes hand their work over through the background_job
+        table (leases keep two workers from running the same job), so the
+        worker can be restarted or scaled without touching the frontend.
+        """
+        if not self.initialized:
+            raise RuntimeError("Telegram bot not initialized")
+
+        self.logger.info("=== TELEGRAM BOT WORKER STARTUP STARTED ===")
+        try:
+            self._build_application()
+            message_service.initialize(self.application.bot)
+            asyncio.get_event_loop_policy().get_event_loop().run_until_complete(
+                self._run_worker()
+            )
+            self.logger.info("=== BOT WORKER HAS STOPPED ===")
+        except Exception as e:
+            self.logger.error(f"=== BOT WORKER STARTUP FAILED ===")
+            self.logger.error(f"Failed to start or run worker: {e}", exc_info=True)
+            raise
+
+    async def _run_worker(self):
+        """Same Application lifecycle as polling, without an updater."""
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        await self.application.initialize()
+        try:
+            await self._start_scheduler()
+            await self.application.start()
+            await self._after_startup(self.application)
+            self.logger.info("=== BOT WORKER RUNNING ===")
+            await stop_event.wait()
+            self.logger.info("Stop signal received, shutting down worker...")
+            await self._before_shutdown(self.application)
+            await self.application.stop()
+        finally:
+            await self.application.shutdown()
+            await self._custom_cleanup(self.application)
+
     def start(self):
         if not self.initialized:
             raise RuntimeError("Telegram bot not initialized")
@@ -123,20 +235,7 @@ class TelegramBot:
         self.logger.debug(f"Bot token: {self.token[:10]}...")
 
         try:
-            self.logger.info("Building Telegram Bot application...")
-            self.application = (
-                ApplicationBuilder()
-                .token(self.token)
-                .read_timeout(30)
-                .write_timeout(30)
-                .connect_timeout(30)
-                .post_shutdown(self._custom_cleanup)
-                .build()
-            )
-            self.logger.debug(
-                "Application builder configured with timeouts and cleanup"
-            )
-
+            self._build_application()
             self.register_handlers()
             message_service.initialize(self.application.bot)
             self.logger.debug("Message service initialized")
@@ -153,14 +252,45 @@ class TelegramBot:
                 current_loop.run_until_complete(self._start_scheduler())
                 self.logger.debug("Scheduler started in event loop")
 
-            self.logger.info("=== STARTING BOT POLLING ===")
-            self.application.run_polling()
-            self.logger.info("=== BOT POLLING HAS STOPPED ===")
+            if config.UPDATE_MODE == "webhook":
+                self._run_webhook()
+            else:
+                self.logger.info("=== STARTING BOT POLLING ===")
+                self.application.run_polling()
+                self.logger.info("=== BOT POLLING HAS STOPPED ===")
         except Exception as e:
             self.logger.error(f"=== BOT STARTUP FAILED ===")
             self.logger.error(f"Failed to start or run bot: {e}", exc_info=True)
             raise
 
+    def _run_webhook(self):
+        """Serve updates with PTB's built-in webhook server (blocks like run_polling).
+
+        Startup and shutdown go through the same Application lifecycle as
+        polling, so post_shutdown (_custom_cleanup) runs the same way.
+        """
+        if not config.WEBHOOK_URL:
+            raise ValueError("UPDATE_MODE is 'webhook' but WEBHOOK_URL is not set")
+        if not config.WEBHOOK_SECRET_TOKEN:
+            self.logger.warning(
+                "WEBHOOK_SECRET_TOKEN is not set: anyone who finds the webhook URL can post updates"
+            )
+
+        webhook_url = f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH}"
+        self.logger.info(
+            f"=== STARTING BOT WEBHOOK on {config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}"
+            f"/{config.WEBHOOK_PATH} (max {config.WEBHOOK_MAX_CONNECTIONS} connections) ==="
+        )
+        self.application.run_webhook(
+            listen=config.WEBHOOK_LISTEN,
+            port=config.WEBHOOK_PORT,
+            url_path=config.WEBHOOK_PATH,
+            webhook_url=webhook_url,
+            secret_token=config.WEBHOOK_SECRET_TOKEN,
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+        )
+        self.logger.info("=== BOT WEBHOOK HAS STOPPED ===")
+
     async def stop(self):
         if self.application:
             self.logger.info("TelegramBot.stop() called (programmatic stop)...")
@@ -125,12 +125,13 @@ async def configure_summary_callback(
                             )
                             return
 
-                        scheduler_service.update_daily_summary_job(chat_id, value)
+                        await scheduler_service.schedule_daily_summary_update(chat_id, value)
                         logger.info(
                             f"✅ Successfully updated daily summary schedule for chat {chat_id} to {value}"
                         )  # Verify the job was created/updated and add next run time to confirmation
                         confirm_text_details = ""
-                        if value != "off":
+                        # In the frontend process the worker applies it (no job here to verify)
+                        if value != "off" and scheduler_service.runs_daily_summaries:
                             job_id = f"daily_summary_{chat_id}"
                             job = scheduler_service.scheduler.get_job(job_id)
                             if job:
@@ -3,3 +3,7 @@ from .start_command import *
 from .summarize_command import *
 from .configure_summary_command import configure_summary_command
 from .export_chat_command import export_chat_command
+from .metrics_command import metrics_command
+from .errors_command import errors_command
+from .scheduler_command import scheduler_command
+from .usage_command import usage_command
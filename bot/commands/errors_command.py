@@ -0,0 +1,52 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.utils.decorators import log_command, admin_command
+from bot.services.error_tracker import error_tracker, format_timestamp
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+def format_error_summary(entries) -> str:
+    if not entries:
+        return "✅ No se han registrado errores desde el arranque."
+    lines = ["🐞 Errores recientes (por huella)"]
+    for entry in entries:
+        lines.append(
+            f"\n{entry['fingerprint']} ×{entry['count']} {entry['error_type']}\n"
+            f"  {entry['stage']} · último {format_timestamp(entry['last_seen'])}"
+        )
+    lines.append("\nUsa /errors <huella> para ver el detalle.")
+    return "\n".join(lines)
+
+
+def format_error_event(event) -> str:
+    return "\n".join([
+        f"🐞 {event['fingerprint']} · {event['error_type']}",
+        f"Etapa: {event['stage']}",
+        f"Hora: {format_timestamp(event['timestamp'])}",
+        f"Update: {event['update_id']} · Usuario: {event['user_id']} · Chat: {event['chat_id']}",
+        f"Mensaje: {event['message']}",
+        f"Entrada: {event['payload']!r}",
+        "",
+        event["traceback"],
+    ])
+
+
+@log_command()
+@admin_command()
+async def errors_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """List recent error fingerprints, or show the last event of one (admins only)."""
+    try:
+        if context.args:
+            event = error_tracker.latest_event(context.args[0])
+            if event is None:
+                await update.message.reply_text("No hay eventos recientes con esa huella.")
+                return
+            text = format_error_event(event)
+        else:
+            text = format_error_summary(error_tracker.summary())
+        await update.message.reply_text(text[:4000])
+    except Exception as e:
+        logger.error(f"Error in errors_command: {e}", exc_info=True)
+        await update.message.reply_text("No se pudieron obtener los errores.")
@@ -1,220 +1,185 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+import gzip
 import json
-import tempfile
-import os
+from typing import Dict, Optional, Tuple
 import pytz
 from telegram import Update
 from telegram.ext import ContextTypes
 from bot.utils.decorators import log_command, bot_started
 from bot.services.database_service import db_service
+from bot.services.scratch_service import scratch_service, ScratchQuotaExceeded
+from bot.utils.executors import run_in_thread_pool
 from bot.utils.logger import logger
-from bot.utils.constants import EXPORT_PROGRESS_BATCH_SIZE
+from bot.utils.constants import (
+    EXPORT_PAGE_SIZE,
+    EXPORT_SCRATCH_RESERVE_BYTES,
+    EXPORT_WRITE_WORKERS,
+)
 from bot.constants import USER_ERROR_MESSAGES, COMMAND_MESSAGES
 from bot.utils.admin_notifications import notify_admins_critical, notify_admins_service_error
 
 # Consistent with other commands
 logger = logger.get_logger(__name__)
 
-# Local messages
-LOCAL_MESSAGES = {
-    "NO_MESSAGES": "No hay mensajes para exportar hoy."
-}
+MADRID_TZ = pytz.timezone("Europe/Madrid")
 
-SUCCESS_MESSAGES = {
-    "EXPORT_SUCCESS": "✅ Chat exportado exitosamente.",
-    "FILE_READY": "📄 Archivo de exportación listo."
-}
+EXPORT_FORMAT_JSON = "json"  # One compact JSON document
+EXPORT_FORMAT_NDJSON = "ndjson"  # Header line, one line per message, statistics line
+EXPORT_FORMATS = (EXPORT_FORMAT_JSON, EXPORT_FORMAT_NDJSON)
 
+_COMPACT = {"ensure_ascii": False, "separators": (",", ":")}
 
-def build_conversation_threads(messages):
-    """Build conversation threads by grouping replies together"""
-    threads = {}
-    standalone_messages = []
 
-    # First pass: identify all message IDs
-    all_message_ids = {msg.get("telegram_message_id") for msg in messages}
+class ExportStats:
+    """Participant and time-range statistics built in one pass.
 
-    # Second pass: organize into threads
-    for msg in messages:
-        reply_to = msg.get("telegram_reply_to_message_id")
-        msg_id = msg.get("telegram_message_id")
+    Thread statistics come from the reply graph stored with the messages
+    (see db_service.get_chat_thread_stats).
+    """
 
-        if reply_to and reply_to in all_message_ids:
-            # This is a reply to a message in our dataset
-            if reply_to not in threads:
-                threads[reply_to] = {
-                    "original_message": None,
-                    "replies": []
-                }
-            threads[reply_to]["replies"].append(msg)
-        elif reply_to:
-            # Reply to a message not in our dataset (older message)
-            standalone_messages.append(msg)
-        else:
-            # Original message or standalone
-            if msg_id in threads:
-                threads[msg_id]["original_message"] = msg
-            else:
-                standalone_messages.append(msg)
-
-    return threads, standalone_messages
-
-
-def format_for_ai_analysis(messages, chat_id, export_time):
-    """Format messages in an AI-friendly structure for analysis"""
-    madrid_tz = pytz.timezone("Europe/Madrid")
-
-    # Basic statistics
-    total_messages = len(messages)
-    users = {}
-    time_range = {"start": None, "end": None}
-
-    # Collect user stats and time range
-    for msg in messages:
-        user_id = msg.get("user_id")
-        username = msg.get("username") or msg.get("first_name") or str(user_id)
-
-        if user_id not in users:
-            users[user_id] = {
-                "name": username,
-                "message_count": 0,
-                "first_message_time": None,
-                "last_message_time": None
-            }
-
-        users[user_id]["message_count"] += 1
-
-        # Parse timestamp
-        try:
-            created_utc = datetime.fromisoformat(msg["created_at"]).replace(tzinfo=pytz.UTC)
-            created_madrid = created_utc.astimezone(madrid_tz)
+    def __init__(self):
+        self.total_messages = 0
+        self.users: Dict[int, Dict] = {}
+        self.start: Optional[datetime] = None
+        self.end: Optional[datetime] = None
+        self.threads = 0
+        self.thread_replies = 0
+        self.largest_thread = 0  # Messages, including the one that started it
 
-            if users[user_id]["first_message_time"] is None:
-                users[user_id]["first_message_time"] = created_madrid
-            users[user_id]["last_message_time"] = created_madrid
+    def add(self, msg: Dict, user_name: str, created: Optional[datetime]) -> None:
+        self.total_messages += 1
+        user = self.users.get(msg["user_id"])
+        if user is None:
+            user = self.users[msg["user_id"]] = {"name": user_name, "message_count": 0}
+        user["message_count"] += 1
 
-            if time_range["start"] is None or created_madrid < time_range["start"]:
-                time_range["start"] = created_madrid
-            if time_range["end"] is None or created_madrid > time_range["end"]:
-                time_range["end"] = created_madrid
+        if created is not None:
+            if self.start is None or created < self.start:
+                self.start = created
+            if self.end is None or created > self.end:
+                self.end = created
 
-        except Exception:
-            continue
+    @property
+    def duration_hours(self) -> float:
+        if self.start is None or self.end is None:
+            return 0
+        return (self.end - self.start).total_seconds() / 3600
 
-    # Build conversation threads
-    threads, standalone_messages = build_conversation_threads(messages)
-
-    # Format for AI analysis
-    conversation_data = {
-        "metadata": {
+    def metadata(self, chat_id: int, export_time: datetime) -> Dict:
+        return {
             "chat_id": chat_id,
             "export_date": export_time.strftime("%Y-%m-%d"),
-            "total_messages": total_messages,
-            "unique_participants": len(users),
+            "total_messages": self.total_messages,
+            "unique_participants": len(self.users),
             "time_range": {
-                "start": time_range["start"].strftime("%Y-%m-%d %H:%M") if time_range["start"] else None,
-                "end": time_range["end"].strftime("%Y-%m-%d %H:%M") if time_range["end"] else None,
-                "duration_hours": (time_range["end"] - time_range["start"]).total_seconds() / 3600 if time_range["start"] and time_range["end"] else 0
+                "start": self.start.strftime("%Y-%m-%d %H:%M") if self.start else None,
+                "end": self.end.strftime("%Y-%m-%d %H:%M") if self.end else None,
+                "duration_hours": self.duration_hours,
             },
             "participants": [
                 {
-                    "name": user_data["name"],
-                    "message_count": user_data["message_count"],
-                    "participation_percentage": round((user_data["message_count"] / total_messages) * 100, 1)
+                    "name": user["name"],
+                    "message_count": user["message_count"],
+                    "participation_percentage": round((user["message_count"] / self.total_messages) * 100, 1)
                 }
-                for user_data in users.values()
-            ]
-        },
-
-        "conversation_flow": [],
+                for user in self.users.values()
+            ],
+            "threads": {
+                "count": self.threads,
+                "replies": self.thread_replies,
+                "largest_thread_messages": self.largest_thread,
+            },
+        }
 
-        "raw_chronological_transcript": "",
 
-        "conversation_threads": []
+def export_entry(msg: Dict) -> Tuple[Dict, str, Optional[datetime]]:
+    """conversation_flow entry of a message, with its author name and Madrid time."""
+    user_name = msg.get("username") or msg.get("first_name") or str(msg.get("user_id"))
+    try:
+        created = datetime.fromisoformat(msg["created_at"]).replace(tzinfo=pytz.UTC).astimezone(MADRID_TZ)
+    except Exception:
+        created = None
+    reply_to = msg.get("telegram_reply_to_message_id")
+    entry = {
+        "id": msg["telegram_message_id"],
+        "date": created.strftime("%Y-%m-%d") if created else None,
+        "timestamp": created.strftime("%H:%M") if created else None,
+        "user": user_name,
+        "message": msg.get("message_text", ""),
+        "is_reply": bool(reply_to),
+        "reply_to_id": reply_to,
+        "thread_root_id": msg.get("thread_root_id"),
+        "thread_depth": msg.get("thread_depth")
     }
+    return entry, user_name, created
+
+
+async def write_export(path: str, chat_id: int, export_time: datetime, export_format: str) -> ExportStats:
+    """Stream every message of a chat into a gzip file, one page at a time.
+
+    Pages are read with keyset pagination on (telegram_message_id, id);
+    compression and disk writes run in a thread pool. Statistics go at the
+    end of the file since they are only known once every page is read.
+    """
+    stats = ExportStats()
+    header = {
+        "chat_id": chat_id,
+        "export_type": "full_chat_history",
+        "export_timestamp": export_time.strftime("%Y-%m-%d %H:%M"),
+        "note": "Contains all available messages in database (auto-cleaned by scheduler)",
+    }
+    ndjson = export_format == EXPORT_FORMAT_NDJSON
 
-    # Build chronological conversation flow
-    sorted_messages = sorted(messages, key=lambda x: x.get("telegram_message_id", 0))
-
-    transcript_lines = []
-    for msg in sorted_messages:
-        try:
-            created_utc = datetime.fromisoformat(msg["created_at"]).replace(tzinfo=pytz.UTC)
-            created_madrid = created_utc.astimezone(madrid_tz)
-            timestamp = created_madrid.strftime("%H:%M")
-
-            username = msg.get("username") or msg.get("first_name") or str(msg.get("user_id"))
-            text = msg.get("message_text", "")
-            reply_to = msg.get("telegram_reply_to_message_id")
-
-            # Add to conversation flow
-            conversation_data["conversation_flow"].append({
-                "timestamp": timestamp,
-                "user": username,
-                "message": text,
-                "is_reply": bool(reply_to),
-                "reply_to_id": reply_to
-            })
-
-            # Add to transcript
-            if reply_to:
-                transcript_lines.append(f"[{timestamp}] {username} (replying): {text}")
-            else:
-                transcript_lines.append(f"[{timestamp}] {username}: {text}")
-
-        except Exception:
-            continue
-
-    conversation_data["raw_chronological_transcript"] = "\n".join(transcript_lines)
-
-    # Build conversation threads for analysis
-    for original_msg_id, thread_data in threads.items():
-        original_msg = thread_data["original_message"]
-        if original_msg:
-            try:
-                original_created = datetime.fromisoformat(original_msg["created_at"]).replace(tzinfo=pytz.UTC).astimezone(madrid_tz)
-                original_user = original_msg.get("username") or original_msg.get("first_name") or str(original_msg.get("user_id"))
-
-                thread_info = {
-                    "thread_starter": {
-                        "user": original_user,
-                        "timestamp": original_created.strftime("%H:%M"),
-                        "message": original_msg.get("message_text", "")
-                    },
-                    "replies": [],
-                    "participants": set([original_user]),
-                    "message_count": 1 + len(thread_data["replies"])
-                }
-
-                for reply in sorted(thread_data["replies"], key=lambda x: x.get("telegram_message_id", 0)):
-                    try:
-                        reply_created = datetime.fromisoformat(reply["created_at"]).replace(tzinfo=pytz.UTC).astimezone(madrid_tz)
-                        reply_user = reply.get("username") or reply.get("first_name") or str(reply.get("user_id"))
-
-                        thread_info["replies"].append({
-                            "user": reply_user,
-                            "timestamp": reply_created.strftime("%H:%M"),
-                            "message": reply.get("message_text", "")
-                        })
-                        thread_info["participants"].add(reply_user)
-                    except Exception:
-                        continue
-
-                thread_info["participants"] = list(thread_info["participants"])
-                thread_info["unique_participants"] = len(thread_info["participants"])
-
-                conversation_data["conversation_threads"].append(thread_info)
+    def write(out, text: str) -> None:
+        out.write(text.encode("utf-8"))
 
-            except Exception:
-                continue
+    async def write_off_loop(out, text: str) -> None:
+        await run_in_thread_pool("export_writer", EXPORT_WRITE_WORKERS, write, out, text)
 
-    return conversation_data
+    out = gzip.open(path, "wb")
+    try:
+        if ndjson:
+            await write_off_loop(out, json.dumps({"type": "export", **header}, **_COMPACT) + "\n")
+        else:
+            await write_off_loop(out, json.dumps(header, **_COMPACT)[:-1] + ',"conversation_flow":[')
+
+        after = None
+        while True:
+            page = await db_service.get_chat_messages_page(chat_id, after, EXPORT_PAGE_SIZE)
+            if not page:
+                break
+            lines = []
+            for msg in page:
+                entry, user_name, created = export_entry(msg)
+                if ndjson:
+                    lines.append(json.dumps({"type": "message", **entry}, **_COMPACT) + "\n")
+                else:
+                    lines.append(("," if stats.total_messages else "") + json.dumps(entry, **_COMPACT))
+                stats.add(msg, user_name, created)
+            await write_off_loop(out, "".join(lines))
+            after = (page[-1]["telegram_message_id"], page[-1]["id"])
+            logger.debug(f"Exported {stats.total_messages} messages of chat {chat_id}")
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+
+        thread_stats = await db_service.get_chat_thread_stats(chat_id)
+        stats.threads = thread_stats["threads"]
+        stats.thread_replies = thread_stats["replies"]
+        stats.largest_thread = thread_stats["largest_thread_messages"]
+        metadata = stats.metadata(chat_id, export_time)
+        if ndjson:
+            await write_off_loop(out, json.dumps({"type": "metadata", **metadata}, **_COMPACT) + "\n")
+        else:
+            await write_off_loop(out, '],"metadata":' + json.dumps(metadata, **_COMPACT) + "}")
+    finally:
+        await run_in_thread_pool("export_writer", EXPORT_WRITE_WORKERS, out.close)
+    return stats
 
 
 @log_command()
 @bot_started()
 async def export_chat_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Export ALL available messages for this chat in an AI-optimized JSON format"""
+    """Export ALL available messages for this chat as gzipped JSON (or NDJSON with /export_chat ndjson)"""
     chat_id = update.effective_chat.id
     user = update.effective_user
 
@@ -222,104 +187,73 @@ async def export_chat_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.debug(f"Chat ID: {chat_id}, User ID: {user.id}")
     logger.debug(f"User: {user.first_name} {user.last_name} (@{user.username})")
 
-    try:
-        madrid_tz = pytz.timezone("Europe/Madrid")
-        export_time = datetime.now(madrid_tz)
-
-        logger.debug("Fetching ALL available messages for this chat...")
-
-        # Get ALL messages for this chat (no date restrictions)
-        # Use a high limit to get everything available
-        messages = await db_service.get_recent_messages(chat_id, limit=10000)
-        logger.debug(f"Total messages found: {len(messages)}")
-
-        if not messages:
-            logger.info(f"No messages found for export - Chat: {chat_id}")
-            await update.message.reply_text(
-                f"{ERROR_MESSAGES['NO_MESSAGES']}\n\n"
-                f"🔍 *No hay mensajes en este chat para exportar.*",
-                parse_mode="Markdown"
-            )
-            return
-
-        logger.debug(f"Found {len(messages)} messages for export")
-        logger.debug("Processing ALL messages for AI analysis format...")
-
-        # Format messages for AI analysis
-        conversation_data = format_for_ai_analysis(messages, chat_id, export_time)
-
-        # Update metadata to reflect that this is a full export
-        conversation_data["metadata"]["export_type"] = "full_chat_history"
-        conversation_data["metadata"]["export_timestamp"] = export_time.strftime("%Y-%m-%d %H:%M")
-        conversation_data["metadata"]["note"] = "Contains all available messages in database (auto-cleaned by scheduler)"
+    export_format = context.args[0].lower() if context.args else EXPORT_FORMAT_JSON
+    if export_format not in EXPORT_FORMATS:
+        await update.message.reply_text(
+            f"{COMMAND_MESSAGES['EXPORT']['FORMAT_ERROR']}\nUso: /export_chat [json|ndjson]"
+        )
+        return
 
-        logger.debug(f"Processed conversation data: {len(conversation_data['conversation_flow'])} messages, {len(conversation_data['conversation_threads'])} threads")
-
-        # Create temporary file for export
-        try:
-            with tempfile.NamedTemporaryFile("w+", delete=False, suffix=".json", encoding='utf-8') as tmp:
-                json.dump(conversation_data, tmp, ensure_ascii=False, indent=2)
-                tmp_path = tmp.name
-
-            logger.debug(f"Temporary file created: {tmp_path}")
-
-        except Exception as file_error:
-            logger.error(f"Error creating temporary file: {file_error}", exc_info=True)
-            await update.message.reply_text(USER_ERROR_MESSAGES["FILE_ERROR"])
-            await notify_admins_service_error(
-                context, "Export File Creation", str(file_error), 
-                update.effective_user.id, update.effective_chat.id
-            )
-            return
-
-        # Send the document
-        try:
-            logger.debug("Sending document to user...")
-            with open(tmp_path, "rb") as doc:
-                # Generate filename with timestamp
-                filename = f"chat_full_export_{export_time.strftime('%Y%m%d_%H%M')}.json"
-
-                participants_count = conversation_data["metadata"]["unique_participants"]
-                threads_count = len(conversation_data["conversation_threads"])
-                duration = conversation_data["metadata"]["time_range"]["duration_hours"]
-
-                caption = (
-                    f"🧠 **Exportación completa del chat**\n"
-                    f"• {len(messages)} mensajes totales\n"
-                    f"• {participants_count} participantes\n"
-                    f"• {threads_count} hilos de conversación\n"
-                    f"• {duration:.1f} horas de conversación\n\n"
-                    f"📋 *Todo el historial disponible - Optimizado para IA*"
-                )
+    try:
+        export_time = datetime.now(MADRID_TZ)
+        filename = f"chat_full_export_{export_time.strftime('%Y%m%d_%H%M')}.{export_format}.gz"
 
-                await context.bot.send_document(
-                    chat_id=chat_id,
-                    document=doc,
-                    filename=filename,
-                    caption=caption,
-                    parse_mode="Markdown"
+        async with scratch_service.job(EXPORT_SCRATCH_RESERVE_BYTES, "export") as job:
+            path = job.file(filename)
+            try:
+                stats = await write_export(path, chat_id, export_time, export_format)
+            except Exception as file_error:
+                logger.error(f"Error writing export file: {file_error}", exc_info=True)
+                await update.message.reply_text(USER_ERROR_MESSAGES["FILE_ERROR"])
+                await notify_admins_service_error(
+                    context, "Export File Creation", str(file_error),
+                    update.effective_user.id, update.effective_chat.id
                 )
+                return
 
-            logger.info(f"=== EXPORT CHAT COMMAND COMPLETED for user {user.id} in chat {chat_id} ===")
-            logger.info(f"Exported {len(messages)} total messages in AI-optimized format")
+            if not stats.total_messages:
+                logger.info(f"No messages found for export - Chat: {chat_id}")
+                await update.message.reply_text(COMMAND_MESSAGES["EXPORT"]["NO_MESSAGES"])
+                return
 
-        except Exception as send_error:
-            logger.error(f"Error sending document: {send_error}", exc_info=True)
-            await update.message.reply_text(USER_ERROR_MESSAGES["FILE_ERROR"])
-            await notify_admins_service_error(
-                context, "Export File Send", str(send_error),
-                update.effective_user.id, update.effective_chat.id
-            )
-            return
-        finally:
-            # Clean up temporary file
+            # Send the document
             try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-                    logger.debug(f"Temporary file cleaned up: {tmp_path}")
-            except Exception as cleanup_error:
-                logger.warning(f"Error cleaning up temporary file: {cleanup_error}")
+                logger.debug("Sending document to user...")
+                with open(path, "rb") as doc:
+                    caption = (
+                        f"🧠 **Exportación completa del chat**\n"
+                        f"• {stats.total_messages} mensajes totales\n"
+                        f"• {len(stats.users)} participantes\n"
+                        f"• {stats.threads} hilos de conversación\n"
+                        f"• {stats.duration_hours:.1f} horas de conversación\n\n"
+                        f"📋 *Todo el historial disponible - Optimizado para IA*"
+                    )
+
+                    await context.bot.send_document(
+                        chat_id=chat_id,
+                        document=doc,
+                        filename=filename,
+                        caption=caption,
+                        parse_mode="Markdown"
+                    )
+
+                logger.info(f"=== EXPORT CHAT COMMAND COMPLETED for user {user.id} in chat {chat_id} ===")
+                logger.info(f"Exported {stats.total_messages} total messages as {export_format}")
+
+            except Exception as send_error:
+                logger.error(f"Error sending document: {send_error}", exc_info=True)
+                await update.message.reply_text(USER_ERROR_MESSAGES["FILE_ERROR"])
+                await notify_admins_service_error(
+                    context, "Export File Send", str(send_error),
+                    update.effective_user.id, update.effective_chat.id
+                )
+                return
 
+    except ScratchQuotaExceeded as e:
+        logger.warning(f"Export job rejected: {e}")
+        await update.message.reply_text(
+            "Ahora mismo estoy procesando demasiados archivos. Inténtalo de nuevo en unos minutos."
+        )
     except Exception as e:
         logger.error(f"=== EXPORT CHAT COMMAND FAILED ===")
         logger.error(f"Error in export_chat_command for user {user.id}: {e}", exc_info=True)
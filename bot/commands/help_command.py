@@ -24,12 +24,14 @@ HELP_MESSAGE = (
     "• `/help` - Si eres tan corto que necesitas ayuda, aquí tienes esta parrafada. ¡Léetela!\n"
     "• `/summarize` - El puto amo de los comandos. Te resume lo que sea. ¡Pídele y calla!\n"
     "• `/configurar_resumen` - Personaliza el tono, longitud, idioma y programa resúmenes diarios. ¡Ponlo a tu gusto!\n"
-    "• `/export_chat` - Te exporto TODO el historial disponible del chat en formato JSON optimizado para IA. Perfecto para analizar debates largos.\n\n"
+    "• `/export_chat` - Te exporto TODO el historial disponible del chat en formato JSON comprimido optimizado para IA (`/export_chat ndjson` para un mensaje por línea). Perfecto para analizar debates largos.\n\n"
     "🔹 **Cómo usar `/summarize` sin parecer un paquete:**\n"
     "• **Resumir el chat como un vago (Operación Simple):**\n"
     "  Tira un `/summarize` y déjalo que se curre los últimos mensajes del chat (hasta 300). ¡Menos leer para ti, fenómeno!\n\n"
     "• **Resumir UN puto mensaje (Simple o Avanzado, según le dé):**\n"
     "  Responde a un mensaje con `/summarize`. No es física cuántica, ¿verdad? El bot se encarga, tú solo espera.\n\n"
+    "• **Resumir un hilo entero (Operación Simple):**\n"
+    "  Responde a cualquier mensaje del hilo con `/summarize hilo` y te resumo toda la discusión, respuestas a respuestas incluidas.\n\n"
     "🔹 **Qué mierdas resume este cacharro (y ojo con los límites, que no soy tu esclavo):**\n\n"
     "  **Operaciones SIMPLES (para gente con prisa y poco presupuesto):**\n"
     "  ⏱️ **¡Quieto parao 2 MINUTOS!** No me seas ansias entre usos.\n"
@@ -0,0 +1,46 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.config import config
+from bot.utils.decorators import log_command, admin_command
+from bot.services.database_service import db_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+def _format_value(key: str, value) -> str:
+    if "bytes" in key and isinstance(value, (int, float)):
+        return f"{value / 1024 / 1024:.1f} MB"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def format_metrics(snapshot) -> str:
+    lines = [f"📊 Métricas del bot · proceso {config.PROCESS_ROLE}"]
+    if config.PROCESS_ROLE == "frontend":
+        lines.append(
+            "El scheduler, los resúmenes diarios y los trabajos en segundo plano corren en "
+            "el proceso worker: sus métricas salen en su log con cada latido del scheduler. "
+            "La sección [background_job] se lee de la base de datos compartida."
+        )
+    for section, values in snapshot.items():
+        lines.append(f"\n[{section}]")
+        for key, value in values.items():
+            lines.append(f"{key}: {_format_value(key, value)}")
+    return "\n".join(lines)
+
+
+@log_command()
+@admin_command()
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show this process's metrics plus the job queue totals from the database (admins only)."""
+    try:
+        snapshot = metrics_service.snapshot()
+        # Shared by every process, unlike the in-process sources
+        snapshot["background_job"] = await db_service.get_job_counts() or {"jobs": 0}
+        await update.message.reply_text(format_metrics(snapshot))
+    except Exception as e:
+        logger.error(f"Error in metrics_command: {e}", exc_info=True)
+        await update.message.reply_text("No se pudieron obtener las métricas.")
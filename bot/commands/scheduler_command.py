@@ -0,0 +1,57 @@
+import pytz
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.config import config
+from bot.utils.decorators import log_command, admin_command
+from bot.services.scheduler_service import scheduler_service
+from bot.utils.constants import SCHEDULER_UPCOMING_RUNS_SHOWN, SCHEDULER_LOAD_FORECAST_HOURS
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+def format_schedule(upcoming, load) -> str:
+    madrid_tz = pytz.timezone("Europe/Madrid")
+    lines = [f"🗓️ Próximas ejecuciones (hora de Madrid) · proceso {config.PROCESS_ROLE}"]
+    if not scheduler_service.runs_daily_summaries:
+        lines.append(
+            "Los resúmenes diarios los programa el proceso worker; se leen de la base de datos."
+        )
+    for run in upcoming:
+        lines.append(f"{run['next_run'].astimezone(madrid_tz):%d/%m %H:%M} · {run['name']}")
+    if not upcoming:
+        lines.append("No hay ejecuciones programadas.")
+
+    lines.append(f"\n📈 Carga prevista por hora (próximas {SCHEDULER_LOAD_FORECAST_HOURS} h)")
+    for entry in load:
+        text = (
+            f"{entry['hour']:%d/%m %H}:00 · {entry['jobs']} "
+            + ("resumen" if entry["jobs"] == 1 else "resúmenes")
+        )
+        if entry["busy_minutes"] is not None:
+            text += (
+                f" · ~{entry['busy_minutes']:.1f} min con "
+                f"{config.DAILY_SUMMARY_CONCURRENCY} a la vez"
+            )
+        lines.append(text)
+    if not load:
+        lines.append("No hay resúmenes diarios en ese periodo.")
+    elif load[0]["busy_minutes"] is None and not scheduler_service.runs_daily_summaries:
+        lines.append("La duración estimada solo la conoce el proceso worker (ver sus logs).")
+    return "\n".join(lines)
+
+
+@log_command()
+@admin_command()
+async def scheduler_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """List upcoming scheduled runs and the expected load per hour (admins only)."""
+    try:
+        runs = await scheduler_service.get_runs()
+        text = format_schedule(
+            runs[:SCHEDULER_UPCOMING_RUNS_SHOWN],
+            scheduler_service.get_hourly_load(runs, SCHEDULER_LOAD_FORECAST_HOURS),
+        )
+        await update.message.reply_text(text[:4000])
+    except Exception as e:
+        logger.error(f"Error in scheduler_command: {e}", exc_info=True)
+        await update.message.reply_text("No se pudo obtener la programación.")
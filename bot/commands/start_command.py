@@ -1,5 +1,6 @@
 from telegram import Update
 from bot.services import db_service
+from bot.services.rate_limit_service import rate_limit_service
 from bot.utils.decorators import log_command
 from bot.utils.logger import logger
 from telegram.ext import ContextTypes
@@ -39,6 +40,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.debug("Updating chat state...")
         # Update chat state
         await db_service.update_chat_state(chat_id, {"is_bot_started": True})
+        rate_limit_service.mark_chat_started(chat_id)
         logger.debug("Chat state updated: is_bot_started = True")
 
         # Auto-enable daily summaries for group chats
@@ -62,7 +64,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         # Update scheduler
                         try:
                             from bot.services.scheduler_service import scheduler_service
-                            scheduler_service.update_daily_summary_job(chat_id, '03')
+                            await scheduler_service.schedule_daily_summary_update(chat_id, '03')
                             logger.info(f"Scheduler job added for chat {chat_id} at 03:00")
                         except Exception as scheduler_error:
                             logger.error(f"Failed to add scheduler job for chat {chat_id}: {scheduler_error}")
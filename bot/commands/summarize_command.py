@@ -1,28 +1,36 @@
 # bot/commands/summarize_command.py
-from telegram.ext import CallbackContext
-from telegram import Update
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+from telegram.ext import Application, CallbackContext
+from telegram import Message, Update
 from bot.utils.decorators import (
     log_command,
     bot_started,
 )
-from bot.utils.format_utils import format_recent_messages, send_long_message
+from bot.utils.format_utils import format_recent_messages, append_model_info
+from bot.utils.progress_reporter import ProgressReporter
 from bot.utils.logger import logger
 from bot.utils.get_message_type import get_message_type
 from bot.utils.constants import (
-    YOUTUBE_REGEX, ARTICLE_URL_REGEX, MAX_RECENT_MESSAGES,
-    COOLDOWN_TEXT_SIMPLE_SECONDS, COOLDOWN_ADVANCED_SECONDS,
+    YOUTUBE_REGEX, ARTICLE_URL_REGEX, MAX_RECENT_MESSAGES, MIN_THREAD_MESSAGES,
     DAILY_LIMIT_ADVANCED_OPS, OPERATION_TYPE_TEXT_SIMPLE, OPERATION_TYPE_ADVANCED,
-    MSG_DAILY_LIMIT_REACHED, MSG_COOLDOWN_ACTIVE, get_button_label
+    MSG_DAILY_LIMIT_REACHED, MSG_COOLDOWN_ACTIVE, MSG_CHAT_BUDGET_REACHED, get_button_label
 )
-from bot.constants import USER_ERROR_MESSAGES, COMMAND_MESSAGES
+from bot.constants import USER_ERROR_MESSAGES, COMMAND_MESSAGES, PROGRESS_MESSAGES
 from bot.services import db_service, openai_service
-from bot.handlers.youtube_handler import youtube_handler
+from bot.services.http_service import normalize_url
+from bot.services.job_service import job_service, is_last_attempt
+from bot.services.rate_limit_service import rate_limit_service, RATE_LIMIT_DAILY
+from bot.services.usage_service import usage_service, usage_scope
+from bot.utils.cache_utils import SingleFlight
+from bot.config import config
+from bot.handlers.youtube_handler import youtube_handler, extract_video_id
 from bot.handlers.video_handler import video_handler
 from bot.handlers.audio_handler import audio_handler
 from bot.handlers.article_handler import article_handler
-from bot.handlers.document_handler import document_handler
-import asyncio
-from datetime import datetime,  date
+from bot.handlers.document_handler import document_handler, truncation_notice
+from datetime import datetime
 
 from bot.utils.admin_notifications import (
     notify_admins_critical, 
@@ -38,59 +46,333 @@ LOCAL_MESSAGES = {
     "PROCESSING_FAILED": "No pude procesar este tipo de contenido."
 }
 
-PROGRESS_MESSAGES = {
-    "ANALYZING": "🔍 Analizando el contenido...",
-    "DOWNLOADING": "⬇️ Descargando contenido...",
-    "PROCESSING": "⚙️ Procesando datos...",
-    "TRANSCRIBING": "🎯 Transcribiendo audio...",
-    "SUMMARIZING": "🤖 Generando resumen...",
-    "FETCHING_MESSAGES": "📚 Recopilando mensajes recientes...",
-    "FORMATTING": "📝 Dando formato al resumen...",
-    "FINALIZING": "✨ Finalizando...",
-}
-
 logger = logger.get_logger(__name__)
 
-async def update_progress(message, text: str, delay: float = 0.5) -> None:
-    """Update progress message with new status"""
+
+async def deliver_summary(progress: ProgressReporter, text: str) -> None:
+    """Replace the wait message with the summary."""
+    if not await progress.finish(text):
+        raise RuntimeError("Could not deliver summary")
+
+
+SUPPORTED_REPLY_TYPES = ("text", "voice", "audio", "video", "video_note", "document")
+
+# "/summarize hilo" in reply to any message summarizes the whole thread it belongs to
+THREAD_SUMMARY_ARG = "hilo"
+
+# Advanced reply summaries (media, documents, links) run as durable background jobs
+SUMMARIZE_REPLY_JOB = "summarize_reply"
+
+# Requests for the same content and config that overlap in time share one pipeline run
+_summary_flights = SingleFlight()
+# flight key -> reporter of the request that started the run (followers mirror its stages)
+_flight_leaders: Dict[Hashable, ProgressReporter] = {}
+
+
+class SummaryUnavailable(Exception):
+    """The content cannot be summarized; carries the message shown to the user."""
+
+    def __init__(self, user_message: str):
+        super().__init__(user_message)
+        self.user_message = user_message
+
+
+def config_fingerprint(summary_config: Dict) -> str:
+    """Stable short hash of a summary configuration."""
+    encoded = json.dumps(summary_config, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def content_identity(reply_msg: Message, message_type: str) -> Tuple:
+    """Identity of the content a reply points to, independent of chat and message.
+
+    Files use file_unique_id (the same across forwards and chats), links use
+    the video id or the normalized URL, and plain text the message itself.
+    """
+    if message_type == "text":
+        text = reply_msg.text or ""
+        if YOUTUBE_REGEX.search(text):
+            video_id = extract_video_id(text)
+            if video_id:
+                return ("youtube", video_id)
+        url_match = ARTICLE_URL_REGEX.search(text)
+        if url_match:
+            return ("url", normalize_url(url_match.group(0)))
+        return ("message", reply_msg.chat_id, reply_msg.message_id)
+
+    media = {
+        "voice": reply_msg.voice,
+        "audio": reply_msg.audio,
+        "video": reply_msg.video,
+        "video_note": reply_msg.video_note,
+        "document": reply_msg.document,
+    }.get(message_type)
+    return (message_type, media.file_unique_id)
+
+
+async def run_shared_pipeline(
+    key: Hashable,
+    progress: ProgressReporter,
+    pipeline: Callable[[ProgressReporter], Awaitable[str]],
+) -> str:
+    """Run pipeline once per key; concurrent callers wait for the same result.
+
+    The first caller's reporter drives the pipeline; later callers follow
+    its stages in their own wait message. The result ends with the model
+    that generated it, and the LLM usage is charged to the first caller's
+    usage scope.
+    """
+    leader = _flight_leaders.get(key) if _summary_flights.is_running(key) else None
+    if leader is not None:
+        logger.info(f"Joining in-flight summary for {key}")
+        leader.add_follower(progress)
+    else:
+        _flight_leaders[key] = progress
+    async def run_pipeline() -> str:
+        # Inside the flight, whose usage scope knows the model that answered
+        return append_model_info(await pipeline(progress))
+
+    try:
+        return await _summary_flights.run(key, run_pipeline)
+    finally:
+        if _flight_leaders.get(key) is progress:
+            del _flight_leaders[key]
+
+
+def _with_tone(summary: str, summary_config: Dict) -> str:
+    # Obtener el nombre del tono en el idioma correcto
+    tone_key = summary_config.get("tone", "neutral")
+    lang_key = summary_config.get("language", "es")
+    tone_name = get_button_label("tone", tone_key, lang_key)
+    return f"🧠 *Tono: {tone_name}*\n\n{summary}"
+
+
+async def _summarize_chat_history(
+    recent_messages: List[Dict], chat_config: Dict, progress: ProgressReporter
+) -> str:
+    progress.stage("FORMATTING")
+    formatted_messages = format_recent_messages(recent_messages)
+    logger.debug(f"Formatted messages length: {len(formatted_messages)} chars")
+
+    progress.stage("SUMMARIZING")
     try:
-        await asyncio.sleep(delay)  # Add small delay for better UX
-        await message.edit_text(f"{text}")
+        logger.info("Calling OpenAI service for chat summary")
+        summary = await openai_service.get_summary(
+            content=formatted_messages,
+            summary_type="chat",
+            summary_config=chat_config
+        )
+        logger.debug(f"Summary generated, length: {len(summary)} chars")
+    except ValueError as e:
+        logger.error(f"ValueError in summary generation: {e}")
+        # Handle unsupported language
+        if "is not supported" in str(e):
+            raise SummaryUnavailable(COMMAND_MESSAGES["SUMMARIZE"]["LANGUAGE_ERROR"])
+        raise SummaryUnavailable(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
+    except Exception as e:
+        logger.error(f"Unexpected error in summary generation: {e}", exc_info=True)
+        raise SummaryUnavailable(USER_ERROR_MESSAGES["GENERAL_ERROR"])
+
+    # Prepend the tone to the summary
+    return _with_tone(summary, chat_config)
+
+
+async def _summarize_reply(
+    update: Update,
+    context: CallbackContext,
+    reply_msg: Message,
+    message_type: str,
+    reply_config: Dict,
+    progress: ProgressReporter,
+) -> str:
+    content_for_summary = None
+    summary_type = None
+
+    match message_type:
+        case "text":
+            logger.debug("Processing text reply message")
+            progress.stage("ANALYZING")
+            text = reply_msg.text or ""
+            logger.debug(f"Text content length: {len(text)}")
+
+            if YOUTUBE_REGEX.search(text):
+                logger.info("YouTube URL detected in text")
+                progress.stage("DOWNLOADING")
+                content_for_summary = await youtube_handler(update, context, text)
+                summary_type = "youtube"
+                logger.debug(f"YouTube content extracted, length: {len(content_for_summary) if content_for_summary else 0}")
+            elif ARTICLE_URL_REGEX.search(text):
+                logger.info("Article URL detected in text")
+                progress.stage("DOWNLOADING")
+                content_for_summary = await article_handler(text)
+                summary_type = "web_article"
+                logger.debug(f"Article content extracted, length: {len(content_for_summary) if content_for_summary else 0}")
+            else:
+                logger.debug("Plain text message, no URLs detected")
+                content_for_summary = text
+                summary_type = "quoted_message"
+        case "voice" | "audio":
+            logger.info(f"Processing {message_type} message")
+            content_for_summary = await audio_handler(reply_msg, context, progress)
+            summary_type = "voice_message" if message_type == "voice" else "audio_file"
+            logger.debug(f"Audio transcribed, length: {len(content_for_summary) if content_for_summary else 0}")
+
+        case "video" | "video_note":
+            logger.info(f"Processing {message_type} message")
+            content_for_summary = await video_handler(reply_msg, context, progress)
+            summary_type = "video_note" if message_type == "video_note" else "telegram_video"
+            logger.debug(f"Video processed, length: {len(content_for_summary) if content_for_summary else 0}")
+
+        case "document":
+            logger.info("Processing document message")
+            progress.stage("ANALYZING")
+            document = await document_handler(reply_msg, context, progress)
+            if not document:
+                logger.error("Document handler returned empty content")
+                raise ValueError("Document content extraction failed")
+            content_for_summary = document.text
+
+            logger.debug(f"Document content extracted, length: {len(content_for_summary)}")
+            progress.stage("SUMMARIZING")
+
+            logger.info("Calling summarize_large_document")
+            summary = await openai_service.summarize_large_document(content_for_summary)
+            logger.debug(f"Document summary generated, length: {len(summary)}")
+            if document.truncated:
+                summary = f"{summary}\n\n{truncation_notice(document)}"
+            return summary
+
+    if not content_for_summary:
+        logger.error(f"No content extracted for summary type: {summary_type}")
+        raise SummaryUnavailable(USER_ERROR_MESSAGES["GENERAL_ERROR"])
+    if not content_for_summary.strip():
+        logger.warning(f"Empty content for summary type: {summary_type}")
+        raise SummaryUnavailable(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
+
+    progress.stage("SUMMARIZING")
+    logger.info(f"Calling OpenAI service for {summary_type} summary")
+    summary = await openai_service.get_summary(content_for_summary, summary_type, reply_config)
+    logger.debug(f"Reply summary generated, length: {len(summary)}")
+    return summary
+
+async def _reply_config(chat_id: int, message_type: str) -> Dict:
+    # Para todos los resúmenes de reply, la config del chat se usa para el idioma.
+    # Los modificadores de tono/longitud/etc no se aplican, según el nuevo diseño.
+    # Los documentos usan siempre la configuración por defecto.
+    if message_type == "document":
+        return {"model": config.OPENROUTER_MODEL}
+    return await db_service.get_chat_summary_config(chat_id)
+
+
+async def run_summarize_reply_job(application: Application, job: Dict) -> None:
+    """Job handler: summarize the message a /summarize command replied to.
+
+    The command and wait messages are rebuilt from the payload, so the job
+    can run in any worker, including after a restart.
+    """
+    payload = job["payload"]
+    bot = application.bot
+    command_message = Message.de_json(payload["message"], bot)
+    update = Update(payload["update_id"], message=command_message)
+    context = application.context_types.context.from_update(update, application)
+    progress = ProgressReporter(Message.de_json(payload["wait_message"], bot))
+    reply_msg = command_message.reply_to_message
+    message_type = payload["message_type"]
+    chat_id = command_message.chat_id
+
+    reply_config = await _reply_config(chat_id, message_type)
+    flight_key = (content_identity(reply_msg, message_type), config_fingerprint(reply_config))
+    try:
+        user = command_message.from_user
+        with usage_scope(chat_id=chat_id, user_id=user.id if user else 0):
+            final_summary = await run_shared_pipeline(
+                flight_key,
+                progress,
+                lambda leader: _summarize_reply(
+                    update, context, reply_msg, message_type, reply_config, leader
+                ),
+            )
+    except SummaryUnavailable as e:
+        await progress.fail(e.user_message)
+        await _refund_queued_operation(job)
+        return
     except Exception as e:
-        logger.error(f"Error updating progress: {e}")
+        logger.error(f"Error procesando mensaje (job {job['id']}, attempt {job['attempts']}): {e}", exc_info=True)
+        if is_last_attempt(job):
+            user = command_message.from_user
+            await notify_admins_service_error(
+                context, "Message Processing", str(e), user.id if user else None, chat_id
+            )
+            await progress.fail(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
+        else:
+            progress.stage("RETRYING")
+        raise
+
+    await deliver_summary(progress, final_summary)
+    logger.info(f"Reply message summary completed successfully for type: {message_type} (job {job['id']})")
+
+
+async def _refund_queued_operation(job: Dict) -> None:
+    """Give back the rate-limit slot of a queued summary that will never be delivered.
+
+    The limits live in the process handling updates, which may not be this
+    one, so the refund is recorded in the database and applied there.
+    """
+    refund = job["payload"].get("rate_limit")
+    if not refund:
+        return  # Admins are not limited
+    await db_service.add_rate_limit_refund(
+        refund["user_id"], refund["operation_type"], refund["consumed_at"]
+    )
+    logger.info(f"Rate-limit refund recorded for user {refund['user_id']} (job {job['id']})")
+
+
+async def on_summarize_reply_job_failed(application: Application, job: Dict) -> None:
+    """Failure hook: the last attempt failed or every lease was lost."""
+    await _refund_queued_operation(job)
+
+
+job_service.register_handler(
+    SUMMARIZE_REPLY_JOB, run_summarize_reply_job, on_failure=on_summarize_reply_job_failed
+)
+
 
 @log_command()
 @bot_started()
 async def summarize_command(update: Update, context: CallbackContext):
     """Handle the /summarize command with differentiated limits."""
     current_time_dt = datetime.now()
-    current_date_val = current_time_dt.date()
     user_tg = update.effective_user
     chat_id = update.effective_chat.id
     wait_message = None
+    progress = None
+    usage_consumed = False
+    consumed_at = None
 
     logger.debug(f"=== SUMMARIZE COMMAND STARTED ===")
     logger.debug(f"User ID: {user_tg.id}, Username: {user_tg.username}")
     logger.debug(f"Chat ID: {chat_id}, Current time: {current_time_dt}")
     logger.debug(f"Has reply message: {update.message.reply_to_message is not None}")
+    thread_mode = (
+        update.message.reply_to_message is not None
+        and bool(context.args)
+        and context.args[0].lower() == THREAD_SUMMARY_ARG
+    )
 
     try:
-        user_db = await db_service.get_or_create_user(
-            user_id=user_tg.id,
-            username=user_tg.username,
-            first_name=user_tg.first_name,
-            last_name=user_tg.last_name,
-        )
-        is_admin_user = user_db.get("is_admin", False)
+        # From memory: nothing is read from the database before the limits are taken
+        is_admin_user = rate_limit_service.is_admin(user_tg.id)
         operation_type = None
 
-        logger.debug(f"User DB data: {user_db}")
         logger.debug(f"Is admin user: {is_admin_user}")
 
         # 1. Determine Operation Type
         if not update.message.reply_to_message:
             operation_type = OPERATION_TYPE_TEXT_SIMPLE  # Summarize chat history
             logger.debug(f"No reply message -> Operation type: {operation_type}")
+        elif thread_mode:
+            operation_type = OPERATION_TYPE_TEXT_SIMPLE  # Summarize the reply thread
+            logger.debug(f"Thread summary requested -> Operation type: {operation_type}")
         else:
             reply_msg = update.message.reply_to_message
             message_type_raw = get_message_type(reply_msg)
@@ -121,296 +403,154 @@ async def summarize_command(update: Update, context: CallbackContext):
 
         logger.info(f"Final operation type determined: {operation_type}")
 
-        # 2. Apply Limits (if not admin)
+        # 2. Apply Limits (if not admin): chat token budget, then cooldown and daily
+        # limit, which are checked and taken at once
+        if not is_admin_user and config.CHAT_DAILY_TOKEN_BUDGET > 0:
+            tokens_today = usage_service.chat_tokens_today(chat_id)
+            if tokens_today >= config.CHAT_DAILY_TOKEN_BUDGET:
+                logger.info(
+                    f"Token budget exhausted for chat {chat_id}: "
+                    f"{tokens_today}/{config.CHAT_DAILY_TOKEN_BUDGET}"
+                )
+                await update.message.reply_text(MSG_CHAT_BUDGET_REACHED)
+                return
+
         if not is_admin_user:
-            logger.debug("User is not admin, applying limits")
-            # Daily Limit Reset for Advanced Ops
-            if operation_type == OPERATION_TYPE_ADVANCED:
-                logger.debug("Checking advanced operation limits")
-                advanced_op_reset_date_str = user_db.get("advanced_op_count_reset_date")
-                advanced_op_reset_date = None
-                logger.debug(f"Advanced op reset date string: {advanced_op_reset_date_str}")
-
-                if advanced_op_reset_date_str:
-                    try:
-                        advanced_op_reset_date = date.fromisoformat(advanced_op_reset_date_str)
-                        logger.debug(f"Parsed reset date: {advanced_op_reset_date}")
-                    except ValueError:
-                        logger.error(f"Invalid date format for advanced_op_count_reset_date: {advanced_op_reset_date_str} for user {user_tg.id}")
-
-                if advanced_op_reset_date != current_date_val:
-                    logger.info(f"Resetting daily count for user {user_tg.id} (last reset: {advanced_op_reset_date}, current: {current_date_val})")
-                    await db_service.update_user_fields(
-                        user_tg.id,
-                        {
-                            "advanced_op_today_count": 0,
-                            "advanced_op_count_reset_date": current_date_val.isoformat(),
-                        },
-                    )
-                    user_db["advanced_op_today_count"] = 0
-                    user_db["advanced_op_count_reset_date"] = current_date_val.isoformat()
-                    logger.info(f"Reset daily advanced op count for user {user_tg.id}")
-                else:
-                    logger.debug(f"No reset needed for user {user_tg.id}, same date")
-
-            # Cooldown Check
-            cooldown_seconds = 0
-            last_op_time_str = None
-            if operation_type == OPERATION_TYPE_TEXT_SIMPLE:
-                cooldown_seconds = COOLDOWN_TEXT_SIMPLE_SECONDS
-                last_op_time_str = user_db.get("last_text_simple_op_time")
-                logger.debug(f"Text simple cooldown: {cooldown_seconds}s, last op: {last_op_time_str}")
-            elif operation_type == OPERATION_TYPE_ADVANCED:
-                cooldown_seconds = COOLDOWN_ADVANCED_SECONDS
-                last_op_time_str = user_db.get("last_advanced_op_time")
-                logger.debug(f"Advanced cooldown: {cooldown_seconds}s, last op: {last_op_time_str}")
-
-            if last_op_time_str:
-                last_op_time_dt = datetime.fromisoformat(last_op_time_str)
-                elapsed_seconds = (current_time_dt - last_op_time_dt).total_seconds()
-                logger.debug(f"Elapsed since last op: {elapsed_seconds}s")
-
-                if elapsed_seconds < cooldown_seconds:
-                    remaining_cooldown = int(cooldown_seconds - elapsed_seconds)
-                    logger.info(f"Cooldown active for user {user_tg.id}: {remaining_cooldown}s remaining")
+            limit = rate_limit_service.check_and_consume(user_tg.id, operation_type)
+            if not limit.allowed:
+                if limit.reason == RATE_LIMIT_DAILY:
+                    logger.info(f"Daily limit of {DAILY_LIMIT_ADVANCED_OPS} reached for user {user_tg.id}")
                     await update.message.reply_text(
-                        MSG_COOLDOWN_ACTIVE.format(remaining=remaining_cooldown)
+                        MSG_DAILY_LIMIT_REACHED.format(limit=DAILY_LIMIT_ADVANCED_OPS)
                     )
-                    return
                 else:
-                    logger.debug(f"Cooldown passed for user {user_tg.id}")
-
-            # Daily Limit Check for Advanced Ops
-            if operation_type == OPERATION_TYPE_ADVANCED:
-                current_advanced_ops = user_db.get("advanced_op_today_count", 0)
-                logger.debug(f"Current advanced ops today: {current_advanced_ops}/{DAILY_LIMIT_ADVANCED_OPS}")
-
-                if current_advanced_ops >= DAILY_LIMIT_ADVANCED_OPS:
-                    logger.info(f"Daily limit reached for user {user_tg.id}: {current_advanced_ops}/{DAILY_LIMIT_ADVANCED_OPS}")
+                    logger.info(f"Cooldown active for user {user_tg.id}: {limit.retry_after}s remaining")
                     await update.message.reply_text(
-                        MSG_DAILY_LIMIT_REACHED.format(limit=DAILY_LIMIT_ADVANCED_OPS)
+                        MSG_COOLDOWN_ACTIVE.format(remaining=limit.retry_after)
                     )
-                    return
+                return
+            # Refunded in `finally` unless the summary is delivered or queued
+            # (a queued job refunds it itself if it never delivers)
+            usage_consumed = True
+            consumed_at = limit.consumed_at
         else:
             logger.debug("User is admin, skipping all limits")
 
+        if operation_type == OPERATION_TYPE_ADVANCED and update.message.reply_to_message:
+            # 3a. Media, documents and links: queue the work and acknowledge right away
+            wait_message = await update.message.reply_text(PROGRESS_MESSAGES["QUEUED"])
+            progress = ProgressReporter(wait_message)
+            job_id = await job_service.enqueue(
+                SUMMARIZE_REPLY_JOB,
+                {
+                    "update_id": update.update_id,
+                    "message": update.message.to_dict(),
+                    "wait_message": wait_message.to_dict(),
+                    "message_type": get_message_type(update.message.reply_to_message),
+                    "rate_limit": {
+                        "user_id": user_tg.id,
+                        "operation_type": operation_type,
+                        "consumed_at": consumed_at.isoformat(),
+                    } if usage_consumed else None,
+                },
+            )
+            usage_consumed = False
+            logger.info(f"=== SUMMARIZE COMMAND QUEUED AS JOB {job_id} FOR USER {user_tg.id} ===")
+            return
+
         wait_message = await update.message.reply_text(COMMAND_MESSAGES["SUMMARIZE"]["PROCESSING"])
+        progress = ProgressReporter(wait_message)
         logger.debug("Wait message sent, starting content processing")
 
-        # 3. Content Processing
-        if not update.message.reply_to_message:
-            logger.debug("Processing chat history (no reply message)")
-            await update_progress(wait_message, PROGRESS_MESSAGES["FETCHING_MESSAGES"])
-            recent_messages = await db_service.get_recent_messages(
-                chat_id, MAX_RECENT_MESSAGES
-            )
-            logger.debug(f"Fetched {len(recent_messages)} recent messages")
-
-            if len(recent_messages) < 5:
-                logger.warning(f"Not enough messages ({len(recent_messages)}) for summary")
-                await wait_message.edit_text(COMMAND_MESSAGES["SUMMARIZE"]["NO_CONTENT"])
-                return
+        # 3. Content Processing (identical concurrent requests share one pipeline run)
+        try:
+            if not update.message.reply_to_message or thread_mode:
+                progress.stage("FETCHING_MESSAGES")
+                if thread_mode:
+                    logger.debug("Processing reply thread")
+                    recent_messages = await db_service.get_thread_messages(
+                        chat_id, update.message.reply_to_message.message_id, MAX_RECENT_MESSAGES
+                    )
+                    min_messages = MIN_THREAD_MESSAGES
+                else:
+                    logger.debug("Processing chat history (no reply message)")
+                    recent_messages = await db_service.get_recent_messages(
+                        chat_id, MAX_RECENT_MESSAGES
+                    )
+                    min_messages = 5
+                logger.debug(f"Fetched {len(recent_messages)} recent messages")
 
-            await update_progress(wait_message, PROGRESS_MESSAGES["FORMATTING"])
-            formatted_messages = format_recent_messages(recent_messages)
-            logger.debug(f"Formatted messages length: {len(formatted_messages)} chars")
+                if len(recent_messages) < min_messages:
+                    logger.warning(f"Not enough messages ({len(recent_messages)}) for summary")
+                    await progress.fail(COMMAND_MESSAGES["SUMMARIZE"]["NO_CONTENT"])
+                    return
 
-            chat_config = await db_service.get_chat_summary_config(chat_id)
-            logger.debug(f"Chat config: {chat_config}")
+                chat_config = await db_service.get_chat_summary_config(chat_id)
+                logger.debug(f"Chat config: {chat_config}")
 
-            await update_progress(wait_message, PROGRESS_MESSAGES["SUMMARIZING"])
-            try:
-                logger.info("Calling OpenAI service for chat summary")
-                summary = await openai_service.get_summary(
-                    content=formatted_messages,
-                    summary_type="chat",
-                    summary_config=chat_config
+                # Same chat, same newest message and same config -> same summary
+                watermark = max(m["telegram_message_id"] for m in recent_messages)
+                flight_key = (
+                    "thread" if thread_mode else "chat",
+                    chat_id, watermark, len(recent_messages), config_fingerprint(chat_config)
                 )
-                logger.debug(f"Summary generated, length: {len(summary)} chars")
-
-                # Obtener el nombre del tono en el idioma correcto
-                tone_key = chat_config.get("tone", "neutral")
-                lang_key = chat_config.get("language", "es")
-                tone_name = get_button_label("tone", tone_key, lang_key)
+                with usage_scope(
+                    chat_id=chat_id, user_id=user_tg.id, summary_type="thread" if thread_mode else None
+                ):
+                    final_summary = await run_shared_pipeline(
+                        flight_key,
+                        progress,
+                        lambda leader: _summarize_chat_history(recent_messages, chat_config, leader),
+                    )
+                logger.info("Chat history summary completed successfully")
+            else:
+                logger.debug("Processing reply message")
+                reply_msg = update.message.reply_to_message
+                message_type_for_handler = get_message_type(reply_msg)
 
-                # Prepend the tone to the summary
-                final_summary = f"🧠 *Tono: {tone_name}*\n\n{summary}"
+                logger.debug(f"Reply message type: {message_type_for_handler}")
+                logger.debug(f"Reply message ID: {reply_msg.message_id}")
 
-            except ValueError as e:
-                logger.error(f"ValueError in summary generation: {e}")
-                # Handle unsupported language
-                if "is not supported" in str(e):
-                    await wait_message.edit_text(COMMAND_MESSAGES["SUMMARIZE"]["LANGUAGE_ERROR"])
-                    return
-                else:
-                    await wait_message.edit_text(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
+                if message_type_for_handler not in SUPPORTED_REPLY_TYPES:
+                    logger.warning(f"Unsupported message type: {message_type_for_handler}")
+                    await progress.fail(
+                        "Este tipo de mensaje no lo puedo resumir crack. Intenta con mensajes de texto, enlaces a YouTube o artículos web, mensajes de voz, archivos de audio, vídeos o documentos (PDF, DOCX, TXT)."
+                    )
                     return
-            except Exception as e:
-                logger.error(f"Unexpected error in summary generation: {e}", exc_info=True)
-                await wait_message.edit_text(USER_ERROR_MESSAGES["GENERAL_ERROR"])
-                return
 
-            await update_progress(wait_message, PROGRESS_MESSAGES["FINALIZING"])
-            await send_long_message(update, final_summary)
-            logger.info("Chat history summary completed successfully")
-        else:
-            logger.debug("Processing reply message")
-            reply_msg = update.message.reply_to_message
-            message_type_for_handler = get_message_type(reply_msg)
-            content_for_summary = None
-            summary_type = None # Renamed from summary_type_for_openai
+                reply_config = await _reply_config(chat_id, message_type_for_handler)
+                logger.debug(f"Reply config: {reply_config}")
 
-            logger.debug(f"Reply message type: {message_type_for_handler}")
-            logger.debug(f"Reply message ID: {reply_msg.message_id}")
-
-            try:
-                match message_type_for_handler:
-                    case "text":
-                        logger.debug("Processing text reply message")
-                        await update_progress(wait_message, PROGRESS_MESSAGES["ANALYZING"])
-                        text = reply_msg.text or ""
-                        logger.debug(f"Text content length: {len(text)}")
-
-                        if YOUTUBE_REGEX.search(text):
-                            logger.info("YouTube URL detected in text")
-                            await update_progress(wait_message, PROGRESS_MESSAGES["DOWNLOADING"])
-                            content_for_summary = await youtube_handler(update, context, text)
-                            summary_type = "youtube"
-                            logger.debug(f"YouTube content extracted, length: {len(content_for_summary) if content_for_summary else 0}")
-                        elif ARTICLE_URL_REGEX.search(text):
-                            logger.info("Article URL detected in text")
-                            await update_progress(wait_message, PROGRESS_MESSAGES["DOWNLOADING"])
-                            content_for_summary = await article_handler(text)
-                            summary_type = "web_article"
-                            logger.debug(f"Article content extracted, length: {len(content_for_summary) if content_for_summary else 0}")
-                        else:
-                            logger.debug("Plain text message, no URLs detected")
-                            content_for_summary = text
-                            summary_type = "quoted_message"
-                    case "voice" | "audio":
-                        logger.info(f"Processing {message_type_for_handler} message")
-                        await update_progress(wait_message, PROGRESS_MESSAGES["DOWNLOADING"])
-                        await update_progress(wait_message, PROGRESS_MESSAGES["TRANSCRIBING"])
-                        content_for_summary = await audio_handler(reply_msg, context)
-                        summary_type = "voice_message" if message_type_for_handler == "voice" else "audio_file"
-                        logger.debug(f"Audio transcribed, length: {len(content_for_summary) if content_for_summary else 0}")
-
-                    case "video" | "video_note":
-                        logger.info(f"Processing {message_type_for_handler} message")
-                        await update_progress(wait_message, PROGRESS_MESSAGES["DOWNLOADING"])
-                        await update_progress(wait_message, PROGRESS_MESSAGES["PROCESSING"])
-                        content_for_summary = await video_handler(reply_msg, context)
-                        summary_type = "video_note" if message_type_for_handler == "video_note" else "telegram_video"
-                        logger.debug(f"Video processed, length: {len(content_for_summary) if content_for_summary else 0}")
-
-                    case "document":
-                        logger.info("Processing document message")
-                        summary_type = "document" # Set summary_type for document
-                        await update_progress(wait_message, PROGRESS_MESSAGES["ANALYZING"])
-                        content_for_summary = await document_handler(reply_msg, context)
-                        if not content_for_summary:
-                            logger.error("Document handler returned empty content")
-                            raise ValueError("Document content extraction failed")
-
-                        logger.debug(f"Document content extracted, length: {len(content_for_summary)}")
-                        await update_progress(wait_message, PROGRESS_MESSAGES["SUMMARIZING"])
-
-                        logger.info("Calling summarize_large_document")
-                        summary = await openai_service.summarize_large_document(content_for_summary)
-                        logger.debug(f"Document summary generated, length: {len(summary)}")
-
-                        await update_progress(wait_message, PROGRESS_MESSAGES["FINALIZING"])
-                        await send_long_message(update, summary)
-                        content_for_summary = None  # Mark as processed, so the general summary call is skipped
-                        logger.info("Document summary completed successfully")
-
-                    case _:
-                        logger.warning(f"Unsupported message type: {message_type_for_handler}")
-                        await wait_message.edit_text(
-                            "Este tipo de mensaje no lo puedo resumir crack. Intenta con mensajes de texto, enlaces a YouTube o artículos web, mensajes de voz, archivos de audio, vídeos o documentos (PDF, DOCX, TXT)."
-                        )
-                        return
-
-                if content_for_summary and summary_type: # Use summary_type here
-                    logger.debug(f"Processing summary for type: {summary_type}")
-                    if not content_for_summary.strip():
-                        logger.warning(f"Empty content for summary type: {summary_type}")
-                        await wait_message.edit_text(
-                            ERROR_MESSAGES.get(
-                                f"ERROR_CANNOT_SUMMARIZE_{message_type_for_handler.upper()}",
-                                USER_ERROR_MESSAGES["PROCESSING_ERROR"],
-                            )
-                        )
-                        return
-                    # Para todos los resúmenes de reply, la config del chat se usa para el idioma.
-                    # Los modificadores de tono/longitud/etc no se aplican, según el nuevo diseño.
-                    reply_config = await db_service.get_chat_summary_config(chat_id)
-                    logger.debug(f"Reply config: {reply_config}")
-
-                    await update_progress(wait_message, PROGRESS_MESSAGES["SUMMARIZING"])
-                    logger.info(f"Calling OpenAI service for {summary_type} summary")
-                    summary = await openai_service.get_summary(content_for_summary, summary_type, reply_config)
-                    logger.debug(f"Reply summary generated, length: {len(summary)}")
-
-                    # Obtener el nombre del tono en el idioma correcto
-                    tone_key = reply_config.get("tone", "neutral")
-                    lang_key = reply_config.get("language", "es")
-                    tone_name = get_button_label("tone", tone_key, lang_key)
-                    final_summary = f"🧠 *Tono: {tone_name}*\n\n{summary}"
-
-                    await update_progress(wait_message, PROGRESS_MESSAGES["FINALIZING"])
-                    await send_long_message(update, summary)
-                    logger.info(f"Reply message summary completed successfully for type: {summary_type}")
-
-                elif summary_type == "document" and not content_for_summary: # Use summary_type here
-                    logger.debug("Document was already processed by summarize_large_document")
-                    pass # Document was handled by summarize_large_document
-                elif not content_for_summary and summary_type != "document": # Use summary_type here
-                    logger.error(f"No content extracted for summary type: {summary_type}")
-                    await wait_message.edit_text(
-                        ERROR_MESSAGES.get(
-                            f"ERROR_CANNOT_SUMMARIZE_{message_type_for_handler.upper()}",
-                            USER_ERROR_MESSAGES["GENERAL_ERROR"],
+                flight_key = (
+                    content_identity(reply_msg, message_type_for_handler),
+                    config_fingerprint(reply_config),
+                )
+                try:
+                    with usage_scope(chat_id=chat_id, user_id=user_tg.id):
+                        final_summary = await run_shared_pipeline(
+                            flight_key,
+                            progress,
+                            lambda leader: _summarize_reply(
+                                update, context, reply_msg, message_type_for_handler, reply_config, leader
+                            ),
                         )
+                except SummaryUnavailable:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error procesando mensaje: {str(e)}", exc_info=True)
+                    await notify_admins_service_error(
+                        context, "Message Processing", str(e),
+                        user_tg.id if user_tg else None, update.effective_chat.id
                     )
+                    await progress.fail(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
                     return
-            except Exception as e:
-                logger.error(f"Error procesando mensaje: {str(e)}", exc_info=True)
-                await notify_admins_service_error(
-                    context, "Message Processing", str(e),
-                    user_tg.id if user_tg else None, update.effective_chat.id
-                )
-                if wait_message:
-                    await wait_message.edit_text(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
-                else:
-                    await update.message.reply_text(USER_ERROR_MESSAGES["PROCESSING_ERROR"])
-                return
-
-        # 4. Update Usage Data (if not admin)
-        if not is_admin_user:
-            logger.debug("Updating usage data for non-admin user")
-            fields_to_update = {}
-            if operation_type == OPERATION_TYPE_TEXT_SIMPLE:
-                fields_to_update["last_text_simple_op_time"] = current_time_dt.isoformat()
-                logger.debug(f"Recording text simple operation at {current_time_dt.isoformat()}")
-            elif operation_type == OPERATION_TYPE_ADVANCED:
-                fields_to_update["last_advanced_op_time"] = current_time_dt.isoformat()
-                new_count = user_db.get("advanced_op_today_count", 0) + 1
-                fields_to_update["advanced_op_today_count"] = new_count
-                logger.debug(f"Recording advanced operation at {current_time_dt.isoformat()}, new count: {new_count}")
-
-            if fields_to_update:
-                await db_service.update_user_fields(user_tg.id, fields_to_update)
-                logger.info(f"Updated usage data for user {user_tg.id}, operation: {operation_type}, fields: {fields_to_update}")
-        else:
-            logger.debug("Admin user, skipping usage data update")
+                logger.info(f"Reply message summary completed successfully for type: {message_type_for_handler}")
+        except SummaryUnavailable as e:
+            await progress.fail(e.user_message)
+            return
 
-        if wait_message:
-            try:
-                await wait_message.delete()
-                logger.debug("Wait message deleted successfully")
-            except Exception as e_del:
-                logger.warning(f"Could not delete wait_message: {e_del}")
+        await deliver_summary(progress, final_summary)
+        usage_consumed = False
 
         logger.info(f"=== SUMMARIZE COMMAND COMPLETED SUCCESSFULLY FOR USER {user_tg.id} ===")
 
@@ -421,9 +561,9 @@ async def summarize_command(update: Update, context: CallbackContext):
             context, "Summarize Command Failed", str(e),
             user_tg.id if user_tg else None, update.effective_chat.id
         )
-        if wait_message:
+        if progress:
             try:
-                await wait_message.edit_text(USER_ERROR_MESSAGES["GENERAL_ERROR"])
+                await progress.fail(USER_ERROR_MESSAGES["GENERAL_ERROR"])
             except Exception as edit_error:
                 logger.error(f"Could not edit wait message with error: {edit_error}")
         else:
@@ -431,3 +571,7 @@ async def summarize_command(update: Update, context: CallbackContext):
                 await update.message.reply_text(USER_ERROR_MESSAGES["GENERAL_ERROR"])
             except Exception as reply_error:
                 logger.error(f"Could not send error message: {reply_error}")
+    finally:
+        if usage_consumed:
+            rate_limit_service.refund(user_tg.id, operation_type)
+            logger.debug(f"Usage refunded for user {user_tg.id}, operation: {operation_type}")
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.utils.decorators import log_command, admin_command
+from bot.services.database_service import db_service
+from bot.services.usage_service import usage_service
+from bot.utils.constants import USAGE_REPORT_DEFAULT_DAYS, USAGE_REPORT_TOP
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+USAGE_GROUPINGS = (
+    ("chat_id", "💬 Por chat"),
+    ("summary_type", "🧩 Por tipo de resumen"),
+    ("model", "🤖 Por modelo"),
+    ("user_id", "👤 Por usuario"),
+)
+
+
+def format_usage_row(row) -> str:
+    name = row["name"]
+    if name in (0, None):
+        name = "desconocido"
+    text = f"{name} · {row['calls']} llamadas · {row['total_tokens']:,} tokens"
+    if row["cost"]:
+        text += f" · ${row['cost']:.4f}"
+    if row["audio_seconds"]:
+        text += f" · {row['audio_seconds'] / 60:.1f} min de audio"
+    if row["calls"]:
+        text += f" · {row['latency_seconds'] / row['calls']:.1f} s/llamada"
+    return text
+
+
+def format_usage(days: int, rollups) -> str:
+    lines = [f"📊 Consumo de LLM de los últimos {days} días"]
+    for (_, title), rows in zip(USAGE_GROUPINGS, rollups):
+        lines.append(f"\n{title}")
+        lines.extend(format_usage_row(row) for row in rows)
+        if not rows:
+            lines.append("Sin consumo registrado.")
+    return "\n".join(lines)
+
+
+@log_command()
+@admin_command()
+async def usage_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show which chats, summary types, models and users use the LLM capacity (admins only)."""
+    try:
+        days = int(context.args[0]) if context.args else USAGE_REPORT_DEFAULT_DAYS
+        if days < 1:
+            raise ValueError(days)
+    except ValueError:
+        await update.message.reply_text("Uso: /usage [días]")
+        return
+    try:
+        # Include what this process has not written yet
+        await usage_service.flush()
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        rollups = [
+            await db_service.get_usage_rollup(group_by, since, USAGE_REPORT_TOP)
+            for group_by, _ in USAGE_GROUPINGS
+        ]
+        await update.message.reply_text(format_usage(days, rollups)[:4000])
+    except Exception as e:
+        logger.error(f"Error in usage_command: {e}", exc_info=True)
+        await update.message.reply_text("No se pudo obtener el consumo.")
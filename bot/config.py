@@ -1,7 +1,16 @@
 import os
-from typing import Optional, List, Set
+import tempfile
+from typing import Dict, Optional, List, Set
 from bot.constants import DEFAULT_MODEL
 
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     _instance = None
 
@@ -22,6 +31,42 @@ class Config:
             self.OPENROUTER_MODEL: str = DEFAULT_MODEL
             # Database settings
             self.DB_PATH: str = "bot.db"
+            # Media settings
+            self.VAD_ENABLED: bool = True # Trim silences before sending audio to Whisper
+            # Scratch space for media temp files (point it to a tmpfs such as /dev/shm/al-grano-bot)
+            self.SCRATCH_DIR: str = os.path.join(tempfile.gettempdir(), "al-grano-bot")
+            self.SCRATCH_QUOTA_MB: int = 1024
+            # Progress messages: minimum seconds between edits of the wait message
+            self.PROGRESS_EDIT_INTERVAL_SECONDS: float = 1.5
+            # Process role: "all" (default, one process does everything), "frontend"
+            # (only receives updates; heavy jobs are queued) or "worker" (scheduler,
+            # daily summaries and background jobs; no updates)
+            self.PROCESS_ROLE: str = "all"
+            # Telegram updates: "polling" (default) or "webhook"
+            self.UPDATE_MODE: str = "polling"
+            # Webhook settings (only used when UPDATE_MODE is "webhook")
+            self.WEBHOOK_URL: Optional[str] = None # Public base URL, e.g. https://bot.example.com
+            self.WEBHOOK_LISTEN: str = "0.0.0.0"
+            self.WEBHOOK_PORT: int = 8443
+            self.WEBHOOK_PATH: str = "telegram"
+            self.WEBHOOK_SECRET_TOKEN: Optional[str] = None # Sent by Telegram in X-Telegram-Bot-Api-Secret-Token
+            self.WEBHOOK_MAX_CONNECTIONS: int = 40
+            # Update processing: updates handled at once, and per-command caps for heavy commands
+            self.UPDATE_CONCURRENCY: int = 32
+            self.HANDLER_CONCURRENCY: Dict[str, int] = {"summarize": 4, "export_chat": 2}
+            # Daily summaries generated at once (the rest wait for a slot)
+            self.DAILY_SUMMARY_CONCURRENCY: int = 4
+            # Summarize new messages in hourly windows during the day, so the daily
+            # summary only has to combine a few partial summaries
+            self.DAILY_PRESUMMARY_ENABLED: bool = False
+            # Scheduler: how late a missed run (e.g. bot down at that hour) may still run,
+            # and whether several missed runs of a job collapse into one
+            self.SCHEDULER_MISFIRE_GRACE_SECONDS: int = 4 * 3600
+            self.SCHEDULER_COALESCE: bool = True
+            # Background job workers in this process (0 = only enqueue, another process runs them)
+            self.JOB_WORKERS: int = 2
+            # LLM tokens a chat may use per day through /summarize (0 = no limit; admins are exempt)
+            self.CHAT_DAILY_TOKEN_BUDGET: int = 0
             # Other settings
             # Auto Admin IDs
             self.AUTO_ADMIN_USER_IDS: Set[int] = set()
@@ -37,6 +82,48 @@ class Config:
         # Load model identifiers from env, with defaults
         self.OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", DEFAULT_MODEL)
         self.DB_PATH = os.getenv("DB_PATH", "bot.db")
+        self.VAD_ENABLED = _env_bool("VAD_ENABLED", self.VAD_ENABLED)
+        self.SCRATCH_DIR = os.getenv("SCRATCH_DIR", self.SCRATCH_DIR)
+        self.SCRATCH_QUOTA_MB = int(os.getenv("SCRATCH_QUOTA_MB", self.SCRATCH_QUOTA_MB))
+        self.PROGRESS_EDIT_INTERVAL_SECONDS = float(
+            os.getenv("PROGRESS_EDIT_INTERVAL_SECONDS", self.PROGRESS_EDIT_INTERVAL_SECONDS)
+        )
+        self.PROCESS_ROLE = os.getenv("PROCESS_ROLE", self.PROCESS_ROLE).strip().lower()
+        self.UPDATE_MODE = os.getenv("UPDATE_MODE", self.UPDATE_MODE).strip().lower()
+        self.WEBHOOK_URL = os.getenv("WEBHOOK_URL", self.WEBHOOK_URL)
+        self.WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", self.WEBHOOK_LISTEN)
+        self.WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", self.WEBHOOK_PORT))
+        self.WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", self.WEBHOOK_PATH).strip("/")
+        self.WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", self.WEBHOOK_SECRET_TOKEN)
+        self.WEBHOOK_MAX_CONNECTIONS = int(
+            os.getenv("WEBHOOK_MAX_CONNECTIONS", self.WEBHOOK_MAX_CONNECTIONS)
+        )
+        self.UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", self.UPDATE_CONCURRENCY))
+        self.DAILY_SUMMARY_CONCURRENCY = int(
+            os.getenv("DAILY_SUMMARY_CONCURRENCY", self.DAILY_SUMMARY_CONCURRENCY)
+        )
+        self.DAILY_PRESUMMARY_ENABLED = _env_bool(
+            "DAILY_PRESUMMARY_ENABLED", self.DAILY_PRESUMMARY_ENABLED
+        )
+        self.SCHEDULER_MISFIRE_GRACE_SECONDS = int(
+            os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", self.SCHEDULER_MISFIRE_GRACE_SECONDS)
+        )
+        self.SCHEDULER_COALESCE = _env_bool("SCHEDULER_COALESCE", self.SCHEDULER_COALESCE)
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", self.JOB_WORKERS))
+        self.CHAT_DAILY_TOKEN_BUDGET = int(
+            os.getenv("CHAT_DAILY_TOKEN_BUDGET", self.CHAT_DAILY_TOKEN_BUDGET)
+        )
+        handler_concurrency_str = os.getenv("HANDLER_CONCURRENCY_CSV")
+        if handler_concurrency_str:
+            try:
+                self.HANDLER_CONCURRENCY = {
+                    name.strip().lstrip("/"): int(limit)
+                    for name, limit in (
+                        item.split(":") for item in handler_concurrency_str.split(",") if item.strip()
+                    )
+                }
+            except ValueError:
+                print(f"WARNING: Invalid format for HANDLER_CONCURRENCY_CSV: '{handler_concurrency_str}'. Expected command:limit pairs separated by commas.")
         auto_admin_ids_str = os.getenv("AUTO_ADMIN_USER_IDS_CSV")
         if auto_admin_ids_str:
             try:
@@ -13,7 +13,8 @@ from .models import (
 from .messages import (
     SUCCESS_MESSAGES,
     USER_ERROR_MESSAGES,
-    COMMAND_MESSAGES
+    COMMAND_MESSAGES,
+    PROGRESS_MESSAGES
 )
 
 __all__ = [
@@ -24,5 +25,6 @@ __all__ = [
     "MAX_FALLBACK_ATTEMPTS",
     "SUCCESS_MESSAGES",
     "USER_ERROR_MESSAGES",
-    "COMMAND_MESSAGES"
+    "COMMAND_MESSAGES",
+    "PROGRESS_MESSAGES"
 ]
\ No newline at end of file
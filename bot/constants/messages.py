@@ -42,4 +42,18 @@ COMMAND_MESSAGES = {
         "SUCCESS": "✅ Configuración actualizada correctamente",
         "INVALID_OPTION": "❌ Opción no válida. Inténtalo de nuevo."
     }
-}
\ No newline at end of file
+}
+
+# Progress stages shown in the wait message while a summary is generated
+PROGRESS_MESSAGES = {
+    "ANALYZING": "🔍 Analizando el contenido...",
+    "DOWNLOADING": "⬇️ Descargando contenido...",
+    "PROCESSING": "⚙️ Procesando datos...",
+    "TRANSCRIBING": "🎯 Transcribiendo audio...",
+    "SUMMARIZING": "🤖 Generando resumen...",
+    "FETCHING_MESSAGES": "📚 Recopilando mensajes recientes...",
+    "FORMATTING": "📝 Dando formato al resumen...",
+    "FINALIZING": "✨ Finalizando...",
+    "QUEUED": "🕒 En cola, te aviso aquí en cuanto empiece...",
+    "RETRYING": "🔁 Algo falló, reintentando en un momento...",
+}
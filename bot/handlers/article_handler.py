@@ -1,68 +1,107 @@
+import asyncio
+import time
 from typing import Optional
-import requests
-from readability import parse
+from bot.services.http_service import http_service, HttpFetchError
+from bot.utils.cache_utils import TTLCache
+from bot.utils.executors import run_in_process_pool
+from bot.utils.constants import (
+    ARTICLE_URL_REGEX,
+    ARTICLE_MAX_BYTES,
+    ARTICLE_FETCH_TIMEOUT_SECONDS,
+    ARTICLE_CONTENT_TYPES,
+    ARTICLE_CACHE_MAX_ENTRIES,
+    ARTICLE_CACHE_TTL_SECONDS,
+    ARTICLE_CACHE_FRESH_SECONDS,
+    ARTICLE_PARSE_WORKERS,
+    ARTICLE_PARSE_TIMEOUT_SECONDS,
+)
 from bot.utils.logger import logger
+from workers.article_worker import extract_article
 
 logger = logger.get_logger(__name__)
 
+# url -> {"content", "etag", "last_modified", "validated_at"}
+_article_cache = TTLCache(
+    max_entries=ARTICLE_CACHE_MAX_ENTRIES, ttl_seconds=ARTICLE_CACHE_TTL_SECONDS
+)
+
 
 async def article_handler(url: str) -> Optional[str]:
     """
     Handle web article summarization requests.
     Args:
-        url: URL of the article to summarize
+        url: URL of the article to summarize (or a text containing it)
     Returns:
         str: Summary of the article or None if failed
     """
     logger.debug(f"=== ARTICLE HANDLER STARTED ===")
-    logger.debug(f"URL: {url}")
+    url_match = ARTICLE_URL_REGEX.search(url or "")
+    if not url_match:
+        logger.warning(f"No URL found in article request: {url}")
+        return None
+    url = url_match.group(0)
     logger.info(f"Processing article URL: {url}")
 
     try:
-        # Fetch article content
-        logger.debug("Fetching article content via HTTP request")
-        response = requests.get(url, timeout=30)
-        response_size = len(response.content)
-        status_code = response.status_code
-
-        logger.debug(f"HTTP Response - Status: {status_code}, Size: {response_size} bytes")
-
-        if status_code != 200:
-            logger.warning(f"HTTP request failed with status {status_code}")
-            return None
-
-        logger.debug("Parsing article content with readability")
-        article = parse(response.text)
+        cached = _article_cache.get(url)
+        if cached and time.monotonic() - cached["validated_at"] < ARTICLE_CACHE_FRESH_SECONDS:
+            logger.info(f"Article cache hit (fresh) for {url}")
+            return cached["content"]
 
-        # Get title and content
-        article_title = article.title or "Sin título"
-        article_content = article.text_content or article.content or ""
+        # Fetch article content, revalidating the cached copy if we have one
+        logger.debug("Fetching article content via shared HTTP session")
+        response = await http_service.fetch_text(
+            url,
+            max_bytes=ARTICLE_MAX_BYTES,
+            allowed_content_types=ARTICLE_CONTENT_TYPES,
+            timeout=ARTICLE_FETCH_TIMEOUT_SECONDS,
+            etag=cached["etag"] if cached else None,
+            last_modified=cached["last_modified"] if cached else None,
+        )
 
-        title_length = len(article_title)
-        content_length = len(article_content)
+        if response["status"] == 304 and cached:
+            logger.info(f"Article not modified, reusing cached content for {url}")
+            cached["validated_at"] = time.monotonic()
+            _article_cache.set(url, cached)
+            return cached["content"]
 
-        logger.debug(f"Article title: '{article_title}' (length: {title_length})")
-        logger.debug(f"Article content length: {content_length} chars")
+        logger.debug("Parsing article content with readability in worker pool")
+        full_content = await run_in_process_pool(
+            "readability",
+            ARTICLE_PARSE_WORKERS,
+            extract_article,
+            response["text"],
+            timeout=ARTICLE_PARSE_TIMEOUT_SECONDS,
+        )
 
-        if not article_content.strip():
+        if not full_content:
             logger.warning("Article content is empty after parsing")
             return None
 
-        # Format content for summarization
-        full_content = f"Title: {article_title}\n\nContent: {article_content}"
-        total_length = len(full_content)
+        has_validators = bool(response["etag"] or response["last_modified"])
+        _article_cache.set(
+            url,
+            {
+                "content": full_content,
+                "etag": response["etag"],
+                "last_modified": response["last_modified"],
+                "validated_at": time.monotonic(),
+            },
+            # Sin validadores no se puede revalidar: solo se guarda la ventana fresca
+            ttl_seconds=None if has_validators else ARTICLE_CACHE_FRESH_SECONDS,
+        )
 
         logger.info(f"=== ARTICLE HANDLER COMPLETED SUCCESSFULLY ===")
-        logger.info(f"Total content length: {total_length} chars")
+        logger.info(f"Total content length: {len(full_content)} chars")
         logger.debug(f"Content preview: {full_content[:200]}...")
 
         return full_content
 
-    except requests.exceptions.Timeout:
-        logger.error(f"Timeout when fetching article: {url}")
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout when fetching or parsing article: {url}")
         return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error when fetching article {url}: {str(e)}", exc_info=True)
+    except HttpFetchError as e:
+        logger.error(f"Request error when fetching article {url}: {str(e)}")
         return None
     except Exception as e:
         logger.error(f"=== ARTICLE HANDLER FAILED ===")
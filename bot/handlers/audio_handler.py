@@ -1,23 +1,39 @@
+from typing import Optional
 from telegram import Message
 from telegram.ext import CallbackContext
 from bot.services import openai_service
 from bot.utils.constants import MAX_FILE_SIZE
-from bot.utils.media_utils import compress_audio, get_file_size
+from bot.utils.media_utils import (
+    compress_audio,
+    get_file_size,
+    log_speech_times,
+    remove_silences,
+)
+from bot.services.scratch_service import (
+    scratch_service,
+    estimate_media_bytes,
+    ScratchQuotaExceeded,
+)
+from bot.utils.progress_reporter import ProgressReporter
 from bot.utils.logger import logger
-from contextlib import ExitStack
-import tempfile
+from bot.config import config
 import os  # Necesario para os.path.getsize
 
 logger = logger.get_logger(__name__)
 
 
-async def audio_handler(message: Message, context: CallbackContext) -> None:
+async def audio_handler(
+    message: Message,
+    context: CallbackContext,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
     """
     Handle audio and voice message transcription requests.
 
     Args:
         message: Telegram message containing audio/voice
         context: Callback context
+        progress: Optional reporter notified as each stage starts
     """
     try:
         chat_id = message.chat.id
@@ -25,6 +41,7 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
         is_audio = bool(message.audio)
         file_id = message.audio.file_id if is_audio else message.voice.file_id
         file_size = message.audio.file_size if is_audio else message.voice.file_size
+        duration = message.audio.duration if is_audio else message.voice.duration
 
         logger.debug(f"=== AUDIO HANDLER STARTED ===")
         logger.debug(f"Chat ID: {chat_id}, User ID: {user_id}")
@@ -46,28 +63,37 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
             file = await context.bot.get_file(file_id)
             logger.info(f"Retrieved file info: {file.file_path}")
 
-            with ExitStack() as stack:
-                temp_file = stack.enter_context(
-                    tempfile.NamedTemporaryFile(suffix=".ogg", delete=False)
-                )
-                compressed_file = stack.enter_context(
-                    tempfile.NamedTemporaryFile(suffix=".ogg", delete=False)
-                )
-                temp_file_path = temp_file.name
-                compressed_file_path = compressed_file.name
+            reserve_bytes = estimate_media_bytes(
+                file_size, duration, decoded_copies=1 if config.VAD_ENABLED else 0
+            )
+            async with scratch_service.job(reserve_bytes, "audio") as job:
+                temp_file_path = job.file("input.ogg")
+                compressed_file_path = job.file("compressed.ogg")
+                speech_file_path = job.file("speech.wav")
 
-                logger.debug(f"Created temporary files: {temp_file_path}, {compressed_file_path}")
+                logger.debug(f"Scratch job directory: {job.path}")
 
                 try:
                     logger.debug("Starting file download")
+                    if progress:
+                        progress.stage("DOWNLOADING")
                     await file.download_to_drive(custom_path=temp_file_path)
 
                     # --- FIX START ---
                     downloaded_size_bytes = os.path.getsize(temp_file_path)
                     logger.info(f"Audio downloaded successfully, size: {get_file_size(temp_file_path)}")
 
+                    if progress:
+                        progress.stage("PROCESSING")
+                    source_path = temp_file_path
+                    timeline = None
+                    if config.VAD_ENABLED:
+                        timeline = await remove_silences(temp_file_path, speech_file_path)
+                        if timeline is not None:
+                            source_path = speech_file_path
+
                     logger.debug("Starting audio compression")
-                    await compress_audio(temp_file_path, compressed_file_path)
+                    await compress_audio(source_path, compressed_file_path)
 
                     compressed_size_bytes = os.path.getsize(compressed_file_path)
                     logger.info(f"Audio compressed, new size: {get_file_size(compressed_file_path)}")
@@ -78,7 +104,12 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
                     # --- FIX END ---
 
                     logger.debug("Starting audio transcription")
-                    transcription = await openai_service.transcribe_audio(compressed_file_path)
+                    if progress:
+                        progress.stage("TRANSCRIBING")
+                    transcription, segments = await openai_service.transcribe_audio_segments(
+                        compressed_file_path
+                    )
+                    log_speech_times(timeline, segments)
                     transcription_length = len(transcription)
                     logger.info(f"=== AUDIO HANDLER COMPLETED SUCCESSFULLY ===")
                     logger.info(f"Transcription length: {transcription_length} chars")
@@ -93,6 +124,12 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
                     )
                     return None
 
+        except ScratchQuotaExceeded as e:
+            logger.warning(f"Audio job rejected: {e}")
+            await message.reply_text(
+                "Ahora mismo estoy procesando demasiados archivos. Inténtalo de nuevo en unos minutos."
+            )
+            return None
         except Exception as e:
             logger.error(f"Error getting file from Telegram: {str(e)}", exc_info=True)
             await message.reply_text(
@@ -1,9 +1,12 @@
-from docx import Document
-import PyPDF2
-import io
+import asyncio
 import logging
+import os
 from typing import Optional
 from bot.services.openai_service import openai_service
+from bot.services.scratch_service import scratch_service, ScratchQuotaExceeded
+from bot.utils.constants import DOCUMENT_TEXT_BUDGET_CHUNKS
+from bot.utils.document_utils import DocumentText, extract_document_text
+from bot.utils.progress_reporter import ProgressReporter
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +17,20 @@ SUPPORTED_DOCUMENT_TYPES = {
 }
 
 
-async def document_handler(message, context) -> Optional[str]:
-    """Handle document messages"""
+def truncation_notice(document: DocumentText) -> str:
+    """Note appended to the summary of a document cut short by the text budget."""
+    if document.total_pages:
+        return (
+            f"⚠️ _Documento muy largo: el resumen cubre solo las primeras "
+            f"{document.pages_read} de {document.total_pages} páginas._"
+        )
+    return "⚠️ _Documento muy largo: el resumen cubre solo la primera parte._"
+
+
+async def document_handler(
+    message, context, progress: Optional[ProgressReporter] = None
+) -> Optional[DocumentText]:
+    """Handle document messages, reporting download/extraction stages to progress if given"""
     try:
         document = message.document
         if document.mime_type not in SUPPORTED_DOCUMENT_TYPES:
@@ -30,130 +45,77 @@ async def document_handler(message, context) -> Optional[str]:
             f"Procesando documento: {document.file_name} ({document.mime_type})"
         )
 
-        # Download document
-        try:
-            file = await context.bot.get_file(document.file_id)
-            file_bytes = await file.download_as_bytearray()
-            logger.info(f"Documento descargado, tamaño: {len(file_bytes)} bytes")
-        except Exception as e:
-            error_msg = f"Error descargando el documento: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            await message.reply_text(
-                "Lo siento, hubo un problema al descargar el documento. Por favor, inténtalo de nuevo."
-            )
-            return None
-
-        # Extract text based on file type
-        try:
-            if document.mime_type == "application/pdf":
-                text_content = extract_text_from_pdf(file_bytes)
-            elif (
-                document.mime_type
-                == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            ):
-                text_content = extract_text_from_docx(file_bytes)
-            else:  # text/plain
-                text_content = file_bytes.decode("utf-8")
+        char_budget = (
+            int(openai_service.MAX_INPUT_CHARS_MODEL * 0.95) * DOCUMENT_TEXT_BUDGET_CHUNKS
+        )
+        async with scratch_service.job(document.file_size or 0, "document") as job:
+            document_path = job.file(f"input.{SUPPORTED_DOCUMENT_TYPES[document.mime_type]}")
 
-            if not text_content or not text_content.strip():
-                logger.error("No se pudo extraer texto del documento")
+            # Download document straight to disk; workers map the file instead of copying it
+            try:
+                if progress:
+                    progress.stage("DOWNLOADING")
+                file = await context.bot.get_file(document.file_id)
+                await file.download_to_drive(custom_path=document_path)
+                logger.info(
+                    f"Documento descargado, tamaño: {os.path.getsize(document_path)} bytes"
+                )
+            except Exception as e:
+                error_msg = f"Error descargando el documento: {str(e)}"
+                logger.error(error_msg, exc_info=True)
                 await message.reply_text(
-                    "No pude extraer texto de este documento. ¿Podrías verificar que no esté vacío o dañado?"
+                    "Lo siento, hubo un problema al descargar el documento. Por favor, inténtalo de nuevo."
                 )
                 return None
 
-            logger.info(
-                f"Texto extraído exitosamente, longitud: {len(text_content)} caracteres"
-            )
-            return text_content
-
-        except Exception as e:
-            error_msg = f"Error extrayendo texto del documento: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            await message.reply_text(
-                "Hubo un problema al procesar el documento. ¿Podrías intentar con otro archivo?"
-            )
-            return None
-
-    except Exception as e:
-        logger.error(f"Error en document handler: {str(e)}", exc_info=True)
-        await message.reply_text(
-            "Ocurrió un error inesperado al procesar el documento. Por favor, inténtalo de nuevo."
-        )
-        return None
-
-
-def extract_text_from_pdf(file_bytes: bytearray) -> str:
-    """Extract text content from PDF file"""
-    try:
-        pdf_file = io.BytesIO(file_bytes)
-        reader = PyPDF2.PdfReader(pdf_file)
-        text_content = []
-
-        for page_num, page in enumerate(reader.pages):
+            # Extract text based on file type, in the document process pool
             try:
-                page_text = page.extract_text()
-                if page_text:
-                    text_content.append(page_text)
-                logger.debug(
-                    f"Página {page_num + 1} procesada: {len(page_text)} caracteres"
+                if progress:
+                    progress.stage("PROCESSING")
+                extracted = await extract_document_text(
+                    document_path,
+                    SUPPORTED_DOCUMENT_TYPES[document.mime_type],
+                    char_budget=char_budget,
                 )
-            except Exception as e:
-                logger.warning(f"Error al procesar página {page_num + 1}: {e}")
-                continue
+                text_content = extracted.text
 
-        full_text = "\n\n".join(text_content)
-        if not full_text.strip():
-            raise ValueError("No se pudo extraer texto del PDF")
-
-        return full_text
-    except Exception as e:
-        logger.error(f"Error extracting text from PDF: {e}", exc_info=True)
-        raise
-
-
-def extract_text_from_docx(file_bytes: bytearray) -> str:
-    """Extract text content from DOCX file"""
-    try:
-        docx_file = io.BytesIO(file_bytes)
-        doc = Document(docx_file)
-        text_content = []
+                if not text_content or not text_content.strip():
+                    logger.error("No se pudo extraer texto del documento")
+                    await message.reply_text(
+                        "No pude extraer texto de este documento. ¿Podrías verificar que no esté vacío o dañado?"
+                    )
+                    return None
 
-        # Procesar párrafos
-        for i, paragraph in enumerate(doc.paragraphs):
-            try:
-                if paragraph.text.strip():
-                    text_content.append(paragraph.text)
-                logger.debug(
-                    f"Párrafo {i + 1} procesado: {len(paragraph.text)} caracteres"
+                logger.info(
+                    f"Texto extraído exitosamente, longitud: {len(text_content)} caracteres "
+                    f"(presupuesto: {char_budget}, truncado: {extracted.truncated})"
                 )
-            except Exception as e:
-                logger.warning(f"Error al procesar párrafo {i + 1}: {e}")
-                continue
+                return extracted
 
-        # Procesar tablas
-        for i, table in enumerate(doc.tables):
-            try:
-                for row in table.rows:
-                    row_text = " | ".join(
-                        cell.text.strip() for cell in row.cells if cell.text.strip()
-                    )
-                    if row_text:
-                        text_content.append(row_text)
-                logger.debug(f"Tabla {i + 1} procesada")
+            except asyncio.TimeoutError:
+                logger.error("Timeout extrayendo texto del documento")
+                await message.reply_text(
+                    "El documento está tardando demasiado en procesarse. ¿Podrías intentar con un archivo más pequeño?"
+                )
+                return None
             except Exception as e:
-                logger.warning(f"Error al procesar tabla {i + 1}: {e}")
-                continue
-
-        full_text = "\n\n".join(text_content)
-        if not full_text.strip():
-            raise ValueError("No se pudo extraer texto del documento DOCX")
+                error_msg = f"Error extrayendo texto del documento: {str(e)}"
+                logger.error(error_msg, exc_info=True)
+                await message.reply_text(
+                    "Hubo un problema al procesar el documento. ¿Podrías intentar con otro archivo?"
+                )
+                return None
 
-        logger.info(
-            f"DOCX procesado exitosamente. Texto extraído: {len(full_text)} caracteres"
+    except ScratchQuotaExceeded as e:
+        logger.warning(f"Documento rechazado por falta de espacio temporal: {e}")
+        await message.reply_text(
+            "Ahora mismo estoy procesando demasiados archivos. Inténtalo de nuevo en unos minutos."
         )
-        return full_text
-
+        return None
     except Exception as e:
-        logger.error(f"Error extracting text from DOCX: {e}", exc_info=True)
-        raise ValueError("No se pudo extraer contenido del documento DOCX")
+        logger.error(f"Error en document handler: {str(e)}", exc_info=True)
+        await message.reply_text(
+            "Ocurrió un error inesperado al procesar el documento. Por favor, inténtalo de nuevo."
+        )
+        return None
+
@@ -1,157 +1,50 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from telegram.error import TelegramError, BadRequest, TimedOut, NetworkError, RetryAfter
+from telegram.error import TelegramError, BadRequest, TimedOut, NetworkError
 from ..utils.logger import logger
-from ..services import db_service
 from ..constants import USER_ERROR_MESSAGES
+from ..services.error_tracker import error_tracker
 from ..utils.admin_notifications import notify_admins_critical, notify_admins_warning
-import traceback
-import sys
 
 logger = logger.get_logger(__name__)
 
 async def notify_admins(context: ContextTypes.DEFAULT_TYPE, message: str):
-    """Notify all admin users about an error."""
-    admin_users = await db_service.get_admin_users()
-    for admin_id in admin_users:
-        try:
-            await context.bot.send_message(chat_id=admin_id, text=message)
-        except Exception as e:
-            logger.error(f"Failed to notify admin {admin_id}: {e}")
+    """Notify all admin users about an error (delivered in the background)."""
+    await notify_admins_critical(context, "Bot Error", message)
 
-async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle errors in the telegram bot with detailed error categorization"""
-
-    # Get current system exception
-    exc_info = sys.exc_info()
-
-    # Extract basic info for logging
-    error_type = type(context.error).__name__
-    error_message = str(context.error)
-    user_id = getattr(update, 'effective_user', {}).id if hasattr(update, 'effective_user') and update.effective_user else 'Unknown'
-    chat_id = getattr(update, 'effective_chat', {}).id if hasattr(update, 'effective_chat') and update.effective_chat else 'Unknown'
-
-    logger.error(f"=== ERROR HANDLER TRIGGERED ===")
-    logger.error(f"Error Type: {error_type}")
-    logger.error(f"Error Message: {error_message}")
-    logger.error(f"User ID: {user_id}, Chat ID: {chat_id}")
-
-    # Log complete error information
-    logger.error(
-        "\n=== Detailed Error Information ===\n"
-        f"Error Type: {error_type}\n"
-        f"Error Message: {error_message}\n"
-        f"Update: {update}\n"
-        f"Chat Data: {context.chat_data}\n"
-        f"User Data: {context.user_data}\n"
-        f"=== Full Traceback ===\n"
-        f"{''.join(traceback.format_tb(exc_info[2]))}\n"
-        "=========================================="
-    )
-
-    error = context.error
+async def _reply_error(update: object, text: str) -> None:
+    message = update.effective_message if isinstance(update, Update) else None
+    if message is None:
+        return
     try:
-        raise error
-    except BadRequest as e:
-        error_message = f"❌ Solicitud incorrecta: {e}"
-        logger.error(f"BadRequest Error:\n"
-                    f"Error: {str(e)}\n"
-                    f"Update: {update}\n"
-                    f"Context: {context}")
-        if update and hasattr(update, "effective_message"):
-            await update.effective_message.reply_text(
-                USER_ERROR_MESSAGES["INVALID_REQUEST"]
-            )
-
-    except TimedOut as e:
-        error_message = f"⌛ Tiempo de espera agotado: {e}"
-        logger.warning(f"Timeout Error:\n"
-                      f"Error: {str(e)}\n"
-                      f"Update: {update}\n"
-                      f"Context: {context}")
-        if update and hasattr(update, "effective_message"):
-            await update.effective_message.reply_text(
-                USER_ERROR_MESSAGES["TIMEOUT_ERROR"]
-            )
-
-    except NetworkError as e:
-        error_message = f"🌐 Error de red: {e}"
-        logger.error(f"Network Error:\n"
-                    f"Error: {str(e)}\n"
-                    f"Update: {update}\n"
-                    f"Context: {context}")
-        await notify_admins_critical(context, "Network Error", str(e), user_id, chat_id)
+        await message.reply_text(text)
+    except TelegramError as e:
+        logger.warning(f"Could not send error message to chat {message.chat_id}: {e}")
 
-    except Exception as e:
-        # Log detailed error information
-        logger.critical(
-            "\n=== Critical Error ===\n"
-            f"Error Type: {type(e).__name__}\n"
-            f"Error Message: {str(e)}\n"
-            f"Update: {update}\n"
-            f"Chat Data: {context.chat_data}\n"
-            f"User Data: {context.user_data}\n"
-            f"=== Stack Trace ===\n"
-            f"{''.join(traceback.format_tb(exc_info[2]))}\n"
-            "===================="
-        )
-
-        if update and hasattr(update, "effective_message"):
-            await update.effective_message.reply_text(
-                USER_ERROR_MESSAGES["GENERAL_ERROR"]
-            )
-
-    finally:
-        # Log detailed context information
-        context_info = {
-            "update": update,
-            "error": context.error,
-            "chat_data": context.chat_data,
-            "user_data": context.user_data,
-            "bot_data": context.bot_data
-        }
-
-        logger.info("\n=== Context Information ===")
-        for key, value in context_info.items():
-            logger.info(f"{key}: {value}")
-
-        # Log user information if available
-        if update and hasattr(update, "effective_user"):
-            user = update.effective_user
-            logger.info(
-                "\n=== User Information ===\n"
-                f"User ID: {user.id}\n"
-                f"Username: {user.username}\n"
-                f"First Name: {user.first_name}\n"
-                f"Last Name: {user.last_name}\n"
-                f"Language Code: {user.language_code}"
-            )
-
-        # Log chat information if available
-        if update and hasattr(update, "effective_chat"):
-            chat = update.effective_chat
-            logger.info(
-                "\n=== Chat Information ===\n"
-                f"Chat ID: {chat.id}\n"
-                f"Chat Type: {chat.type}\n"
-                f"Chat Title: {chat.title}"
-            )
-
-        # Log message information if available
-        if update and hasattr(update, "effective_message"):
-            message = update.effective_message
-            logger.info(
-                "\n=== Message Information ===\n"
-                f"Message ID: {message.message_id}\n"
-                f"Date: {message.date}\n"
-                f"Text: {message.text}\n"
-                f"Caption: {message.caption}"
-            )
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle errors in the telegram bot with detailed error categorization.
 
-        # Notify admins with detailed error information
-        error_details = (
-            f"Type: {type(context.error).__name__}\n"
-            f"Message: {str(context.error)}\n"
-            f"Update: {str(update)[:500]}..."
-        )
-        await notify_admins_critical(context, "Unhandled Exception", error_details, user_id, chat_id)
+    Each exception is captured once by error_tracker (fingerprint, stage, ids
+    and a truncated payload); repeated fingerprints are only logged sampled.
+    """
+    error = context.error
+    event = error_tracker.capture(error, update)
+    details = (
+        f"[{event['fingerprint']}] {event['stage']}\n"
+        f"Type: {event['error_type']}\n"
+        f"Message: {event['message']}"
+    )
+    user_id = event["user_id"]
+    chat_id = event["chat_id"]
+
+    if isinstance(error, BadRequest):
+        await _reply_error(update, USER_ERROR_MESSAGES["INVALID_REQUEST"])
+        await notify_admins_warning(context, "Bad Request", details, user_id, chat_id)
+    elif isinstance(error, TimedOut):
+        await _reply_error(update, USER_ERROR_MESSAGES["TIMEOUT_ERROR"])
+        await notify_admins_warning(context, "Timeout Error", details, user_id, chat_id)
+    elif isinstance(error, NetworkError):
+        await notify_admins_critical(context, "Network Error", details, user_id, chat_id)
+    else:
+        await _reply_error(update, USER_ERROR_MESSAGES["GENERAL_ERROR"])
+        await notify_admins_critical(context, "Unhandled Exception", details, user_id, chat_id)
@@ -1,23 +1,40 @@
-import tempfile
-import contextlib
-from pathlib import Path
+from typing import Optional
 from telegram import Message
 from telegram.ext import CallbackContext
 from bot.services import openai_service
-from bot.utils.media_utils import compress_audio, extract_audio, get_file_size
+from bot.utils.media_utils import (
+    compress_audio,
+    extract_audio,
+    get_file_size,
+    log_speech_times,
+    remove_silences,
+)
+from bot.services.scratch_service import (
+    scratch_service,
+    estimate_media_bytes,
+    ScratchQuotaExceeded,
+)
 from bot.utils.constants import MAX_FILE_SIZE
+from bot.utils.progress_reporter import ProgressReporter
 from bot.utils.logger import logger
+from bot.config import config
 
 logger = logger.get_logger(__name__)
 
 
-async def video_handler(message: Message, context: CallbackContext) -> None:
+async def video_handler(
+    message: Message,
+    context: CallbackContext,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
     """
     Handle video and video note transcription requests.
 
     Args:
         message: Telegram message containing video or video note
         context: Callback context
+        progress: Optional reporter notified as each stage starts; without it
+            a separate "processing" reply is sent
     """
     logger.debug(f"=== VIDEO HANDLER STARTED ===")
 
@@ -28,6 +45,9 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
         file_size = (
             message.video_note.file_size if is_video_note else message.video.file_size
         )
+        duration = (
+            message.video_note.duration if is_video_note else message.video.duration
+        )
 
         user_id = message.from_user.id
         video_type = "video_note" if is_video_note else "video"
@@ -47,39 +67,31 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
             )
             return None
 
-        await message.reply_text("Procesando el video, por favor espera...")
-
-        # Create temporary files with context management
-        temp_files = []
-        with contextlib.ExitStack() as stack:
-            temp_file = stack.enter_context(
-                tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            )
-            audio_file = stack.enter_context(
-                tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            )
-            compressed_file = stack.enter_context(
-                tempfile.NamedTemporaryFile(delete=False, suffix=".ogg")
-            )
+        if not progress:
+            await message.reply_text("Procesando el video, por favor espera...")
 
-            temp_files.extend(
-                [
-                    Path(temp_file.name),
-                    Path(audio_file.name),
-                    Path(compressed_file.name),
-                ]
-            )
+        # Per-job scratch directory, removed with everything in it on exit
+        reserve_bytes = estimate_media_bytes(
+            file_size, duration, decoded_copies=2 if config.VAD_ENABLED else 1
+        )
+        async with scratch_service.job(reserve_bytes, video_type) as job:
+            video_path = job.file("input.mp4")
+            audio_path = job.file("audio.wav")
+            compressed_path = job.file("compressed.ogg")
+            speech_path = job.file("speech.wav")
 
             # Get video file from Telegram
             try:
+                if progress:
+                    progress.stage("DOWNLOADING")
                 file = await context.bot.get_file(file_id)
-                logging.info(f"Retrieved file info: {file.file_path}")
-                await file.download_to_drive(custom_path=temp_file.name)
-                logging.info(
-                    f"Video downloaded successfully, size: {get_file_size(temp_file.name)}"
+                logger.info(f"Retrieved file info: {file.file_path}")
+                await file.download_to_drive(custom_path=video_path)
+                logger.info(
+                    f"Video downloaded successfully, size: {get_file_size(video_path)}"
                 )
             except Exception as e:
-                logging.error(f"Error downloading video: {str(e)}", exc_info=True)
+                logger.error(f"Error downloading video: {str(e)}", exc_info=True)
                 await message.reply_text(
                     "Hubo un problema al descargar el video. Por favor, inténtalo de nuevo."
                 )
@@ -87,14 +99,24 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
 
             try:
                 # Extract and process audio
-                await extract_audio(temp_file.name, audio_file.name)
-                logging.info(f"Audio extracted, size: {get_file_size(audio_file.name)}")
-                await compress_audio(audio_file.name, compressed_file.name)
-                logging.info(
-                    f"Audio compressed, size: {get_file_size(compressed_file.name)}"
+                if progress:
+                    progress.stage("PROCESSING")
+                await extract_audio(video_path, audio_path)
+                logger.info(f"Audio extracted, size: {get_file_size(audio_path)}")
+
+                source_path = audio_path
+                timeline = None
+                if config.VAD_ENABLED:
+                    timeline = await remove_silences(audio_path, speech_path)
+                    if timeline is not None:
+                        source_path = speech_path
+
+                await compress_audio(source_path, compressed_path)
+                logger.info(
+                    f"Audio compressed, size: {get_file_size(compressed_path)}"
                 )
             except Exception as e:
-                logging.error(
+                logger.error(
                     f"Error processing audio from video: {str(e)}", exc_info=True
                 )
                 await message.reply_text(
@@ -104,31 +126,33 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
 
             try:
                 # Transcribe audio
-                logging.info("Starting transcription process")
-                transcription = await openai_service.transcribe_audio(
-                    compressed_file.name
+                logger.info("Starting transcription process")
+                if progress:
+                    progress.stage("TRANSCRIBING")
+                transcription, segments = await openai_service.transcribe_audio_segments(
+                    compressed_path
                 )
-                logging.info(
+                log_speech_times(timeline, segments)
+                logger.info(
                     f"Transcription completed, length: {len(transcription)} chars"
                 )
                 return transcription
             except Exception as e:
-                logging.error(f"Error transcribing audio: {str(e)}", exc_info=True)
+                logger.error(f"Error transcribing audio: {str(e)}", exc_info=True)
                 await message.reply_text(
                     "No pude transcribir el audio del video. Por favor, inténtalo de nuevo."
                 )
                 return None
 
+    except ScratchQuotaExceeded as e:
+        logger.warning(f"Video job rejected: {e}")
+        await message.reply_text(
+            "Ahora mismo estoy procesando demasiados archivos. Inténtalo de nuevo en unos minutos."
+        )
+        return None
     except Exception as e:
-        logging.error(f"Error in video handler: {str(e)}", exc_info=True)
+        logger.error(f"Error in video handler: {str(e)}", exc_info=True)
         await message.reply_text(
             "Ocurrió un error inesperado al procesar el video. Por favor, inténtalo de nuevo."
         )
         return None
-
-    finally:
-        # Clean up temporary files
-        for file_path in temp_files:
-            if file_path.exists():
-                with contextlib.suppress(OSError):
-                    file_path.unlink()
@@ -1,14 +1,14 @@
-import re
+import asyncio
 from telegram import Update
 from telegram.ext import CallbackContext
 from youtube_transcript_api import (
-    YouTubeTranscriptApi,
     NoTranscriptFound,
     VideoUnavailable,
 )
 from typing import Optional
 
-from bot.utils.constants import YOUTUBE_REGEX
+from bot.services.youtube_transcript_service import youtube_transcript_service
+from bot.utils.constants import YOUTUBE_VIDEO_ID_REGEX
 from bot.utils.logger import logger
 
 logger = logger.get_logger(__name__)
@@ -45,29 +45,12 @@ async def youtube_handler(
     logger.info(f"Processing YouTube video {video_id} for user {user_id}")
 
     try:
-        # Get available transcripts
-        logger.debug(f"Requesting transcript list for video {video_id}")
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        available_languages = [t.language_code for t in transcript_list]
-        logger.info(f"Available transcripts for video {video_id}: {available_languages}")
-
-        # Try to get English transcript first, fall back to first available
-        transcript = next(
-            (t for t in transcript_list if t.language_code == "en"),
-            next(iter(transcript_list)),
+        selected_language, transcription = await youtube_transcript_service.get_transcript(
+            video_id, language="en"
         )
-        selected_language = transcript.language_code
         logger.info(f"Selected transcript language: {selected_language}")
 
-        # Fetch and process transcript
-        logger.debug(f"Fetching transcript data for language: {selected_language}")
-        transcript_data = transcript.fetch()
-        transcript_entries = len(transcript_data)
-        logger.debug(f"Retrieved {transcript_entries} transcript entries")
-
-        transcription = " ".join([entry.text for entry in transcript_data])
         transcription_length = len(transcription)
-
         logger.info(f"Transcription fetched successfully, length: {transcription_length} chars")
         logger.debug(f"Transcription preview: {transcription[:200]}...")
 
@@ -78,6 +61,11 @@ async def youtube_handler(
         await update.message.chat.send_message(
             "El video no tiene subtítulos disponibles."
         )
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out fetching transcript for video {video_id}")
+        await update.message.chat.send_message(
+            "YouTube está tardando demasiado en responder. Inténtalo de nuevo en un rato."
+        )
     except VideoUnavailable:
         logger.error(f"Video {video_id} is unavailable")
         await update.message.chat.send_message(
@@ -93,9 +81,9 @@ async def youtube_handler(
     return None
 
 
-def extract_video_id(youtube_url):
-    # Extract the video ID from a YouTube URL using regex.
-    video_id_match = YOUTUBE_REGEX.search(youtube_url)
-    if video_id_match:
-        return re.search(r"([\w\-]{11})", youtube_url).group(1)
-    return None
\ No newline at end of file
+def extract_video_id(youtube_url: str) -> Optional[str]:
+    """Extract the 11-character video ID from any supported YouTube URL form."""
+    if not youtube_url:
+        return None
+    video_id_match = YOUTUBE_VIDEO_ID_REGEX.search(youtube_url)
+    return video_id_match.group(1) if video_id_match else None
@@ -1,16 +1,33 @@
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timedelta
 import pytz
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
+from bot.config import config as app_config
 from bot.services.database_service import db_service
+from bot.services.metrics_service import metrics_service
 from bot.services.openai_service import openai_service
-from bot.utils.format_utils import format_recent_messages
+from bot.services.usage_service import usage_scope
+from bot.utils.format_utils import format_recent_messages, append_model_info
 from bot.utils.logger import logger
 from bot.services.message_service import message_service
-from bot.utils.constants import MAX_RECENT_MESSAGES
+from bot.utils.constants import (
+    MAX_RECENT_MESSAGES,
+    PRIORITY_BROADCAST,
+    DAILY_SUMMARY_JITTER_WINDOW_SECONDS,
+    DAILY_SUMMARY_MAX_ATTEMPTS,
+    DAILY_SUMMARY_RETRY_BASE_SECONDS,
+    DAILY_SUMMARY_STALE_RUN_SECONDS,
+    DAILY_PRESUMMARY_MIN_MESSAGES,
+)
 from bot.constants import USER_ERROR_MESSAGES
 
 logger = logger.get_logger(__name__)
 
+# Timed parts of one daily summary, in order
+DAILY_SUMMARY_PHASES = ("fetch", "format", "llm", "send", "cleanup")
+
 
 async def get_yesterdays_messages(chat_id: int) -> List[Dict]:
     """
@@ -35,7 +52,7 @@ async def get_yesterdays_messages(chat_id: int) -> List[Dict]:
 
         # Get messages
         query = """
-            SELECT m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+            SELECT m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
                    u.user_id, u.first_name, u.last_name, u.username
             FROM telegram_message m
             JOIN telegram_user u ON m.user_id = u.user_id
@@ -76,23 +93,18 @@ async def generate_daily_summary(chat_id: int) -> str:
             else "chat_short"
         )
 
-        # Generate summary
-        summary = await openai_service.get_summary(
-            content=formatted_messages,
-            summary_type=summary_type,
-            summary_config={"language": "Spanish"},
-        )
-
         # Add header to summary
         madrid_tz = pytz.timezone("Europe/Madrid")
         yesterday = (datetime.now(madrid_tz) - timedelta(days=1)).strftime("%d/%m/%Y")
 
-        # Add model info if available  
-        model_info = ""
-        if hasattr(openai_service, 'last_used_model') and openai_service.last_used_model:
-            model_info = f"\n\n_Generado con {openai_service.last_used_model}_"
-            
-        final_summary = f"📅 **Resumen del día {yesterday}**\n\n{summary}{model_info}"
+        # Generate summary (and add model info if available)
+        with usage_scope(chat_id=chat_id, summary_type="daily_summary"):
+            summary = await openai_service.get_summary(
+                content=formatted_messages,
+                summary_type=summary_type,
+                summary_config={"language": "Spanish"},
+            )
+            final_summary = append_model_info(f"📅 **Resumen del día {yesterday}**\n\n{summary}")
 
         return final_summary
     except Exception as e:
@@ -104,93 +116,453 @@ async def generate_daily_summary(chat_id: int) -> str:
         return error_msg
 
 
-async def send_daily_summary_for(chat_id: int):
-    """Generate and send a daily summary for a specific chat.
+async def _generate_and_send(chat_id: int, phases: Dict[str, float]) -> str:
+    """Generate and send the daily summary of one chat.
 
     Args:
-        chat_id: The chat ID to summarize
-    """
-    logger.info(f"=== TRIGGERED DAILY SUMMARY FOR CHAT {chat_id} ===")
-    logger.debug(f"=== DAILY SUMMARY FOR CHAT {chat_id} STARTED ===")
+        chat_id: The chat ID
+        phases: Filled with the seconds spent in each of DAILY_SUMMARY_PHASES
 
-    try:
-        logger.info(
-            f"Generating daily summary for chat {chat_id}"
-        )  # Get chat configuration
-        logger.debug("Retrieving chat summary configuration...")
-        config = await db_service.get_chat_summary_config(chat_id)
-        logger.debug(f"Chat config: {config}")
-
-        # Get recent messages (up to MAX_RECENT_MESSAGES)
-        logger.debug(f"Retrieving recent messages (up to {MAX_RECENT_MESSAGES})...")
-        messages = await db_service.get_recent_messages(
-            chat_id, limit=MAX_RECENT_MESSAGES
-        )
-        messages_count = len(messages)
+    Returns:
+        "sent", or "skipped" when there are not enough messages
 
+    Raises:
+        Exception: on failures before any part of the summary was delivered,
+            so the executor can retry without posting it twice
+    """
+    logger.info(f"Generating daily summary for chat {chat_id}")
+    mark = time.monotonic()
+    config = await db_service.get_chat_summary_config(chat_id)
+    logger.debug(f"Chat config: {config}")
+
+    # Get recent messages (up to MAX_RECENT_MESSAGES)
+    messages = await db_service.get_recent_messages(chat_id, limit=MAX_RECENT_MESSAGES)
+    messages_count = len(messages)
+    mark = _end_phase(phases, "fetch", mark)
+    logger.info(f"Found {messages_count} total messages for chat {chat_id} daily summary.")
+
+    # Check if there are enough messages to summarize
+    if messages_count < 5:
         logger.info(
-            f"Found {messages_count} total messages for chat {chat_id} daily summary."
+            f"Skipping summary for chat {chat_id}: not enough messages ({messages_count})."
         )
+        return "skipped"
 
-        # Check if there are enough messages to summarize
-        if messages_count < 5:
-            logger.info(
-                f"Skipping summary for chat {chat_id}: not enough messages ({messages_count})."
-            )
-            return
-
-        # Format messages for the AI
-        logger.debug("Formatting messages for AI processing...")
+    # Format messages for the AI (or combine the partial summaries made during the day)
+    if app_config.DAILY_PRESUMMARY_ENABLED:
+        formatted_content = await _digest_content(chat_id, messages)
+    else:
         formatted_content = format_recent_messages(messages)
-        formatted_length = len(formatted_content)
-        logger.debug(f"Formatted content length: {formatted_length} chars")
+    mark = _end_phase(phases, "format", mark)
+    logger.debug(f"Formatted content length: {len(formatted_content)} chars")
 
-        # Generate summary using custom configuration
-        logger.debug("Calling OpenAI service for summary generation...")
+    # Generate summary using custom configuration
+    with usage_scope(chat_id=chat_id, summary_type="daily_summary"):
         summary = await openai_service.get_summary(
             content=formatted_content,
             summary_type="chat",  # El tipo genérico de chat
             summary_config=config,  # Le pasamos toda la configuración
         )
+        mark = _end_phase(phases, "llm", mark)
+        logger.debug(f"Generated summary length: {len(summary)} chars")
 
-        summary_length = len(summary)
-        logger.debug(f"Generated summary length: {summary_length} chars")
-
-        # Add header to summary
+        # Add header to summary (and model info if available)
         madrid_tz = pytz.timezone("Europe/Madrid")
         yesterday = (datetime.now(madrid_tz) - timedelta(days=1)).strftime("%d/%m/%Y")
-        logger.debug(f"Adding header for date: {yesterday}")
-
-        # Add model info if available
-        model_info = ""
-        if hasattr(openai_service, 'last_used_model') and openai_service.last_used_model:
-            model_info = f"\n\n_Generado con {openai_service.last_used_model}_"
-            
-        final_summary = f"📅 **Resumen del día {yesterday}**\n\n{summary}{model_info}"
-        final_length = len(final_summary)
-        logger.debug(
-            f"Final summary length: {final_length} chars"
-        )  # Send the summary to the chat
-        logger.debug("Sending summary to chat...")
-        success = await message_service.send_message(
-            chat_id=chat_id, text=final_summary, parse_mode="Markdown"
+        final_summary = append_model_info(f"📅 **Resumen del día {yesterday}**\n\n{summary}")
+
+    sent_parts, total_parts = await message_service.send_parts(
+        chat_id=chat_id,
+        text=final_summary,
+        parse_mode="Markdown",
+        priority=PRIORITY_BROADCAST,
+    )
+    mark = _end_phase(phases, "send", mark)
+    if not sent_parts:
+        # Nothing reached the chat, so a retry cannot duplicate anything
+        raise RuntimeError(f"Could not send daily summary to chat {chat_id}")
+    if sent_parts < total_parts:
+        # Retrying would repeat the parts already in the chat
+        logger.error(
+            f"Daily summary for chat {chat_id} only partly delivered "
+            f"({sent_parts}/{total_parts} parts); not retrying"
         )
 
-        if success:
-            logger.info(
-                f"=== DAILY SUMMARY COMPLETED SUCCESSFULLY FOR CHAT {chat_id} ==="
+    # From here on the summary counts as sent: cleanup failures are only logged
+    logger.info(f"Triggering post-summary message cleanup for chat {chat_id}")
+    try:
+        await db_service.cleanup_chat_messages(chat_id)
+        await db_service.prune_daily_summary_partials(chat_id)
+    except Exception as e:
+        logger.error(f"Post-summary cleanup failed for chat {chat_id}: {e}", exc_info=True)
+    _end_phase(phases, "cleanup", mark)
+    return "sent"
+
+
+def _end_phase(phases: Dict[str, float], phase: str, started: float) -> float:
+    """Record the seconds since `started` for a phase and return the current time."""
+    now = time.monotonic()
+    phases[phase] = now - started
+    return now
+
+
+async def _digest_content(chat_id: int, messages: List[Dict]) -> str:
+    """Content for the daily summary: the partial summaries stored for these
+    messages, plus the messages no partial covers yet (formatted as usual)."""
+    partials = await db_service.get_daily_summary_partials(
+        chat_id, messages[0]["telegram_message_id"], messages[-1]["telegram_message_id"]
+    )
+    if not partials:
+        return format_recent_messages(messages)
+
+    covered_from = partials[0]["first_message_id"]
+    covered_to = partials[-1]["last_message_id"]
+    uncovered = [
+        m for m in messages if not covered_from <= m["telegram_message_id"] <= covered_to
+    ]
+    daily_summary_executor.partials_used += len(partials)
+    logger.info(
+        f"Daily summary for chat {chat_id} combines {len(partials)} partial summaries "
+        f"and {len(uncovered)} messages"
+    )
+
+    content = (
+        "La conversación se ha ido resumiendo por partes a lo largo del día. "
+        "Por favor, crea un único resumen cohesivo de toda la conversación que integre "
+        "los resúmenes parciales"
+        + (" y los mensajes que aún no estaban resumidos" if uncovered else "")
+        + ".\n\nResúmenes parciales:\n"
+        + "\n\n".join(
+            f"Parte {i} ({partial['message_count']} mensajes):\n{partial['summary']}"
+            for i, partial in enumerate(partials, 1)
+        )
+    )
+    if uncovered:
+        content += "\n\nMensajes sin resumir:\n" + format_recent_messages(uncovered)
+    return content
+
+
+async def _presummarize_chat(chat_id: int) -> bool:
+    """Store a partial summary of the chat's messages not covered by one yet.
+
+    Only messages the next daily summary will include (the latest
+    MAX_RECENT_MESSAGES) are considered.
+
+    Returns:
+        Whether a partial summary was stored
+    """
+    last_id = await db_service.get_last_partial_message_id(chat_id) or 0
+    messages = await db_service.get_recent_messages(chat_id, limit=MAX_RECENT_MESSAGES)
+    new_messages = [m for m in messages if m["telegram_message_id"] > last_id]
+    if len(new_messages) < DAILY_PRESUMMARY_MIN_MESSAGES:
+        return False
+
+    config = await db_service.get_chat_summary_config(chat_id)
+    # Detailed partials, so the final summary does not lose what it has to condense
+    with usage_scope(chat_id=chat_id, summary_type="daily_presummary"):
+        summary = await openai_service.get_summary(
+            content=format_recent_messages(new_messages),
+            summary_type="chat",
+            summary_config={**config, "length": "long"},
+        )
+    await db_service.add_daily_summary_partial(
+        chat_id,
+        new_messages[0]["telegram_message_id"],
+        new_messages[-1]["telegram_message_id"],
+        len(new_messages),
+        summary,
+    )
+    daily_summary_executor.partials_created += 1
+    logger.info(f"Stored partial summary of {len(new_messages)} messages for chat {chat_id}")
+    return True
+
+
+def daily_summary_offset(chat_id: int) -> int:
+    """Seconds after the configured hour at which a chat's summary runs.
+
+    Deterministic per chat, so the schedule is stable across restarts,
+    and spread over DAILY_SUMMARY_JITTER_WINDOW_SECONDS so the chats of
+    the same hour do not all start in the same second.
+    """
+    digest = hashlib.sha1(str(chat_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % DAILY_SUMMARY_JITTER_WINDOW_SECONDS
+
+
+class _DailySummaryRun:
+    """Outcomes of the daily summaries scheduled for one day and hour."""
+
+    def __init__(self, key: str, expected: Set[int]):
+        self.key = key
+        self.expected = expected
+        self.started_at = time.time()
+        # chat_id -> {"status", "attempts", "seconds", "phases", "error"}
+        self.results: Dict[int, Dict] = {}
+        self.reported = False
+
+    def finished(self) -> bool:
+        return self.expected.issubset(self.results)
+
+
+class DailySummaryExecutor:
+    """Runs the per-chat daily summary jobs with bounded concurrency.
+
+    - Each chat's cron job fires at its own offset inside the hour.
+    - At most config.DAILY_SUMMARY_CONCURRENCY summaries run at once.
+    - A failed summary is rescheduled for a later slot with exponential
+      backoff, up to DAILY_SUMMARY_MAX_ATTEMPTS.
+    - When every chat of an hour has a final outcome, a run report with
+      successes, failures and durations is logged (and sent to the admins
+      when something failed).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._semaphore: Optional[asyncio.Semaphore] = None
+            self._runs: Dict[str, _DailySummaryRun] = {}
+            self.running = 0
+            self.waiting = 0
+            self.sent = 0
+            self.skipped = 0
+            self.failed = 0
+            self.retries_scheduled = 0
+            self.partials_created = 0
+            self.partials_used = 0
+            # Seconds spent per phase over all summaries, and how many were timed
+            self.phase_seconds: Dict[str, float] = {phase: 0.0 for phase in DAILY_SUMMARY_PHASES}
+            self.phase_runs: Dict[str, int] = {phase: 0 for phase in DAILY_SUMMARY_PHASES}
+            self.last_report: Optional[str] = None
+            metrics_service.register_source("daily_summaries", self.get_metrics)
+            self.initialized = True
+
+    async def _get_run(self, chat_id: int) -> _DailySummaryRun:
+        chat_config = await db_service.get_chat_summary_config(chat_id)
+        hour = chat_config.get("daily_summary_hour", "off")
+        today = datetime.now(pytz.timezone("Europe/Madrid")).date().isoformat()
+        key = f"{today} {hour}:00"
+        if key not in self._runs:
+            expected = set(await db_service.get_daily_summary_chat_ids(hour)) if hour != "off" else set()
+            # Another chat of the same hour may have created the run meanwhile
+            self._runs.setdefault(key, _DailySummaryRun(key, expected))
+        run = self._runs[key]
+        run.expected.add(chat_id)
+        return run
+
+    async def run(self, chat_id: int, attempt: int = 1, run_key: Optional[str] = None) -> str:
+        """Generate and send one chat's summary, retrying later on failure.
+
+        Returns:
+            "sent", "skipped", "failed" or "retrying"
+        """
+        run = self._runs.get(run_key) if run_key else None
+        if run is None:
+            run = await self._get_run(chat_id)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, app_config.DAILY_SUMMARY_CONCURRENCY))
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.monotonic()
+        error = None
+        status = "failed"
+        phases: Dict[str, float] = {}
+        try:
+            status = await _generate_and_send(chat_id, phases)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(
+                f"Daily summary for chat {chat_id} failed (attempt {attempt}): {e}", exc_info=True
+            )
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+        seconds = time.monotonic() - started
+        for phase, phase_seconds in phases.items():
+            self.phase_seconds[phase] += phase_seconds
+            self.phase_runs[phase] += 1
+
+        if error and attempt < DAILY_SUMMARY_MAX_ATTEMPTS:
+            if self._schedule_retry(chat_id, attempt + 1, run.key):
+                return "retrying"
+        self._record(run, chat_id, status, attempt, seconds, phases, error)
+        return status
+
+    def _schedule_retry(self, chat_id: int, attempt: int, run_key: str) -> bool:
+        # Import here to avoid circular imports
+        from bot.services.scheduler_service import scheduler_service
+
+        delay = DAILY_SUMMARY_RETRY_BASE_SECONDS * 2 ** (attempt - 2)
+        try:
+            scheduler_service.add_daily_summary_retry(
+                chat_id, datetime.now(pytz.UTC) + timedelta(seconds=delay), attempt, run_key
+            )
+        except Exception as e:
+            logger.error(f"Could not schedule retry for chat {chat_id}: {e}", exc_info=True)
+            return False
+        self.retries_scheduled += 1
+        logger.warning(f"Daily summary for chat {chat_id} will be retried in {delay}s (attempt {attempt})")
+        return True
+
+    def _record(
+        self, run: _DailySummaryRun, chat_id: int, status: str, attempts: int,
+        seconds: float, phases: Dict[str, float], error: Optional[str],
+    ) -> None:
+        run.results[chat_id] = {
+            "status": status, "attempts": attempts, "seconds": seconds,
+            "phases": phases, "error": error,
+        }
+        if status == "sent":
+            self.sent += 1
+        elif status == "skipped":
+            self.skipped += 1
+        else:
+            self.failed += 1
+
+        now = time.time()
+        for key, other in list(self._runs.items()):
+            stale = now - other.started_at > DAILY_SUMMARY_STALE_RUN_SECONDS
+            if not other.reported and (other.finished() or stale):
+                self._report(other)
+            if other.reported and stale:
+                del self._runs[key]
+
+    def _report(self, run: _DailySummaryRun) -> None:
+        run.reported = True
+        by_status: Dict[str, List[int]] = {"sent": [], "skipped": [], "failed": []}
+        for chat_id, result in run.results.items():
+            by_status[result["status"]].append(chat_id)
+        missing = sorted(run.expected - set(run.results))
+        durations = [r["seconds"] for r in run.results.values()]
+        retried = sum(1 for r in run.results.values() if r["attempts"] > 1)
+
+        lines = [
+            f"Daily summaries {run.key}: {len(by_status['sent'])} sent, "
+            f"{len(by_status['skipped'])} skipped, {len(by_status['failed'])} failed"
+            + (f", {len(missing)} never ran" if missing else "")
+            + f" ({retried} retried) in {(time.time() - run.started_at) / 60:.0f} min",
+        ]
+        if durations:
+            lines.append(
+                f"Duration per chat: avg {sum(durations) / len(durations):.1f}s, "
+                f"max {max(durations):.1f}s"
+            )
+            lines.append("Time per phase: " + _format_phases(
+                {
+                    phase: sum(r["phases"].get(phase, 0.0) for r in run.results.values())
+                    for phase in DAILY_SUMMARY_PHASES
+                },
+                {
+                    phase: sum(1 for r in run.results.values() if phase in r["phases"])
+                    for phase in DAILY_SUMMARY_PHASES
+                },
+            ))
+        for chat_id in by_status["failed"]:
+            result = run.results[chat_id]
+            lines.append(
+                f"Failed chat {chat_id} after {result['attempts']} attempts: {result['error']}"
             )
-            # Cleanup old messages after successful summary
-            logger.info(f"Triggering post-summary message cleanup for chat {chat_id}")
-            await db_service.cleanup_chat_messages(chat_id)
+        if missing:
+            lines.append(f"Never ran: {', '.join(str(c) for c in missing)}")
+        report = "\n".join(lines)
+        self.last_report = lines[0]
+
+        if by_status["failed"] or missing:
+            logger.warning(report)
+            # Import here to avoid circular imports
+            from bot.services.notification_service import notification_service, LEVEL_WARNING
+
+            notification_service.publish(LEVEL_WARNING, "Daily Summary Run", report)
         else:
-            logger.warning(f"Failed to send daily summary to chat {chat_id}")
+            logger.info(report)
+
+    def average_seconds(self) -> Optional[float]:
+        """Average time a summary takes once it has a slot, or None without history."""
+        if not self.phase_runs["fetch"]:
+            return None
+        return sum(self.phase_seconds.values()) / self.phase_runs["fetch"]
+
+    def get_metrics(self) -> Dict:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "retries_scheduled": self.retries_scheduled,
+            "partials_created": self.partials_created,
+            "partials_used": self.partials_used,
+            "avg_phase_seconds": _format_phases(self.phase_seconds, self.phase_runs),
+            "last_run": self.last_report or "-",
+        }
+
+
+def _format_phases(seconds: Dict[str, float], runs: Dict[str, int]) -> str:
+    """Average seconds per phase, e.g. 'fetch 0.1s, format 0.0s, llm 8.2s, ...'."""
+    return ", ".join(
+        f"{phase} {seconds[phase] / runs[phase]:.1f}s"
+        for phase in DAILY_SUMMARY_PHASES
+        if runs.get(phase)
+    ) or "-"
+
+
+daily_summary_executor = DailySummaryExecutor()
+
+
+async def send_daily_summary_for(chat_id: int):
+    """Scheduled entry point: generate and send a daily summary for a chat.
+
+    Args:
+        chat_id: The chat ID to summarize
+
+    Returns:
+        The outcome, recorded by the scheduler's job metrics
+    """
+    logger.info(f"=== TRIGGERED DAILY SUMMARY FOR CHAT {chat_id} ===")
+    return await daily_summary_executor.run(chat_id)
+
+
+async def retry_daily_summary_for(chat_id: int, attempt: int, run_key: str):
+    """Scheduled entry point for a retry of a failed daily summary."""
+    logger.info(f"=== RETRYING DAILY SUMMARY FOR CHAT {chat_id} (attempt {attempt}) ===")
+    return await daily_summary_executor.run(chat_id, attempt, run_key)
+
+
+async def presummarize_chats():
+    """Scheduled pass: store partial summaries of each chat's new messages.
+
+    Chats are processed one at a time, and the pass stops while daily
+    summaries are being generated, so it only uses idle capacity.
+    """
+    try:
+        configs = await db_service.get_all_daily_summary_configs()
+        created = 0
+        for config in configs:
+            if daily_summary_executor.running or daily_summary_executor.waiting:
+                logger.info("Pre-summarization pass stopped: daily summaries are running")
+                break
+            try:
+                if await _presummarize_chat(config["chat_id"]):
+                    created += 1
+            except Exception as e:
+                logger.error(
+                    f"Pre-summarization failed for chat {config['chat_id']}: {e}", exc_info=True
+                )
+        logger.info(f"Pre-summarization pass: {created} partial summaries for {len(configs)} chats")
 
     except Exception as e:
-        logger.error(f"=== DAILY SUMMARY FAILED FOR CHAT {chat_id} ===")
-        logger.error(
-            f"Error sending daily summary for chat {chat_id}: {e}", exc_info=True
-        )
+        logger.error(f"Error in presummarize_chats: {e}", exc_info=True)
 
 
 async def send_daily_summaries():
@@ -208,13 +580,14 @@ async def send_daily_summaries():
 
         logger.info(f"Generating daily summaries for {len(configs)} chats")
 
-        for config in configs:
-            chat_id = config["chat_id"]
-            try:
-                await send_daily_summary_for(chat_id)
-            except Exception as e:
-                logger.error(f"Error processing summary for chat {chat_id}: {e}")
-                continue
+        # The executor caps how many run at once
+        results = await asyncio.gather(
+            *(send_daily_summary_for(config["chat_id"]) for config in configs),
+            return_exceptions=True,
+        )
+        for config, result in zip(configs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing summary for chat {config['chat_id']}: {result}")
 
     except Exception as e:
         logger.error(f"Error in send_daily_summaries: {e}", exc_info=True)
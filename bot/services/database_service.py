@@ -1,7 +1,7 @@
 import aiosqlite
 from datetime import datetime
 import pytz
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta
 import pytz
 from bot.utils.constants import MAX_RECENT_MESSAGES
@@ -104,6 +104,8 @@ class DatabaseService:
                     telegram_message_id INTEGER,
                     telegram_reply_to_message_id INTEGER,
                     message_type TEXT,
+                    thread_root_id INTEGER NULL,
+                    thread_depth INTEGER NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (chat_id) REFERENCES telegram_chat_state(chat_id),
@@ -122,6 +124,13 @@ class DatabaseService:
                 END;
                 """
             )
+            # Recent messages and keyset pagination of a chat
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_telegram_message_chat_message
+                ON telegram_message (chat_id, telegram_message_id)
+                """
+            )
 
             # Add columns if they don't exist
             try:
@@ -171,6 +180,31 @@ class DatabaseService:
                     else:  # Column already exists
                         pass
 
+            # Reply graph: root message and reply depth of every message
+            message_columns_to_add = {
+                "thread_root_id": "INTEGER NULL",
+                "thread_depth": "INTEGER NULL",
+            }
+            for col_name, col_type in message_columns_to_add.items():
+                try:
+                    await self.conn.execute(
+                        f"ALTER TABLE telegram_message ADD COLUMN {col_name} {col_type}"
+                    )
+                    self.logger.info(f"Added column {col_name} to telegram_message table.")
+                except aiosqlite.OperationalError as e:
+                    if "duplicate column" not in str(e).lower():
+                        self.logger.warning(
+                            f"Could not add column {col_name} to telegram_message: {e}"
+                        )
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_telegram_message_thread
+                ON telegram_message (chat_id, thread_root_id, telegram_message_id)
+                """
+            )
+            # Every startup: a backfill interrupted before its commit leaves rows without a root
+            await self._backfill_thread_index()
+
             # Create chat_summary_config table
             await self.conn.execute(
                 """
@@ -199,6 +233,122 @@ class DatabaseService:
                 """
             )
 
+            # Durable background jobs (heavy summaries), claimed by workers with leases
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS background_job (
+                    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_type         TEXT    NOT NULL,
+                    payload          TEXT    NOT NULL,
+                    status           TEXT    NOT NULL DEFAULT 'pending',
+                    attempts         INTEGER NOT NULL DEFAULT 0,
+                    max_attempts     INTEGER NOT NULL DEFAULT 3,
+                    run_after        REAL    NOT NULL,
+                    lease_owner      TEXT    NULL,
+                    lease_expires_at REAL    NULL,
+                    last_error       TEXT    NULL,
+                    finished_at      REAL    NULL,
+                    created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_background_job_status_run_after
+                ON background_job (status, run_after)
+                """
+            )
+
+            # APScheduler jobs (daily summaries) so they survive restarts
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scheduler_job (
+                    id            TEXT PRIMARY KEY,
+                    next_run_time REAL NULL,
+                    job_state     BLOB NOT NULL
+                )
+                """
+            )
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_scheduler_job_next_run_time
+                ON scheduler_job (next_run_time)
+                """
+            )
+
+            # Leases between processes: only the holder of "daily_summaries" schedules them
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scheduler_lease (
+                    name       TEXT PRIMARY KEY,
+                    owner      TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+            # Rate-limit refunds of queued operations, recorded by the job workers and
+            # applied by the process that holds the limits (see rate_limit_service)
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_refund (
+                    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id        INTEGER NOT NULL,
+                    operation_type TEXT    NOT NULL,
+                    consumed_at    TEXT    NOT NULL,
+                    created_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+
+            # Partial summaries of consecutive message ranges, reduced by the daily summary
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_summary_partial (
+                    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id          INTEGER NOT NULL,
+                    first_message_id INTEGER NOT NULL,
+                    last_message_id  INTEGER NOT NULL,
+                    message_count    INTEGER NOT NULL,
+                    summary          TEXT    NOT NULL,
+                    created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_daily_summary_partial_chat_last
+                ON daily_summary_partial (chat_id, last_message_id)
+                """
+            )
+
+            # LLM and transcription usage, added up per day, chat, user, summary type and model
+            await self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_usage (
+                    usage_date        DATE    NOT NULL,
+                    chat_id           INTEGER NOT NULL,
+                    user_id           INTEGER NOT NULL,
+                    summary_type      TEXT    NOT NULL,
+                    model             TEXT    NOT NULL,
+                    calls             INTEGER NOT NULL DEFAULT 0,
+                    prompt_tokens     INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    total_tokens      INTEGER NOT NULL DEFAULT 0,
+                    cost              REAL    NOT NULL DEFAULT 0,
+                    latency_seconds   REAL    NOT NULL DEFAULT 0,
+                    audio_seconds     REAL    NOT NULL DEFAULT 0,
+                    PRIMARY KEY (usage_date, chat_id, user_id, summary_type, model)
+                )
+                """
+            )
+            await self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_llm_usage_chat_date
+                ON llm_usage (chat_id, usage_date)
+                """
+            )
+
             # Migration logic: transfer existing configuration from telegram_chat_state
             try:
                 # Check if there are any existing configurations to migrate
@@ -256,12 +406,7 @@ class DatabaseService:
         if not self.conn:
             raise RuntimeError("Database not initialized")
 
-        # Log query details
-        query_type = query.strip().split()[0].upper()
-        self.logger.debug(f"=== DATABASE EXECUTE: {query_type} ===")
-        self.logger.debug(f"Query: {query}")
-        self.logger.debug(f"Params: {params}")
-        self.logger.debug(f"Auto commit: {auto_commit}")
+        self.logger.debug("Execute: %s | params=%s | auto_commit=%s", query, params, auto_commit)
 
         try:
             async with self.conn.cursor() as cursor:
@@ -270,19 +415,14 @@ class DatabaseService:
 
                 if auto_commit:
                     await self.conn.commit()
-                    self.logger.debug(
-                        f"Query executed and committed. Rows affected: {rows_affected}"
-                    )
-                else:
-                    self.logger.debug(
-                        f"Query executed without commit. Rows affected: {rows_affected}"
-                    )
+                self.logger.debug(
+                    "Query executed (committed=%s). Rows affected: %s", auto_commit, rows_affected
+                )
 
         except Exception as e:
-            self.logger.error(f"Database query failed - Type: {query_type}")
-            self.logger.error(f"Query: {query}")
-            self.logger.error(f"Params: {params}")
-            self.logger.error(f"Error: {str(e)}", exc_info=True)
+            self.logger.error(
+                "Database query failed: %s\nQuery: %s\nParams: %s", e, query, params, exc_info=True
+            )
             if auto_commit:
                 await self.conn.rollback()
                 self.logger.debug("Transaction rolled back")
@@ -293,23 +433,18 @@ class DatabaseService:
         if not self.conn:
             raise RuntimeError("Database not initialized")
 
-        self.logger.debug(f"=== DATABASE FETCH_ONE ===")
-        self.logger.debug(f"Query: {query}")
-        self.logger.debug(f"Params: {params}")
+        self.logger.debug("Fetch one: %s | params=%s", query, params)
 
         try:
             async with self.conn.execute(query, params) as cursor:
                 result = await cursor.fetchone()
                 result_dict = dict(result) if result else None
-                self.logger.debug(
-                    f"Result: {'Found 1 row' if result_dict else 'No rows found'}"
-                )
+                self.logger.debug("Result: %d row(s)", 1 if result_dict else 0)
                 return result_dict
         except Exception as e:
-            self.logger.error(f"Database fetch_one failed")
-            self.logger.error(f"Query: {query}")
-            self.logger.error(f"Params: {params}")
-            self.logger.error(f"Error: {str(e)}", exc_info=True)
+            self.logger.error(
+                "Database fetch_one failed: %s\nQuery: %s\nParams: %s", e, query, params, exc_info=True
+            )
             raise
 
     async def fetch_all(self, query: str, params: tuple = ()) -> List[Dict]:
@@ -317,21 +452,18 @@ class DatabaseService:
         if not self.conn:
             raise RuntimeError("Database not initialized")
 
-        self.logger.debug(f"=== DATABASE FETCH_ALL ===")
-        self.logger.debug(f"Query: {query}")
-        self.logger.debug(f"Params: {params}")
+        self.logger.debug("Fetch all: %s | params=%s", query, params)
 
         try:
             async with self.conn.execute(query, params) as cursor:
                 rows = await cursor.fetchall()
                 result_list = [dict(row) for row in rows]
-                self.logger.debug(f"Result: Found {len(result_list)} rows")
+                self.logger.debug("Result: %d row(s)", len(result_list))
                 return result_list
         except Exception as e:
-            self.logger.error(f"Database fetch_all failed")
-            self.logger.error(f"Query: {query}")
-            self.logger.error(f"Params: {params}")
-            self.logger.error(f"Error: {str(e)}", exc_info=True)
+            self.logger.error(
+                "Database fetch_all failed: %s\nQuery: %s\nParams: %s", e, query, params, exc_info=True
+            )
             raise
 
     async def close(self):
@@ -363,7 +495,7 @@ class DatabaseService:
                 start_time_utc = start_time.astimezone(pytz.UTC)
 
                 query = """
-                    SELECT m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+                    SELECT m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
                            u.user_id, u.first_name, u.last_name, u.username, m.created_at
                     FROM telegram_message m
                     JOIN telegram_user u ON m.user_id = u.user_id
@@ -377,7 +509,7 @@ class DatabaseService:
             else:
                 # Get the most recent messages up to the limit
                 query = """
-                    SELECT m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+                    SELECT m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
                            u.user_id, u.first_name, u.last_name, u.username, m.created_at
                     FROM telegram_message m
                     JOIN telegram_user u ON m.user_id = u.user_id
@@ -394,6 +526,141 @@ class DatabaseService:
             self.logger.error(f"Error getting recent messages: {e}")
             raise
 
+    async def get_chat_messages_page(
+        self, chat_id: int, after: Optional[Tuple[int, int]], limit: int
+    ) -> List[Dict]:
+        """Next page of a chat's messages, oldest first (keyset pagination).
+
+        Pages on (telegram_message_id, id): telegram_message_id alone is not
+        unique, and rows sharing it across a page boundary would be skipped.
+
+        Args:
+            chat_id: The chat ID
+            after: (telegram_message_id, id) of the last row of the previous
+                page, or None for the first page
+            limit: Page size
+        """
+        after_message_id, after_id = after if after is not None else (-1, -1)
+        return await self.fetch_all(
+            """
+            SELECT m.id, m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+                   u.user_id, u.first_name, u.last_name, u.username, m.created_at,
+                   m.thread_root_id, m.thread_depth
+            FROM telegram_message m
+            JOIN telegram_user u ON m.user_id = u.user_id
+            WHERE m.chat_id = ? AND (m.telegram_message_id, m.id) > (?, ?)
+            ORDER BY m.telegram_message_id ASC, m.id ASC
+            LIMIT ?
+            """,
+            (chat_id, after_message_id, after_id, limit),
+        )
+
+    async def get_thread_messages(
+        self, chat_id: int, telegram_message_id: int, limit: int
+    ) -> List[Dict]:
+        """Latest messages of the thread a message belongs to, oldest first.
+
+        Args:
+            chat_id: The chat ID
+            telegram_message_id: Any message of the thread (or the unstored
+                message it replies to)
+            limit: Maximum number of messages
+        """
+        row = await self.fetch_one(
+            """
+            SELECT thread_root_id FROM telegram_message
+            WHERE chat_id = ? AND telegram_message_id = ?
+            ORDER BY id DESC
+            LIMIT 1
+            """,
+            (chat_id, telegram_message_id),
+        )
+        root_id = row["thread_root_id"] if row and row["thread_root_id"] is not None else telegram_message_id
+        messages = await self.fetch_all(
+            """
+            SELECT m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+                   u.user_id, u.first_name, u.last_name, u.username, m.created_at,
+                   m.thread_depth
+            FROM telegram_message m
+            JOIN telegram_user u ON m.user_id = u.user_id
+            WHERE m.chat_id = ? AND m.thread_root_id = ?
+            ORDER BY m.telegram_message_id DESC
+            LIMIT ?
+            """,
+            (chat_id, root_id, limit),
+        )
+        messages.reverse()
+        return messages
+
+    async def get_chat_thread_stats(self, chat_id: int) -> Dict:
+        """Threads with at least one reply, their replies and the largest thread size."""
+        row = await self.fetch_one(
+            """
+            SELECT COUNT(*) AS threads,
+                   COALESCE(SUM(replies), 0) AS replies,
+                   COALESCE(MAX(replies) + 1, 0) AS largest_thread_messages
+            FROM (
+                SELECT COUNT(*) AS replies
+                FROM telegram_message
+                WHERE chat_id = ? AND thread_depth > 0
+                GROUP BY thread_root_id
+            )
+            """,
+            (chat_id,),
+        )
+        return row
+
+    async def _backfill_thread_index(self) -> None:
+        """Set thread_root_id and thread_depth of messages that have none yet.
+
+        Those are messages stored before the columns existed. Parents that
+        already have a root (indexed by an earlier run) are read along with them.
+        """
+        rows = await self.fetch_all(
+            """
+            SELECT m.id, m.chat_id, m.telegram_message_id, m.telegram_reply_to_message_id,
+                   p.thread_root_id AS parent_root_id, p.thread_depth AS parent_depth
+            FROM telegram_message m
+            LEFT JOIN telegram_message p ON p.id = (
+                SELECT id FROM telegram_message
+                WHERE chat_id = m.chat_id
+                  AND telegram_message_id = m.telegram_reply_to_message_id
+                  AND thread_root_id IS NOT NULL
+                LIMIT 1
+            )
+            WHERE m.thread_root_id IS NULL
+            ORDER BY m.chat_id, m.telegram_message_id, m.id
+            """
+        )
+        if not rows:
+            return
+        # Replies always have higher message ids than what they answer
+        graph: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        updates = []
+        for row in rows:
+            parent = graph.get((row["chat_id"], row["telegram_reply_to_message_id"]))
+            if parent is None and row["parent_root_id"] is not None:
+                parent = (row["parent_root_id"], row["parent_depth"] or 0)
+            if parent is not None:
+                root_id, depth = parent[0], parent[1] + 1
+            elif row["telegram_reply_to_message_id"]:
+                root_id, depth = row["telegram_reply_to_message_id"], 1
+            else:
+                root_id, depth = row["telegram_message_id"], 0
+            graph[(row["chat_id"], row["telegram_message_id"])] = (root_id, depth)
+            updates.append((root_id, depth, row["id"]))
+        try:
+            await self.conn.executemany(
+                "UPDATE telegram_message SET thread_root_id = ?, thread_depth = ? WHERE id = ?",
+                updates,
+            )
+            await self.conn.commit()
+            self.logger.info(f"Reply graph built for {len(updates)} stored messages")
+        except Exception as e:
+            await self.conn.rollback()
+            self.logger.error(f"Error building the reply graph: {e}")
+            raise
+
     async def get_messages_for_date(self, chat_id: int, date) -> List[Dict]:
         """Get all messages for a specific date (00:00 - 23:59)"""
         try:
@@ -465,15 +732,32 @@ class DatabaseService:
         telegram_reply_to_message_id: Optional[int],
         message_type: str,
     ):
-        """Save a message"""
+        """Save a message with its place in the reply graph.
+
+        A reply inherits the thread root of the message it answers, one level
+        deeper. Replies to messages that were not stored (bot messages, older
+        history) start a thread rooted at that message.
+        """
         try:
             await self.execute(
                 """
                 INSERT INTO telegram_message (
                     chat_id, user_id, message_text, telegram_message_id,
-                    telegram_reply_to_message_id, message_type
+                    telegram_reply_to_message_id, message_type,
+                    thread_root_id, thread_depth
                 )
-                VALUES (?, ?, ?, ?, ?, ?)
+                SELECT ?, ?, ?, ?, ?, ?,
+                       COALESCE(parent.thread_root_id, ?),
+                       COALESCE(parent.thread_depth, ?)
+                FROM (SELECT 1)
+                LEFT JOIN (
+                    SELECT COALESCE(thread_root_id, telegram_message_id) AS thread_root_id,
+                           COALESCE(thread_depth, 0) + 1 AS thread_depth
+                    FROM telegram_message
+                    WHERE chat_id = ? AND telegram_message_id = ?
+                    ORDER BY id DESC
+                    LIMIT 1
+                ) AS parent
                 """,
                 (
                     chat_id,
@@ -482,9 +766,13 @@ class DatabaseService:
                     telegram_message_id,
                     telegram_reply_to_message_id,
                     message_type,
+                    telegram_reply_to_message_id or telegram_message_id,
+                    1 if telegram_reply_to_message_id else 0,
+                    chat_id,
+                    telegram_reply_to_message_id,
                 ),
             )
-            self.logger.info(f"Message saved for chat ID: {chat_id}")
+            self.logger.debug("Message saved for chat ID: %s", chat_id)
         except Exception as e:
             self.logger.error(f"Error saving message: {e}")
 
@@ -663,6 +951,13 @@ class DatabaseService:
             self.logger.error(f"Error fetching admin users: {e}")
             return []
 
+    async def get_started_chat_ids(self) -> List[int]:
+        """Chats where /start has been used"""
+        rows = await self.fetch_all(
+            "SELECT chat_id FROM telegram_chat_state WHERE is_bot_started = 1"
+        )
+        return [row["chat_id"] for row in rows]
+
     async def is_user_admin(self, user_id: int) -> bool:
         """Check if a user is a bot admin."""
         try:
@@ -779,6 +1074,13 @@ class DatabaseService:
             self.logger.error(f"Error getting all daily summary configs: {e}")
             return []
 
+    async def get_daily_summary_chat_ids(self, hour: str) -> List[int]:
+        """Chats whose daily summary is scheduled at the given hour"""
+        rows = await self.fetch_all(
+            "SELECT chat_id FROM chat_summary_config WHERE daily_summary_hour = ?", (hour,)
+        )
+        return [row["chat_id"] for row in rows]
+
     async def get_recent_messages_by_time(
         self, chat_id: int, hours: int = 24
     ) -> List[Dict]:
@@ -805,7 +1107,7 @@ class DatabaseService:
             now_utc = now.astimezone(pytz.UTC)
 
             query = """
-                SELECT m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
+                SELECT m.chat_id, m.message_text, m.telegram_message_id, m.telegram_reply_to_message_id,
                        u.user_id, u.first_name, u.last_name, u.username, m.created_at
                 FROM telegram_message m                JOIN telegram_user u ON m.user_id = u.user_id
                 WHERE m.chat_id = ?
@@ -850,4 +1152,402 @@ class DatabaseService:
             raise
 
 
+    async def enqueue_job(
+        self, job_type: str, payload: str, max_attempts: int, run_after: float
+    ) -> int:
+        """Insert a pending background job and return its id"""
+        async with self.conn.execute(
+            """
+            INSERT INTO background_job (job_type, payload, max_attempts, run_after)
+            VALUES (?, ?, ?, ?)
+            """,
+            (job_type, payload, max_attempts, run_after),
+        ) as cursor:
+            job_id = cursor.lastrowid
+        await self.conn.commit()
+        return job_id
+
+    async def claim_job(
+        self, job_types: List[str], owner: str, now: float, lease_seconds: float
+    ) -> Optional[Dict]:
+        """Atomically lease the next runnable job of the given types.
+
+        Runnable means pending and due, or running with an expired lease
+        (its worker died; last_error becomes 'Lease expired'). The single
+        UPDATE takes SQLite's write lock, so two workers (or processes)
+        never get the same job.
+        """
+        if not job_types:
+            return None
+        placeholders = ", ".join("?" for _ in job_types)
+        # One call so no other statement or commit runs while RETURNING is in progress
+        rows = await self.conn.execute_fetchall(
+            f"""
+            UPDATE background_job
+            SET last_error = CASE WHEN status = 'running' THEN 'Lease expired' ELSE last_error END,
+                status = 'running',
+                attempts = attempts + 1,
+                lease_owner = ?,
+                lease_expires_at = ?
+            WHERE id = (
+                SELECT id FROM background_job
+                WHERE job_type IN ({placeholders})
+                  AND ((status = 'pending' AND run_after <= ?)
+                       OR (status = 'running' AND lease_expires_at <= ?))
+                ORDER BY run_after, id
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            (owner, now + lease_seconds, *job_types, now, now),
+        )
+        await self.conn.commit()
+        return dict(rows[0]) if rows else None
+
+    async def extend_job_lease(self, job_id: int, owner: str, lease_expires_at: float) -> bool:
+        """Push back a running job's lease; False if the lease was lost"""
+        async with self.conn.execute(
+            """
+            UPDATE background_job SET lease_expires_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (lease_expires_at, job_id, owner),
+        ) as cursor:
+            updated = cursor.rowcount
+        await self.conn.commit()
+        return updated > 0
+
+    async def finish_job(
+        self, job_id: int, owner: str, status: str, error: Optional[str], now: float
+    ) -> bool:
+        """Mark a leased job as done or failed; False if the lease was lost"""
+        async with self.conn.execute(
+            """
+            UPDATE background_job
+            SET status = ?, last_error = ?, finished_at = ?,
+                lease_owner = NULL, lease_expires_at = NULL
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (status, error, now, job_id, owner),
+        ) as cursor:
+            updated = cursor.rowcount
+        await self.conn.commit()
+        return updated > 0
+
+    async def reschedule_job(
+        self, job_id: int, owner: str, run_after: float, error: Optional[str],
+        count_attempt: bool = True,
+    ) -> bool:
+        """Put a leased job back in the queue (retry, or release on shutdown); False if the lease was lost"""
+        async with self.conn.execute(
+            """
+            UPDATE background_job
+            SET status = 'pending', run_after = ?, last_error = ?,
+                attempts = attempts - ?,
+                lease_owner = NULL, lease_expires_at = NULL
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (run_after, error, 0 if count_attempt else 1, job_id, owner),
+        ) as cursor:
+            updated = cursor.rowcount
+        await self.conn.commit()
+        return updated > 0
+
+    async def get_job_counts(self) -> Dict[str, int]:
+        """Number of background jobs per status"""
+        rows = await self.fetch_all(
+            "SELECT status, COUNT(*) AS total FROM background_job GROUP BY status"
+        )
+        return {row["status"]: row["total"] for row in rows}
+
+    async def purge_finished_jobs(self, finished_before: float) -> None:
+        """Delete done/failed jobs that finished before the given time"""
+        await self.execute(
+            """
+            DELETE FROM background_job
+            WHERE status IN ('done', 'failed') AND finished_at < ?
+            """,
+            (finished_before,),
+        )
+
+    async def add_rate_limit_refund(self, user_id: int, operation_type: str, consumed_at: str) -> None:
+        """Record that an operation counted at consumed_at has to be given back"""
+        await self.execute(
+            "INSERT INTO rate_limit_refund (user_id, operation_type, consumed_at) VALUES (?, ?, ?)",
+            (user_id, operation_type, consumed_at),
+        )
+
+    async def take_rate_limit_refunds(self) -> List[Dict]:
+        """Remove and return the recorded rate-limit refunds, oldest first"""
+        # One call so no other statement or commit runs while RETURNING is in progress
+        rows = await self.conn.execute_fetchall(
+            "DELETE FROM rate_limit_refund RETURNING id, user_id, operation_type, consumed_at"
+        )
+        await self.conn.commit()
+        return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+
+    async def acquire_scheduler_lease(
+        self, name: str, owner: str, now: float, lease_seconds: float
+    ) -> bool:
+        """Take or renew a named lease; False while another owner holds it unexpired"""
+        async with self.conn.execute(
+            """
+            INSERT INTO scheduler_lease (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner = excluded.owner,
+                expires_at = excluded.expires_at
+            WHERE scheduler_lease.owner = excluded.owner OR scheduler_lease.expires_at <= ?
+            """,
+            (name, owner, now + lease_seconds, now),
+        ) as cursor:
+            updated = cursor.rowcount
+        await self.conn.commit()
+        return updated > 0
+
+    async def release_scheduler_lease(self, name: str, owner: str) -> None:
+        """Give up a lease so another process can take it right away"""
+        await self.execute(
+            "DELETE FROM scheduler_lease WHERE name = ? AND owner = ?", (name, owner)
+        )
+
+    async def get_scheduler_jobs(self) -> List[Dict]:
+        """Stored scheduler jobs (id and pickled job state)"""
+        return await self.fetch_all("SELECT id, job_state FROM scheduler_job")
+
+    async def get_scheduled_job_runs(self) -> List[Dict]:
+        """Stored scheduler jobs that have a next run, soonest first"""
+        return await self.fetch_all(
+            """
+            SELECT id, next_run_time, job_state FROM scheduler_job
+            WHERE next_run_time IS NOT NULL
+            ORDER BY next_run_time
+            """
+        )
+
+    async def save_scheduler_jobs(
+        self, upserts: List[tuple], deleted_ids: List[str], clear: bool = False
+    ) -> None:
+        """Apply a batch of scheduler job changes in one transaction.
+
+        Args:
+            upserts: (id, next_run_time, job_state) rows to insert or replace
+            deleted_ids: Ids of the jobs to delete
+            clear: Delete every stored job first
+        """
+        try:
+            if clear:
+                await self.conn.execute("DELETE FROM scheduler_job")
+            if deleted_ids:
+                await self.conn.executemany(
+                    "DELETE FROM scheduler_job WHERE id = ?",
+                    [(job_id,) for job_id in deleted_ids],
+                )
+            if upserts:
+                await self.conn.executemany(
+                    """
+                    INSERT INTO scheduler_job (id, next_run_time, job_state)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        next_run_time = excluded.next_run_time,
+                        job_state = excluded.job_state
+                    """,
+                    upserts,
+                )
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+
+    async def get_rate_limit_state(self, since: str) -> Tuple[List[Dict], List[Dict]]:
+        """Users and chats with rate-limit activity since the given ISO timestamp
+
+        Returns:
+            (user rows, chat rows); users also match by today's advanced op count
+        """
+        users = await self.fetch_all(
+            """
+            SELECT user_id, last_text_simple_op_time, last_advanced_op_time,
+                   advanced_op_today_count, advanced_op_count_reset_date
+            FROM telegram_user
+            WHERE last_text_simple_op_time >= ? OR last_advanced_op_time >= ?
+               OR advanced_op_count_reset_date >= ?
+            """,
+            (since, since, since[:10]),
+        )
+        chats = await self.fetch_all(
+            """
+            SELECT chat_id, last_command_usage FROM telegram_chat_state
+            WHERE last_command_usage >= ?
+            """,
+            (since,),
+        )
+        return users, chats
+
+    async def save_rate_limit_state(self, user_rows: List[tuple], chat_rows: List[tuple]) -> None:
+        """Upsert a batch of rate-limit snapshots in one transaction.
+
+        Args:
+            user_rows: (user_id, last_text_simple_op_time, last_advanced_op_time,
+                advanced_op_today_count, advanced_op_count_reset_date,
+                clear_text_simple_op_time, clear_advanced_op_time); a None
+                time leaves the stored value alone unless its clear flag is set
+            chat_rows: (chat_id, last_command_usage)
+        """
+        try:
+            if user_rows:
+                await self.conn.executemany(
+                    """
+                    INSERT INTO telegram_user (
+                        user_id, last_text_simple_op_time, last_advanced_op_time,
+                        advanced_op_today_count, advanced_op_count_reset_date
+                    ) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        last_text_simple_op_time = CASE WHEN ?
+                            THEN excluded.last_text_simple_op_time
+                            ELSE COALESCE(excluded.last_text_simple_op_time, last_text_simple_op_time) END,
+                        last_advanced_op_time = CASE WHEN ?
+                            THEN excluded.last_advanced_op_time
+                            ELSE COALESCE(excluded.last_advanced_op_time, last_advanced_op_time) END,
+                        advanced_op_today_count = CASE
+                            WHEN excluded.advanced_op_count_reset_date IS NULL
+                            THEN advanced_op_today_count
+                            ELSE excluded.advanced_op_today_count END,
+                        advanced_op_count_reset_date = COALESCE(
+                            excluded.advanced_op_count_reset_date, advanced_op_count_reset_date)
+                    """,
+                    user_rows,
+                )
+            if chat_rows:
+                await self.conn.executemany(
+                    """
+                    INSERT INTO telegram_chat_state (chat_id, last_command_usage)
+                    VALUES (?, ?)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        last_command_usage = excluded.last_command_usage
+                    """,
+                    chat_rows,
+                )
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+
+    async def add_llm_usage(self, rows: List[tuple]) -> None:
+        """Add a batch of usage counters to llm_usage in one transaction.
+
+        Args:
+            rows: (usage_date, chat_id, user_id, summary_type, model, calls,
+                prompt_tokens, completion_tokens, total_tokens, cost,
+                latency_seconds, audio_seconds)
+        """
+        try:
+            await self.conn.executemany(
+                """
+                INSERT INTO llm_usage (
+                    usage_date, chat_id, user_id, summary_type, model, calls,
+                    prompt_tokens, completion_tokens, total_tokens, cost,
+                    latency_seconds, audio_seconds
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(usage_date, chat_id, user_id, summary_type, model) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    total_tokens = total_tokens + excluded.total_tokens,
+                    cost = cost + excluded.cost,
+                    latency_seconds = latency_seconds + excluded.latency_seconds,
+                    audio_seconds = audio_seconds + excluded.audio_seconds
+                """,
+                rows,
+            )
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+
+    async def get_chat_usage_totals(self, usage_date: str) -> Dict[int, int]:
+        """Tokens used by each chat on the given day (ISO date)"""
+        rows = await self.fetch_all(
+            """
+            SELECT chat_id, SUM(total_tokens) AS tokens FROM llm_usage
+            WHERE usage_date = ?
+            GROUP BY chat_id
+            """,
+            (usage_date,),
+        )
+        return {row["chat_id"]: int(row["tokens"] or 0) for row in rows}
+
+    async def get_usage_rollup(self, group_by: str, since_date: str, limit: int) -> List[Dict]:
+        """Usage totals since the given day (ISO date), grouped by one llm_usage column
+
+        Args:
+            group_by: "chat_id", "user_id", "summary_type" or "model"
+        """
+        if group_by not in ("chat_id", "user_id", "summary_type", "model"):
+            raise ValueError(f"Cannot group usage by {group_by}")
+        return await self.fetch_all(
+            f"""
+            SELECT {group_by} AS name, SUM(calls) AS calls,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(total_tokens) AS total_tokens, SUM(cost) AS cost,
+                   SUM(latency_seconds) AS latency_seconds,
+                   SUM(audio_seconds) AS audio_seconds
+            FROM llm_usage
+            WHERE usage_date >= ?
+            GROUP BY {group_by}
+            ORDER BY total_tokens DESC, audio_seconds DESC
+            LIMIT ?
+            """,
+            (since_date, limit),
+        )
+
+    async def add_daily_summary_partial(
+        self, chat_id: int, first_message_id: int, last_message_id: int,
+        message_count: int, summary: str,
+    ) -> None:
+        """Store the partial summary of a range of a chat's messages"""
+        await self.execute(
+            """
+            INSERT INTO daily_summary_partial (
+                chat_id, first_message_id, last_message_id, message_count, summary
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            (chat_id, first_message_id, last_message_id, message_count, summary),
+        )
+
+    async def get_daily_summary_partials(
+        self, chat_id: int, first_message_id: int = 0, last_message_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Partial summaries of a chat whose range lies within the given message ids"""
+        return await self.fetch_all(
+            """
+            SELECT * FROM daily_summary_partial
+            WHERE chat_id = ? AND first_message_id >= ? AND last_message_id <= ?
+            ORDER BY first_message_id ASC
+            """,
+            (chat_id, first_message_id, last_message_id if last_message_id is not None else 2**62),
+        )
+
+    async def get_last_partial_message_id(self, chat_id: int) -> Optional[int]:
+        """Last message id already covered by a partial summary of the chat"""
+        row = await self.fetch_one(
+            "SELECT MAX(last_message_id) AS last_id FROM daily_summary_partial WHERE chat_id = ?",
+            (chat_id,),
+        )
+        return row["last_id"] if row else None
+
+    async def prune_daily_summary_partials(self, chat_id: int) -> None:
+        """Delete the partials of messages that are no longer stored"""
+        await self.execute(
+            """
+            DELETE FROM daily_summary_partial
+            WHERE chat_id = ? AND last_message_id < (
+                SELECT COALESCE(MIN(telegram_message_id), 0)
+                FROM telegram_message WHERE chat_id = ?
+            )
+            """,
+            (chat_id, chat_id),
+        )
+
+
 db_service = DatabaseService()  # Single instance
@@ -0,0 +1,170 @@
+import hashlib
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from telegram import Update
+from bot.services.metrics_service import metrics_service
+from bot.services.update_processor import command_name
+from bot.utils.constants import (
+    ERROR_RING_BUFFER_SIZE,
+    ERROR_PAYLOAD_MAX_CHARS,
+    ERROR_TRACEBACK_MAX_FRAMES,
+    ERROR_LOG_SAMPLE_EVERY,
+    ERROR_LOG_SAMPLE_SECONDS,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+def exception_fingerprint(error: BaseException) -> str:
+    """Identify an error by its type and the functions it went through (not line numbers)."""
+    frames = traceback.extract_tb(error.__traceback__)[-ERROR_TRACEBACK_MAX_FRAMES:]
+    path = "|".join(f"{frame.filename.rsplit('/', 1)[-1]}:{frame.name}" for frame in frames)
+    key = f"{type(error).__module__}.{type(error).__qualname__}|{path}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def update_stage(update: object) -> str:
+    """Where an error happened, from the update being processed."""
+    if not isinstance(update, Update):
+        return "background"
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        return f"callback:{data.split('|', 1)[0]}"
+    command = command_name(update)
+    if command:
+        return f"command:{command}"
+    if update.effective_message:
+        return "message"
+    return "update"
+
+
+def _update_payload(update: object) -> str:
+    """Short description of what the user sent (never the full Update repr)."""
+    if not isinstance(update, Update):
+        return repr(update)[:ERROR_PAYLOAD_MAX_CHARS] if update is not None else ""
+    if update.callback_query:
+        return (update.callback_query.data or "")[:ERROR_PAYLOAD_MAX_CHARS]
+    message = update.effective_message
+    if message:
+        return (message.text or message.caption or "")[:ERROR_PAYLOAD_MAX_CHARS]
+    return ""
+
+
+class ErrorTracker:
+    """One structured event per exception, kept in a ring buffer.
+
+    Each fingerprint is logged in full (with traceback) the first time, then
+    only once every ERROR_LOG_SAMPLE_EVERY occurrences or
+    ERROR_LOG_SAMPLE_SECONDS; the other occurrences are just counted.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._events: Deque[Dict[str, Any]] = deque(maxlen=ERROR_RING_BUFFER_SIZE)
+            # fingerprint -> {"count", "first_seen", "last_seen", "last_logged_at", "logged_count", "error_type", "stage"}
+            self._stats: Dict[str, Dict[str, Any]] = {}
+            self.captured = 0
+            self.sampled_out = 0
+            metrics_service.register_source("errors", self.get_metrics)
+            self.initialized = True
+
+    def capture(self, error: BaseException, update: object = None, stage: Optional[str] = None) -> Dict[str, Any]:
+        """Record an exception and log it if sampling allows; returns the event."""
+        fingerprint = exception_fingerprint(error)
+        now = time.time()
+        frames = traceback.format_tb(error.__traceback__)[-ERROR_TRACEBACK_MAX_FRAMES:]
+        event = {
+            "fingerprint": fingerprint,
+            "timestamp": now,
+            "stage": stage or update_stage(update),
+            "error_type": type(error).__name__,
+            "message": str(error)[:ERROR_PAYLOAD_MAX_CHARS],
+            "update_id": getattr(update, "update_id", None),
+            "user_id": update.effective_user.id if isinstance(update, Update) and update.effective_user else None,
+            "chat_id": update.effective_chat.id if isinstance(update, Update) and update.effective_chat else None,
+            "payload": _update_payload(update),
+            "traceback": "".join(frames),
+        }
+        self._events.append(event)
+        self.captured += 1
+
+        stats = self._stats.get(fingerprint)
+        if stats is None:
+            stats = self._stats[fingerprint] = {
+                "count": 0,
+                "first_seen": now,
+                "last_seen": now,
+                "last_logged_at": None,
+                "logged_count": 0,
+                "error_type": event["error_type"],
+                "stage": event["stage"],
+            }
+            if len(self._stats) > ERROR_RING_BUFFER_SIZE:
+                oldest = min(self._stats, key=lambda f: self._stats[f]["last_seen"])
+                del self._stats[oldest]
+        stats["count"] += 1
+        stats["last_seen"] = now
+        stats["stage"] = event["stage"]
+
+        if self._should_log(stats, now):
+            skipped = stats["count"] - stats["logged_count"] - 1
+            stats["last_logged_at"] = now
+            stats["logged_count"] = stats["count"]
+            logger.error(
+                f"Error {fingerprint} [{event['stage']}] {event['error_type']}: {event['message']} "
+                f"(update={event['update_id']}, user={event['user_id']}, chat={event['chat_id']}, "
+                f"occurrences={stats['count']}"
+                + (f", {skipped} not logged since last sample" if skipped > 0 else "")
+                + f")\nPayload: {event['payload']!r}\n{event['traceback']}"
+            )
+        else:
+            self.sampled_out += 1
+        return event
+
+    @staticmethod
+    def _should_log(stats: Dict[str, Any], now: float) -> bool:
+        if stats["last_logged_at"] is None:
+            return True
+        return (
+            stats["count"] - stats["logged_count"] >= ERROR_LOG_SAMPLE_EVERY
+            or now - stats["last_logged_at"] >= ERROR_LOG_SAMPLE_SECONDS
+        )
+
+    def summary(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recently seen fingerprints with their counts."""
+        ordered = sorted(self._stats.items(), key=lambda item: item[1]["last_seen"], reverse=True)
+        return [dict(stats, fingerprint=fingerprint) for fingerprint, stats in ordered[:limit]]
+
+    def latest_event(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Most recent event whose fingerprint starts with the given prefix."""
+        for event in reversed(self._events):
+            if event["fingerprint"].startswith(fingerprint):
+                return event
+        return None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "captured": self.captured,
+            "sampled_out": self.sampled_out,
+            "fingerprints": len(self._stats),
+            "buffered_events": len(self._events),
+        }
+
+
+def format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+error_tracker = ErrorTracker()
@@ -0,0 +1,185 @@
+import codecs
+import re
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import aiohttp
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+_META_CHARSET_RE = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.IGNORECASE
+)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class HttpFetchError(Exception):
+    """Raised when a page cannot be fetched within the configured limits."""
+
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def decode_body(body: bytes, header_charset: Optional[str] = None) -> str:
+    """Decode an HTTP body: BOM, then Content-Type charset, then <meta>, then UTF-8."""
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return body.decode(encoding, errors="replace")
+
+    encoding = _valid_codec(header_charset)
+    if not encoding:
+        meta_match = _META_CHARSET_RE.search(body[:4096])
+        if meta_match:
+            encoding = _valid_codec(meta_match.group(1).decode("ascii", "ignore"))
+
+    if encoding:
+        return body.decode(encoding, errors="replace")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        # Páginas antiguas sin charset declarado suelen ser Windows-1252
+        return body.decode("cp1252", errors="replace")
+
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref_src"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL for use as a key.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters (utm_*, fbclid...) and a trailing slash, and sorts the query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+        )
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class HttpService:
+    _instance = None
+
+    USER_AGENT = "Mozilla/5.0 (compatible; AlGranoBot/1.0; +https://github.com/mihailmariusiondev/al-grano-bot)"
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self.session: Optional[aiohttp.ClientSession] = None
+            self.initialized = True
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Shared client session, created lazily inside the running loop."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=50, limit_per_host=8, ttl_dns_cache=300),
+                headers={"User-Agent": self.USER_AGENT},
+            )
+            logger.info("Shared HTTP client session created")
+        return self.session
+
+    async def fetch_text(
+        self,
+        url: str,
+        max_bytes: int,
+        allowed_content_types: Iterable[str],
+        timeout: float = 30,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict:
+        """Stream a text resource with a hard size cap.
+
+        Args:
+            url: URL to fetch
+            max_bytes: Abort once the body grows beyond this many bytes
+            allowed_content_types: Accepted media types (e.g. "text/html")
+            timeout: Total time budget for the request in seconds
+            etag: Validator from a cached copy (sent as If-None-Match)
+            last_modified: Validator from a cached copy (sent as If-Modified-Since)
+
+        Returns:
+            Dict with status (200 or 304), text (None on 304), etag and last_modified
+
+        Raises:
+            HttpFetchError: on HTTP errors, unsupported content or oversized bodies
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=10, sock_read=15)
+        try:
+            async with self.get_session().get(
+                url, headers=headers, timeout=client_timeout, max_redirects=5
+            ) as response:
+                result = {
+                    "status": response.status,
+                    "text": None,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                if response.status == 304:
+                    return result
+                if response.status != 200:
+                    raise HttpFetchError(f"HTTP {response.status} for {url}")
+
+                content_type = (response.content_type or "").lower()
+                if content_type not in allowed_content_types:
+                    raise HttpFetchError(f"Unsupported content type '{content_type}' for {url}")
+                if response.content_length and response.content_length > max_bytes:
+                    raise HttpFetchError(
+                        f"Body too large for {url}: {response.content_length} bytes declared"
+                    )
+
+                chunks = []
+                received = 0
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise HttpFetchError(f"Body too large for {url}: over {max_bytes} bytes")
+                    chunks.append(chunk)
+
+                result["text"] = decode_body(b"".join(chunks), response.charset)
+                logger.debug(f"Fetched {url}: {received} bytes, type {content_type}")
+                return result
+        except aiohttp.ClientError as e:
+            raise HttpFetchError(f"Request error for {url}: {e}") from e
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+            logger.info("Shared HTTP client session closed")
+        self.session = None
+
+
+http_service = HttpService()
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from telegram.ext import Application
+from bot.services.database_service import db_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.constants import (
+    JOB_MAX_ATTEMPTS,
+    JOB_LEASE_SECONDS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_SHUTDOWN_GRACE_SECONDS,
+    JOB_RETENTION_SECONDS,
+    JOB_PURGE_INTERVAL_SECONDS,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+# last_error of a job claimed again because its previous worker's lease expired
+LEASE_EXPIRED_ERROR = "Lease expired"
+
+# handler(application, job): job is the background_job row with its payload decoded
+JobHandler = Callable[[Application, Dict[str, Any]], Awaitable[None]]
+# on_failure(application, job): called once a job has failed for good
+JobFailureHook = Callable[[Application, Dict[str, Any]], Awaitable[None]]
+
+
+def is_last_attempt(job: Dict[str, Any]) -> bool:
+    """Whether a failure of this run will be final (no retry left)."""
+    return job["attempts"] >= job["max_attempts"]
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before the next attempt after `attempts` failed ones."""
+    return min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+class JobService:
+    """Durable queue for heavy work, stored in the background_job table.
+
+    - enqueue() stores the job and returns; a pool of workers claims jobs
+      with a lease that is renewed while the handler runs.
+    - A failed run is retried with exponential backoff up to max_attempts.
+    - If a worker dies, its lease expires and another worker (in this or
+      another process) picks the job up again.
+    - On shutdown, jobs still running after a grace period are released
+      back to the queue without counting the attempt.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+            self.application: Optional[Application] = None
+            self._handlers: Dict[str, JobHandler] = {}
+            self._failure_hooks: Dict[str, JobFailureHook] = {}
+            self._paused: Set[str] = set()
+            self._workers: List[asyncio.Task] = []
+            self._wakeup: Optional[asyncio.Event] = None
+            self._stopping = False
+            self._next_purge_at = 0.0
+            self.enqueued = 0
+            self.completed = 0
+            self.retried = 0
+            self.failed = 0
+            self.recovered = 0
+            self.lease_lost = 0
+            self.running = 0
+            metrics_service.register_source("jobs", self.get_metrics)
+            self.initialized = True
+
+    def register_handler(
+        self, job_type: str, handler: JobHandler, on_failure: Optional[JobFailureHook] = None
+    ) -> None:
+        """Set the coroutine that runs jobs of this type in this process.
+
+        on_failure runs when a job of this type fails permanently: its last
+        attempt raised, or it was abandoned after losing its lease on every
+        attempt (the handler never gets to see that case).
+        """
+        self._handlers[job_type] = handler
+        if on_failure is not None:
+            self._failure_hooks[job_type] = on_failure
+
+    def set_paused(self, job_type: str, paused: bool) -> None:
+        """Stop (or resume) claiming jobs of this type; they wait for another process"""
+        if paused:
+            self._paused.add(job_type)
+        else:
+            self._paused.discard(job_type)
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        delay: float = 0,
+    ) -> int:
+        """Store a job for the workers and return its id."""
+        job_id = await db_service.enqueue_job(
+            job_type, json.dumps(payload), max_attempts, time.time() + delay
+        )
+        self.enqueued += 1
+        logger.info(f"Enqueued job {job_id} ({job_type})")
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    async def start(self, application: Application, workers: int) -> None:
+        """Start the worker pool (needs the database and an initialized bot)."""
+        if self._workers or workers <= 0:
+            return
+        self.application = application
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(), name=f"job_worker_{i}")
+            for i in range(workers)
+        ]
+        logger.info(
+            f"Started {workers} job workers as {self.worker_id} "
+            f"for job types {sorted(self._handlers)}"
+        )
+
+    async def stop(self) -> None:
+        """Stop claiming jobs, wait a little for running ones, release the rest."""
+        if not self._workers:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._workers, timeout=JOB_SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+        logger.info("Job workers stopped")
+
+    async def _worker_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await self._maybe_purge()
+                # Cleared before claiming so an enqueue during the claim is not missed
+                self._wakeup.clear()
+                # A token per claim: a job re-claimed in this same process after
+                # its lease expired must not be finished by the earlier run
+                lease_token = f"{self.worker_id}:{uuid.uuid4().hex[:12]}"
+                job = await db_service.claim_job(
+                    [job_type for job_type in self._handlers if job_type not in self._paused],
+                    lease_token, time.time(), JOB_LEASE_SECONDS
+                )
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run_job(job, lease_token)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+
+    async def _run_job(self, job: Dict[str, Any], lease_token: str) -> None:
+        job_id = job["id"]
+        if job["attempts"] > job["max_attempts"]:
+            # Its lease expired on every attempt: the job keeps killing or hanging its worker
+            logger.error(
+                f"Job {job_id} ({job['job_type']}) abandoned after {job['max_attempts']} lost leases"
+            )
+            if await db_service.finish_job(
+                job_id, lease_token, JOB_FAILED, LEASE_EXPIRED_ERROR, time.time()
+            ):
+                self.failed += 1
+                job["payload"] = json.loads(job["payload"])
+                await self._job_failed(job)
+            return
+        if job["last_error"] == LEASE_EXPIRED_ERROR:
+            self.recovered += 1
+            logger.warning(f"Recovered job {job_id} ({job['job_type']}) from an expired lease")
+
+        job["payload"] = json.loads(job["payload"])
+        handler = self._handlers[job["job_type"]]
+        run = asyncio.create_task(handler(self.application, job), name=f"job_{job_id}")
+        renewer = asyncio.create_task(self._renew_lease(job_id, lease_token, run))
+        self.running += 1
+        started = time.monotonic()
+        try:
+            await run
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling() == 0:
+                # Cancelled by the renewer: another worker may already own the job
+                self.lease_lost += 1
+                logger.error(f"Job {job_id} ({job['job_type']}) stopped: its lease was lost")
+                return
+            # Shutting down: give the job back without spending an attempt
+            if await db_service.reschedule_job(
+                job_id, lease_token, time.time(), None, count_attempt=False
+            ):
+                logger.info(f"Job {job_id} released back to the queue")
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            if is_last_attempt(job):
+                if await db_service.finish_job(job_id, lease_token, JOB_FAILED, error, time.time()):
+                    self.failed += 1
+                    logger.error(
+                        f"Job {job_id} ({job['job_type']}) failed permanently after "
+                        f"{job['attempts']} attempts: {error}",
+                        exc_info=True,
+                    )
+                    await self._job_failed(job)
+                else:
+                    self._log_lost_result(job)
+            else:
+                delay = retry_delay(job["attempts"])
+                if await db_service.reschedule_job(
+                    job_id, lease_token, time.time() + delay, error
+                ):
+                    self.retried += 1
+                    logger.warning(
+                        f"Job {job_id} ({job['job_type']}) attempt {job['attempts']} failed, "
+                        f"retrying in {delay:.0f}s: {error}"
+                    )
+                else:
+                    self._log_lost_result(job)
+        else:
+            if await db_service.finish_job(job_id, lease_token, JOB_DONE, None, time.time()):
+                self.completed += 1
+                logger.info(
+                    f"Job {job_id} ({job['job_type']}) done in {time.monotonic() - started:.1f}s"
+                )
+            else:
+                self._log_lost_result(job)
+        finally:
+            self.running -= 1
+            renewer.cancel()
+            run.cancel()
+
+    async def _job_failed(self, job: Dict[str, Any]) -> None:
+        hook = self._failure_hooks.get(job["job_type"])
+        if hook is None:
+            return
+        try:
+            await hook(self.application, job)
+        except Exception as e:
+            logger.error(f"Failure hook of job {job['id']} ({job['job_type']}) failed: {e}", exc_info=True)
+
+    def _log_lost_result(self, job: Dict[str, Any]) -> None:
+        self.lease_lost += 1
+        logger.warning(
+            f"Job {job['id']} ({job['job_type']}) finished after losing its lease; "
+            f"result not recorded"
+        )
+
+    async def _renew_lease(self, job_id: int, lease_token: str, run: asyncio.Task) -> None:
+        """Keep the lease alive while the handler runs; cancel the handler once it is lost."""
+        lease_expires_at = time.time() + JOB_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                expires_at = time.time() + JOB_LEASE_SECONDS
+                if await db_service.extend_job_lease(job_id, lease_token, expires_at):
+                    lease_expires_at = expires_at
+                    continue
+                logger.warning(f"Lost the lease of job {job_id}")
+            except Exception as e:
+                if time.time() < lease_expires_at:
+                    logger.warning(f"Could not renew lease of job {job_id}: {e}")
+                    continue
+                logger.warning(f"Lease of job {job_id} expired without renewal: {e}")
+            run.cancel()
+            return
+
+    async def _maybe_purge(self) -> None:
+        now = time.time()
+        if now < self._next_purge_at:
+            return
+        self._next_purge_at = now + JOB_PURGE_INTERVAL_SECONDS
+        await db_service.purge_finished_jobs(now - JOB_RETENTION_SECONDS)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "running": self.running,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "lease_lost": self.lease_lost,
+        }
+
+
+job_service = JobService()
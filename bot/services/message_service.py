@@ -1,9 +1,10 @@
-from typing import Optional
-from telegram import Bot
-from telegram.error import TelegramError
+from typing import List, Optional, Tuple
+from telegram import Bot, Message
+from telegram.error import BadRequest, TelegramError
 from telegram.constants import MessageLimit
+from bot.utils.constants import PRIORITY_INTERACTIVE, MESSAGE_CHUNK_SIZE
+from bot.utils.markdown_utils import split_message, sanitize_markdown, strip_markdown_escapes
 from bot.utils.logger import logger
-import asyncio
 
 logger = logger.get_logger(__name__)
 
@@ -26,59 +27,156 @@ class MessageService:
         """Initialize with bot instance"""
         self.bot = bot
 
+    @staticmethod
+    def _is_parse_error(error: BadRequest, parse_mode: Optional[str]) -> bool:
+        return bool(parse_mode) and "can't parse" in str(error).lower()
+
+    @staticmethod
+    def _as_plain_text(text: str, parse_mode: Optional[str]) -> str:
+        if (parse_mode or "").lower() == "markdown":
+            return strip_markdown_escapes(text)
+        return text
+
+    async def _send_part(self, chat_id: int, text: str, parse_mode: Optional[str], priority: int) -> None:
+        """Send one part; if Telegram still cannot parse it, resend it once as plain text."""
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id, text=text, parse_mode=parse_mode, rate_limit_args=priority
+            )
+        except BadRequest as e:
+            if not self._is_parse_error(e, parse_mode):
+                raise
+            logger.warning(f"Markdown parse error in chat {chat_id}, resending as plain text: {e}")
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=self._as_plain_text(text, parse_mode),
+                parse_mode=None,
+                rate_limit_args=priority,
+            )
+
+    async def _edit_part(self, message: Message, text: str, parse_mode: Optional[str], priority: int) -> None:
+        """Edit a message; if Telegram still cannot parse the text, edit it once as plain text."""
+        try:
+            await self.bot.edit_message_text(
+                text=text,
+                chat_id=message.chat_id,
+                message_id=message.message_id,
+                parse_mode=parse_mode,
+                rate_limit_args=priority,
+            )
+        except BadRequest as e:
+            if not self._is_parse_error(e, parse_mode):
+                raise
+            logger.warning(
+                f"Markdown parse error editing message {message.message_id}, retrying as plain text: {e}"
+            )
+            await self.bot.edit_message_text(
+                text=self._as_plain_text(text, parse_mode),
+                chat_id=message.chat_id,
+                message_id=message.message_id,
+                parse_mode=None,
+                rate_limit_args=priority,
+            )
+
     async def send_message(
-        self, chat_id: int, text: str, parse_mode: Optional[str] = None
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
     ) -> bool:
-        """Send a message to a chat, handling long messages and errors.
+        """Send a message to a chat, splitting it if it is too long.
+
+        Markdown is sanitized before sending. If Telegram still rejects a
+        part's entities, that part is resent once as plain text.
 
         Args:
             chat_id: The chat ID to send the message to
             text: The message text
             parse_mode: Optional parse mode (Markdown, HTML)
+            priority: Outbound dispatcher lane (PRIORITY_INTERACTIVE or PRIORITY_BROADCAST)
 
         Returns:
             True if the message was sent successfully, False otherwise
         """
+        sent, total = await self.send_parts(chat_id, text, parse_mode, priority)
+        return total > 0 and sent == total
+
+    async def send_parts(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Tuple[int, int]:
+        """Send a message like send_message, reporting how much of it was delivered.
+
+        Parts are sent in order and sending stops at the first failure, so
+        the first `sent` parts are the ones the chat received.
+
+        Returns:
+            (parts sent, total parts)
+        """
         if not self.bot:
             logger.error("Message service not initialized with bot instance")
-            return False
+            return 0, 0
+
+        # Escaping can lengthen the text, so measure it once sanitized
+        sanitized = sanitize_markdown(text) if (parse_mode or "").lower() == "markdown" else text
+        if len(sanitized) > MessageLimit.MAX_TEXT_LENGTH:
+            parts = self._split_with_indicators(text, parse_mode)
+        else:
+            parts = [sanitized]
 
+        sent = 0
         try:
-            # Check if the message is too long
-            if len(text) > MessageLimit.MAX_TEXT_LENGTH:
-                return await self.send_long_message(chat_id, text, parse_mode)
-            else:
-                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
-            return True
+            for part in parts:
+                await self._send_part(chat_id, part, parse_mode, priority)
+                sent += 1
         except TelegramError as e:
-            # If markdown parsing fails, try without formatting
-            if parse_mode and "can't parse" in str(e).lower():
-                logger.warning(f"Markdown parsing failed for chat {chat_id}, trying without formatting: {e}")
-                try:
-                    if len(text) > MessageLimit.MAX_TEXT_LENGTH:
-                        return await self.send_long_message(chat_id, text, None)
-                    else:
-                        await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=None)
-                    return True
-                except TelegramError as e2:
-                    logger.error(f"Error sending message without formatting to chat {chat_id}: {e2}", exc_info=True)
-                    return False
-            else:
-                logger.error(f"Error sending message to chat {chat_id}: {e}", exc_info=True)
-                return False
+            logger.error(
+                f"Error sending message to chat {chat_id} (part {sent + 1}/{len(parts)}): {e}",
+                exc_info=True,
+            )
         except Exception as e:
-            logger.error(f"Unexpected error sending message to chat {chat_id}: {e}", exc_info=True)
-            return False
+            logger.error(
+                f"Unexpected error sending message to chat {chat_id} "
+                f"(part {sent + 1}/{len(parts)}): {e}",
+                exc_info=True,
+            )
+        return sent, len(parts)
+
+    @staticmethod
+    def _split_with_indicators(text: str, parse_mode: Optional[str]) -> List[str]:
+        """Split text into sendable parts, prefixed with [Parte i/n] when there are several."""
+        chunks = split_message(text, MESSAGE_CHUNK_SIZE, parse_mode)
+        if len(chunks) <= 1:
+            return chunks
+        is_markdown = (parse_mode or "").lower() == "markdown"
+        parts = []
+        for i, chunk in enumerate(chunks):
+            part_indicator = f"[Parte {i+1}/{len(chunks)}]\n"
+            if is_markdown:
+                part_indicator = "\\" + part_indicator  # '[' would open a link
+            parts.append(f"{part_indicator}{chunk}")
+        return parts
 
     async def send_long_message(
-        self, chat_id: int, text: str, parse_mode: Optional[str] = None
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
     ) -> bool:
-        """Split and send a long message.
+        """Split a long message on paragraph/sentence boundaries and send the parts.
+
+        Pacing between parts is left to the outbound dispatcher.
 
         Args:
             chat_id: The chat ID to send the message to
             text: The long message text
             parse_mode: Optional parse mode (Markdown, HTML)
+            priority: Outbound dispatcher lane
 
         Returns:
             True if all parts were sent successfully, False otherwise
@@ -88,36 +186,8 @@ class MessageService:
             return False
 
         try:
-            # Split the message into chunks of 4000 characters (leaving room for markers)
-            max_chunk_size = 4000
-            chunks = [text[i:i+max_chunk_size] for i in range(0, len(text), max_chunk_size)]
-
-            # Send each chunk with a part indicator
-            for i, chunk in enumerate(chunks):
-                part_indicator = f"[Parte {i+1}/{len(chunks)}]\n" if len(chunks) > 1 else ""
-                message_text = f"{part_indicator}{chunk}"
-
-                try:
-                    await self.bot.send_message(
-                        chat_id=chat_id,
-                        text=message_text,
-                        parse_mode=parse_mode
-                    )
-                except TelegramError as e:
-                    # If markdown parsing fails for this chunk, try without formatting
-                    if parse_mode and "can't parse" in str(e).lower():
-                        logger.warning(f"Markdown parsing failed for chunk {i+1}, trying without formatting: {e}")
-                        await self.bot.send_message(
-                            chat_id=chat_id,
-                            text=message_text,
-                            parse_mode=None
-                        )
-                    else:
-                        raise  # Re-raise the error if it's not a parsing issue
-
-                # Add pause between chunks to avoid rate limiting
-                if i < len(chunks) - 1:  # Don't pause after the last chunk
-                    await asyncio.sleep(0.5)
+            for part in self._split_with_indicators(text, parse_mode):
+                await self._send_part(chat_id, part, parse_mode, priority)
 
             return True
         except TelegramError as e:
@@ -128,5 +198,56 @@ class MessageService:
             return False
 
 
+    async def replace_message(
+        self,
+        message: Message,
+        text: str,
+        parse_mode: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> bool:
+        """Replace the text of a message sent by the bot (e.g. a wait message).
+
+        The first part is edited into the message; if the text is too long,
+        the remaining parts are sent after it. If the message can no longer
+        be edited (deleted, too old), the whole text is sent instead.
+
+        Args:
+            message: Message previously sent by the bot
+            text: The new text
+            parse_mode: Optional parse mode (Markdown, HTML)
+            priority: Outbound dispatcher lane
+
+        Returns:
+            True if the whole text was delivered, False otherwise
+        """
+        if not self.bot:
+            logger.error("Message service not initialized with bot instance")
+            return False
+
+        chat_id = message.chat_id
+        parts = self._split_with_indicators(text, parse_mode)
+        if not parts:
+            return False
+
+        try:
+            await self._edit_part(message, parts[0], parse_mode, priority)
+        except TelegramError as e:
+            logger.warning(
+                f"Could not edit message {message.message_id} in chat {chat_id}, sending instead: {e}"
+            )
+            return await self.send_message(chat_id, text, parse_mode, priority)
+
+        try:
+            for part in parts[1:]:
+                await self._send_part(chat_id, part, parse_mode, priority)
+            return True
+        except TelegramError as e:
+            logger.error(f"Error sending remaining parts to chat {chat_id}: {e}", exc_info=True)
+            return False
+        except Exception as e:
+            logger.error(f"Unexpected error sending remaining parts to chat {chat_id}: {e}", exc_info=True)
+            return False
+
+
 # Single instance for import
 message_service = MessageService()
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+class MetricsService:
+    """In-process metrics: counters plus gauges pulled from registered sources."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+            self._counters: Dict[str, float] = defaultdict(float)
+            self.initialized = True
+
+    def register_source(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """Register a callable returning a flat dict of current values."""
+        self._sources[name] = provider
+
+    def increment(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        for name, provider in self._sources.items():
+            try:
+                result[name] = provider()
+            except Exception as e:
+                logger.error(f"Metrics source '{name}' failed: {e}", exc_info=True)
+                result[name] = {"error": str(e)}
+        if self._counters:
+            result["counters"] = dict(self._counters)
+        return result
+
+
+metrics_service = MetricsService()
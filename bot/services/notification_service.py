@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from bot.services.metrics_service import metrics_service
+from bot.utils.rate_limit_utils import TokenBucket
+from bot.utils.constants import (
+    PRIORITY_BROADCAST,
+    NOTIFICATION_DIGEST_INTERVAL_SECONDS,
+    NOTIFICATION_DEDUP_WINDOW_SECONDS,
+    NOTIFICATION_RATE_PER_HOUR,
+    NOTIFICATION_BURST,
+    NOTIFICATION_ADMIN_CACHE_SECONDS,
+    NOTIFICATION_DETAILS_MAX_CHARS,
+    NOTIFICATION_DIGEST_MAX_ITEMS,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+LEVEL_CRITICAL = "critical"
+LEVEL_WARNING = "warning"
+
+# Numbers, hex ids and quoted values change between occurrences of the same error
+_VOLATILE_RE = re.compile(r"0x[0-9a-f]+|\d+|'[^']*'|\"[^\"]*\"")
+
+
+def notification_fingerprint(level: str, title: str, details: str) -> str:
+    """Identify an alert regardless of ids, counters and other volatile values."""
+    normalized = _VOLATILE_RE.sub("#", (details or "").lower())[:200]
+    return hashlib.sha1(f"{level}|{title}|{normalized}".encode("utf-8")).hexdigest()[:12]
+
+
+class _Alert:
+    __slots__ = (
+        "fingerprint", "level", "title", "details", "user_id", "chat_id",
+        "count", "unreported", "first_seen", "last_seen", "last_alert_at",
+    )
+
+    def __init__(self, fingerprint: str, level: str, title: str, details: str,
+                 user_id: Optional[int], chat_id: Optional[int]):
+        self.fingerprint = fingerprint
+        self.level = level
+        self.title = title
+        self.details = details
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.count = 0
+        self.unreported = 0  # Occurrences not yet delivered in any message
+        self.first_seen = time.monotonic()
+        self.last_seen = self.first_seen
+        self.last_alert_at: Optional[float] = None
+
+
+class NotificationService:
+    """Background delivery of admin alerts.
+
+    publish() only records the alert and returns; a background task does
+    all the sending:
+    - The first occurrence of a critical error is sent right away, once
+      per NOTIFICATION_DEDUP_WINDOW_SECONDS and fingerprint.
+    - Everything else (repeats, warnings, alerts over the rate limit) is
+      counted and sent as one digest every NOTIFICATION_DIGEST_INTERVAL_SECONDS.
+    - The admin list is cached instead of queried for every alert.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._alerts: Dict[str, _Alert] = {}
+            self._immediate: Deque[str] = deque()
+            self._bucket = TokenBucket(NOTIFICATION_RATE_PER_HOUR / 3600, NOTIFICATION_BURST)
+            self._admin_ids: List[int] = []
+            self._admins_loaded_at: Optional[float] = None
+            self._wakeup: Optional[asyncio.Event] = None
+            self._worker: Optional[asyncio.Task] = None
+            self._next_digest_at = time.monotonic() + NOTIFICATION_DIGEST_INTERVAL_SECONDS
+            self.published = 0
+            self.alerts_sent = 0
+            self.digests_sent = 0
+            self.rate_limited = 0
+            metrics_service.register_source("notifications", self.get_metrics)
+            self.initialized = True
+
+    def publish(
+        self,
+        level: str,
+        title: str,
+        details: str,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+    ) -> None:
+        """Record an alert for the admins. Never blocks and never raises."""
+        try:
+            details = str(details)[:NOTIFICATION_DETAILS_MAX_CHARS]
+            fingerprint = notification_fingerprint(level, title, details)
+            alert = self._alerts.get(fingerprint)
+            if alert is None:
+                alert = _Alert(fingerprint, level, title, details, user_id, chat_id)
+                self._alerts[fingerprint] = alert
+            alert.count += 1
+            alert.unreported += 1
+            alert.last_seen = time.monotonic()
+            self.published += 1
+
+            if level == LEVEL_CRITICAL and (
+                alert.last_alert_at is None
+                or alert.last_seen - alert.last_alert_at >= NOTIFICATION_DEDUP_WINDOW_SECONDS
+            ) and fingerprint not in self._immediate:
+                self._immediate.append(fingerprint)
+
+            self._ensure_worker()
+            if self._wakeup:
+                self._wakeup.set()
+        except Exception as e:
+            logger.error(f"Could not record admin notification '{title}': {e}", exc_info=True)
+
+    def invalidate_admins(self) -> None:
+        """Force the admin list to be reloaded before the next send."""
+        self._admins_loaded_at = None
+
+    def _ensure_worker(self) -> None:
+        if self._worker and not self._worker.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop yet: alerts wait for the next publish from the loop
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="admin_notifications")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                timeout = max(0.0, self._next_digest_at - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                await self._send_immediate()
+                if time.monotonic() >= self._next_digest_at:
+                    await self._send_digest()
+                    self._next_digest_at = time.monotonic() + NOTIFICATION_DIGEST_INTERVAL_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Admin notification loop error: {e}", exc_info=True)
+                await asyncio.sleep(5)
+
+    async def _get_admin_ids(self) -> List[int]:
+        now = time.monotonic()
+        if (
+            self._admins_loaded_at is None
+            or now - self._admins_loaded_at >= NOTIFICATION_ADMIN_CACHE_SECONDS
+        ):
+            # Import here to avoid circular imports
+            from bot.services.database_service import db_service
+
+            self._admin_ids = await db_service.get_admin_users()
+            self._admins_loaded_at = now
+        return self._admin_ids
+
+    async def _deliver(self, text: str) -> int:
+        from bot.services.message_service import message_service
+
+        admin_ids = await self._get_admin_ids()
+        if not admin_ids:
+            logger.critical("No admin users found in database - cannot send notifications!")
+            return 0
+        delivered = 0
+        for admin_id in admin_ids:
+            if await message_service.send_message(
+                chat_id=admin_id, text=text, parse_mode="Markdown", priority=PRIORITY_BROADCAST
+            ):
+                delivered += 1
+            else:
+                logger.error(f"Failed to notify admin {admin_id}")
+        return delivered
+
+    async def _send_immediate(self) -> None:
+        while self._immediate:
+            alert = self._alerts.get(self._immediate.popleft())
+            if alert is None or alert.unreported == 0:
+                continue
+            if not self._bucket.consume():
+                # Over the rate limit: the occurrences go into the next digest
+                self.rate_limited += 1
+                continue
+            occurrences = alert.unreported
+            delivered = await self._deliver(self._format_alert(alert, occurrences))
+            if delivered == 0:
+                # Left unreported so the next digest carries them
+                logger.critical(f"Failed to notify any admin about: {alert.title}")
+                continue
+            # Occurrences published while sending stay pending
+            alert.unreported -= occurrences
+            alert.last_alert_at = time.monotonic()
+            self.alerts_sent += 1
+
+    async def _send_digest(self) -> None:
+        pending = sorted(
+            (a for a in self._alerts.values() if a.unreported),
+            key=lambda a: (a.level != LEVEL_CRITICAL, -a.unreported),
+        )
+        if pending:
+            reported = [(alert, alert.unreported) for alert in pending]
+            if await self._deliver(self._format_digest(pending)):
+                for alert, occurrences in reported:
+                    alert.unreported -= occurrences
+                self.digests_sent += 1
+            else:
+                logger.critical(f"Failed to deliver alert digest, keeping {len(pending)} alerts pending")
+
+        # Forget fingerprints that are quiet and outside their dedup window
+        now = time.monotonic()
+        for fingerprint in [
+            f for f, a in self._alerts.items()
+            if not a.unreported and now - a.last_seen >= NOTIFICATION_DEDUP_WINDOW_SECONDS
+        ]:
+            del self._alerts[fingerprint]
+
+    @staticmethod
+    def _format_alert(alert: _Alert, occurrences: int) -> str:
+        header = "🚨 *CRITICAL ERROR ALERT*" if alert.level == LEVEL_CRITICAL else "⚠️ *SYSTEM WARNING*"
+        parts = [
+            header,
+            f"*Error:* {alert.title}",
+            f"*Details:* {alert.details}",
+        ]
+        if alert.user_id:
+            parts.append(f"*User ID:* {alert.user_id}")
+        if alert.chat_id:
+            parts.append(f"*Chat ID:* {alert.chat_id}")
+        if occurrences > 1:
+            parts.append(f"*Occurrences:* {occurrences}")
+        parts.append(f"*Time:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        parts.append(
+            f"_Repeats of this error are grouped in digests for the next "
+            f"{NOTIFICATION_DEDUP_WINDOW_SECONDS // 60} min_"
+        )
+        return "\n".join(parts)
+
+    @staticmethod
+    def _format_digest(alerts: List[_Alert]) -> str:
+        total = sum(a.unreported for a in alerts)
+        lines = [
+            f"🧾 *ALERT DIGEST* - {total} events, {len(alerts)} distinct "
+            f"(last {NOTIFICATION_DIGEST_INTERVAL_SECONDS // 60} min)"
+        ]
+        for alert in alerts[:NOTIFICATION_DIGEST_MAX_ITEMS]:
+            icon = "🚨" if alert.level == LEVEL_CRITICAL else "⚠️"
+            lines.append(f"\n{icon} {alert.unreported}× *{alert.title}*\n{alert.details[:150]}")
+        if len(alerts) > NOTIFICATION_DIGEST_MAX_ITEMS:
+            lines.append(f"\n…and {len(alerts) - NOTIFICATION_DIGEST_MAX_ITEMS} more")
+        return "\n".join(lines)
+
+    async def close(self) -> None:
+        """Stop the worker, trying to send what is still pending."""
+        if not self._worker:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        try:
+            await asyncio.wait_for(self._send_digest(), timeout=5)
+        except Exception as e:
+            logger.warning(f"Could not send final alert digest: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "alerts_sent": self.alerts_sent,
+            "digests_sent": self.digests_sent,
+            "rate_limited": self.rate_limited,
+            "tracked_fingerprints": len(self._alerts),
+            "pending_events": sum(a.unreported for a in self._alerts.values()),
+        }
+
+
+notification_service = NotificationService()
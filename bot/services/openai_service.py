@@ -1,8 +1,9 @@
 import openai
 import aiohttp
 import json
-from typing import List, Optional, Dict, Literal
+from typing import List, Optional, Dict, Literal, Tuple
 import asyncio
+import time
 from bot.utils.text_utils import chunk_text
 from bot.utils.logger import logger
 from bot.prompts.base_prompts import BASE_PROMPTS
@@ -14,6 +15,7 @@ from bot.prompts.prompt_modifiers import (
 from bot.config import config
 from bot.constants import FALLBACK_MODELS, RATE_LIMIT_RETRY_DELAY
 from bot.utils.admin_notifications import notify_admins_rate_limit, notify_admins_service_error
+from bot.services.usage_service import usage_service, usage_scope
 
 # SummaryType Literal, debe coincidir con las claves en ALL_SUMMARY_PROMPTS
 SummaryType = Literal[
@@ -40,9 +42,6 @@ class OpenAIService:
     CHARS_PER_TOKEN_ESTIMATE = 3.5
     # Calculate max input characters for the model, used for chunking
     MAX_INPUT_CHARS_MODEL = int(MODEL_MAX_TOKENS * CHARS_PER_TOKEN_ESTIMATE * 0.75)
-    
-    # Store last used model for displaying to user
-    last_used_model = None
 
     def __new__(cls):
         if cls._instance == None:
@@ -94,7 +93,8 @@ class OpenAIService:
             "model": model,
             "messages": messages,
             "temperature": temperature,
-            "reasoning": {"exclude": True}  # Exclude reasoning tokens
+            "reasoning": {"exclude": True},  # Exclude reasoning tokens
+            "usage": {"include": True},  # Token counts and cost in the response
         }
         
         if max_tokens:
@@ -102,6 +102,7 @@ class OpenAIService:
         
         self.logger.debug(f"OpenRouter direct API call - Model: {model}, reasoning excluded")
         
+        started = time.monotonic()
         async with aiohttp.ClientSession() as session:
             async with session.post(url, headers=headers, json=payload) as response:
                 if response.status != 200:
@@ -115,8 +116,10 @@ class OpenAIService:
                 from bot.utils.text_utils import clean_ai_response
                 content = clean_ai_response(content)
                 
-                # Store the successful model
-                self.last_used_model = model
+                # Metered per chat/user/summary type; also remembers the model for the reply
+                usage_service.record_completion(
+                    model, data.get("usage"), time.monotonic() - started
+                )
                 
                 return content
 
@@ -202,6 +205,18 @@ class OpenAIService:
     async def transcribe_audio(
         self, file_path: str, model: str = "whisper-1", language: Optional[str] = None
     ) -> str:
+        text, _ = await self.transcribe_audio_segments(file_path, model, language)
+        return text
+
+    async def transcribe_audio_segments(
+        self, file_path: str, model: str = "whisper-1", language: Optional[str] = None
+    ) -> Tuple[str, List[Tuple[float, float]]]:
+        """Transcribe an audio file.
+
+        Returns:
+            The text and the (start, end) seconds of each Whisper segment,
+            in the timeline of the file that was sent
+        """
         if not self.initialized:
             raise RuntimeError("OpenAI service not initialized")
 
@@ -220,19 +235,31 @@ class OpenAIService:
             self.logger.debug(f"Audio file size: {file_size} bytes ({file_size/1024/1024:.2f} MB)")
 
             self.logger.info(f"Starting transcription of {file_path} with Whisper")
+            started = time.monotonic()
             with open(file_path, "rb") as audio_file:
+                # verbose_json also returns the audio duration, which is what Whisper bills
                 response = await self.openai_client.audio.transcriptions.create(
-                    model=model, file=audio_file, language=language
+                    model=model, file=audio_file, language=language,
+                    response_format="verbose_json",
+                )
+            with usage_scope(summary_type="transcription"):
+                usage_service.record_transcription(
+                    model, getattr(response, "duration", None), time.monotonic() - started
                 )
 
             transcription_text = response.text
             transcription_length = len(transcription_text)
+            segments = [
+                (segment.start, segment.end) if hasattr(segment, "start")
+                else (segment["start"], segment["end"])
+                for segment in (getattr(response, "segments", None) or [])
+            ]
 
             self.logger.debug(f"=== AUDIO TRANSCRIPTION COMPLETED ===")
             self.logger.debug(f"Transcription length: {transcription_length} chars")
             self.logger.info(f"Audio transcription successful for {file_path}")
 
-            return transcription_text
+            return transcription_text, segments
         except Exception as e:
             self.logger.error(f"Audio transcription failed for {file_path}: {e}", exc_info=True)
             raise RuntimeError(f"Failed to transcribe audio: {str(e)}") from e
@@ -308,7 +335,10 @@ class OpenAIService:
         self.logger.info(f"Using model: {model} for summary type: {summary_type} (with fallback)")
 
         try:
-            result = await self.chat_completion_openrouter(messages, model=model)
+            # Callers such as the daily summary attribute their calls to their own type
+            with usage_scope() as scope:
+                scope.summary_type = scope.summary_type or summary_type
+                result = await self.chat_completion_openrouter(messages, model=model)
             self.logger.info(f"Summary generation completed successfully for type {summary_type}")
             self.logger.debug(f"Generated summary length: {len(result) if result else 0} chars")
             return result
@@ -0,0 +1,223 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Deque, Dict, Optional, Tuple, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from bot.services.metrics_service import metrics_service
+from bot.utils.rate_limit_utils import TokenBucket
+from bot.utils.constants import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BROADCAST,
+    OUTBOUND_GLOBAL_RATE_PER_SECOND,
+    OUTBOUND_GLOBAL_BURST,
+    OUTBOUND_GROUP_RATE_PER_MINUTE,
+    OUTBOUND_GROUP_BURST,
+    OUTBOUND_PRIVATE_RATE_PER_SECOND,
+    OUTBOUND_PRIVATE_BURST,
+    OUTBOUND_MAX_RETRIES,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+ChatKey = Union[int, str]
+
+# Bot API methods that do not post anything to a chat are never throttled
+_UNTHROTTLED_ENDPOINTS = {"sendChatAction", "answerCallbackQuery"}
+
+
+class _Waiter:
+    __slots__ = ("chat_id", "future", "enqueued_at")
+
+    def __init__(self, chat_id: ChatKey, future: asyncio.Future):
+        self.chat_id = chat_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class OutboundDispatcher(BaseRateLimiter[int]):
+    """Rate limiter for every Bot API call that posts to a chat.
+
+    Plugged into PTB through ApplicationBuilder.rate_limiter(), so
+    reply_text, edits, documents and MessageService sends all pass here.
+
+    - One global token bucket (~30 msg/s) and one bucket per chat
+      (~20 msg/min for groups, ~1 msg/s for private chats).
+    - Priority lanes: PRIORITY_INTERACTIVE requests are released before
+      PRIORITY_BROADCAST ones. Within a lane, each chat keeps FIFO order,
+      and a chat waiting on its own bucket does not block other chats.
+    - RetryAfter blocks the affected bucket and the request is retried up
+      to OUTBOUND_MAX_RETRIES times.
+
+    The priority is passed per call as rate_limit_args; the default is
+    interactive.
+    """
+
+    def __init__(self):
+        self._global_bucket = TokenBucket(OUTBOUND_GLOBAL_RATE_PER_SECOND, OUTBOUND_GLOBAL_BURST)
+        self._chat_buckets: Dict[ChatKey, TokenBucket] = {}
+        self._lanes: Dict[int, Deque[_Waiter]] = {
+            PRIORITY_INTERACTIVE: deque(),
+            PRIORITY_BROADCAST: deque(),
+        }
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._gc_counter = itertools.count()
+        self.sent = 0
+        self.retry_after_events = 0
+        self.max_wait_seconds = 0.0
+
+    async def initialize(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._pump_task = asyncio.create_task(self._pump(), name="outbound_dispatcher")
+        metrics_service.register_source("outbound", self.get_metrics)
+        logger.info("Outbound dispatcher started")
+
+    async def shutdown(self) -> None:
+        if self._pump_task:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
+        for lane in self._lanes.values():
+            while lane:
+                waiter = lane.popleft()
+                if not waiter.future.done():
+                    waiter.future.cancel()
+        logger.info("Outbound dispatcher stopped")
+
+    def _chat_bucket(self, chat_id: ChatKey) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative ids (and @channel usernames) are groups/channels
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = TokenBucket(OUTBOUND_GROUP_RATE_PER_MINUTE / 60, OUTBOUND_GROUP_BURST)
+            else:
+                bucket = TokenBucket(OUTBOUND_PRIVATE_RATE_PER_SECOND, OUTBOUND_PRIVATE_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _collect_idle_buckets(self) -> None:
+        now = time.monotonic()
+        waiting = {w.chat_id for lane in self._lanes.values() for w in lane}
+        for chat_id in [c for c, b in self._chat_buckets.items() if c not in waiting and b.is_idle(now)]:
+            del self._chat_buckets[chat_id]
+
+    def _release_next(self) -> Optional[float]:
+        """Release every waiter that can go now; return the delay until the next one."""
+        next_delay: Optional[float] = None
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            blocked_chats = set()
+            for waiter in list(lane):
+                if waiter.future.done():  # Caller cancelled
+                    lane.remove(waiter)
+                    continue
+                if waiter.chat_id in blocked_chats:
+                    continue
+
+                now = time.monotonic()
+                global_delay = self._global_bucket.delay(now)
+                if global_delay > 0:
+                    return global_delay
+
+                chat_delay = self._chat_bucket(waiter.chat_id).delay(now)
+                if chat_delay > 0:
+                    blocked_chats.add(waiter.chat_id)
+                    next_delay = chat_delay if next_delay is None else min(next_delay, chat_delay)
+                    continue
+
+                self._global_bucket.consume(now)
+                self._chat_bucket(waiter.chat_id).consume(now)
+                lane.remove(waiter)
+                self.max_wait_seconds = max(self.max_wait_seconds, now - waiter.enqueued_at)
+                waiter.future.set_result(None)
+        return next_delay
+
+    async def _pump(self) -> None:
+        while True:
+            try:
+                delay = self._release_next()
+                if next(self._gc_counter) % 1000 == 0:
+                    self._collect_idle_buckets()
+                self._wakeup.clear()
+                if delay is None:
+                    await self._wakeup.wait()
+                else:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbound dispatcher loop error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _acquire(self, chat_id: ChatKey, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._lanes.get(priority, self._lanes[PRIORITY_BROADCAST]).append(_Waiter(chat_id, future))
+        self._wakeup.set()
+        await future
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], list]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], list]:
+        chat_id = data.get("chat_id")
+        if chat_id is None or endpoint in _UNTHROTTLED_ENDPOINTS or endpoint.startswith("get"):
+            return await callback(*args, **kwargs)
+
+        priority = PRIORITY_INTERACTIVE if rate_limit_args is None else rate_limit_args
+        for attempt in range(OUTBOUND_MAX_RETRIES + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                self.retry_after_events += 1
+                retry_after = e.retry_after
+                seconds = (
+                    retry_after.total_seconds()
+                    if isinstance(retry_after, timedelta)
+                    else float(retry_after)
+                )
+                self._chat_bucket(chat_id).block_for(seconds)
+                logger.warning(
+                    f"RetryAfter {seconds:.0f}s on {endpoint} for chat {chat_id} "
+                    f"(attempt {attempt + 1}/{OUTBOUND_MAX_RETRIES + 1})"
+                )
+                if attempt >= OUTBOUND_MAX_RETRIES:
+                    raise
+
+    def queue_depths(self) -> Tuple[int, int]:
+        return (
+            len(self._lanes[PRIORITY_INTERACTIVE]),
+            len(self._lanes[PRIORITY_BROADCAST]),
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        interactive, broadcast = self.queue_depths()
+        return {
+            "queue_interactive": interactive,
+            "queue_broadcast": broadcast,
+            "chat_buckets": len(self._chat_buckets),
+            "sent": self.sent,
+            "retry_after_events": self.retry_after_events,
+            "max_wait_seconds": round(self.max_wait_seconds, 2),
+        }
+
+
+outbound_dispatcher = OutboundDispatcher()
@@ -0,0 +1,352 @@
+import asyncio
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Set
+from bot.services.database_service import db_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.constants import (
+    COOLDOWN_TEXT_SIMPLE_SECONDS,
+    COOLDOWN_ADVANCED_SECONDS,
+    DAILY_LIMIT_ADVANCED_OPS,
+    OPERATION_TYPE_TEXT_SIMPLE,
+    OPERATION_TYPE_ADVANCED,
+    RATE_LIMIT_RESTORE_WINDOW_SECONDS,
+)
+from bot.utils.logger import logger
+from bot.utils.rate_limit_utils import TokenBucket
+
+logger = logger.get_logger(__name__)
+
+# Why a request was refused
+RATE_LIMIT_COOLDOWN = "cooldown"
+RATE_LIMIT_DAILY = "daily_limit"
+
+COOLDOWN_SECONDS = {
+    OPERATION_TYPE_TEXT_SIMPLE: COOLDOWN_TEXT_SIMPLE_SECONDS,
+    OPERATION_TYPE_ADVANCED: COOLDOWN_ADVANCED_SECONDS,
+}
+# telegram_user column holding the last operation of each type
+LAST_OP_COLUMNS = {
+    OPERATION_TYPE_TEXT_SIMPLE: "last_text_simple_op_time",
+    OPERATION_TYPE_ADVANCED: "last_advanced_op_time",
+}
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    reason: Optional[str] = None  # RATE_LIMIT_COOLDOWN or RATE_LIMIT_DAILY when refused
+    retry_after: int = 0  # Seconds until the cooldown ends
+    consumed_at: Optional[datetime] = None  # When allowed: the time the operation was counted at
+
+
+class _UserLimits:
+    """Cooldown buckets and today's advanced operations of one user."""
+
+    __slots__ = ("buckets", "last_op", "previous_op", "cleared_op", "day", "advanced_today")
+
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.last_op: Dict[str, datetime] = {}
+        # Last operation before the one in progress, restored by refund()
+        self.previous_op: Dict[str, Optional[datetime]] = {}
+        # Operation types whose stored last operation a refund removed
+        self.cleared_op: Set[str] = set()
+        self.day: Optional[date] = None
+        self.advanced_today = 0
+
+
+class RateLimitService:
+    """Per-user cooldowns and daily limits of /summarize, plus per-chat command cooldowns.
+
+    Checks run against in-memory state only: one check_and_consume() call
+    decides and takes the slot, so concurrent commands of the same user
+    cannot both pass. Changes are written behind to telegram_user and
+    telegram_chat_state with upserts by a background task, and recent state
+    is loaded back by start(). The state lives in the process that handles
+    updates (the frontend, or "all"); job workers, possibly in another
+    process, refund queued operations through the rate_limit_refund table,
+    which apply_queued_refunds() reads periodically.
+
+    The admin flags and the chats where /start was used, checked before
+    every limit, are cached too: loaded by start() and updated with
+    set_admin() and mark_chat_started().
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._users: Dict[int, _UserLimits] = {}
+            self._chat_last_use: Dict[int, float] = {}  # chat_id -> monotonic time
+            self._pending_users: Set[int] = set()
+            self._pending_chats: Set[int] = set()
+            self._admins: Set[int] = set()
+            self._started_chats: Set[int] = set()
+            self._writer: Optional[asyncio.Task] = None
+            self.allowed = 0
+            self.denied_cooldown = 0
+            self.denied_daily = 0
+            self.refunded = 0
+            self.write_errors = 0
+            metrics_service.register_source("rate_limits", self.get_metrics)
+            self.initialized = True
+
+    async def start(self) -> None:
+        """Load the cooldowns and daily counts still in force from the database."""
+        now = datetime.now()
+        since = now - timedelta(seconds=RATE_LIMIT_RESTORE_WINDOW_SECONDS)
+        users, chats = await db_service.get_rate_limit_state(since.isoformat())
+        for row in users:
+            state = self._users.setdefault(row["user_id"], _UserLimits())
+            try:
+                for operation_type, column in LAST_OP_COLUMNS.items():
+                    if row[column] and operation_type not in state.last_op:
+                        state.last_op[operation_type] = datetime.fromisoformat(row[column])
+                if row["advanced_op_count_reset_date"] and state.day is None:
+                    state.day = date.fromisoformat(row["advanced_op_count_reset_date"])
+                    state.advanced_today = row["advanced_op_today_count"] or 0
+            except ValueError:
+                logger.warning(f"Ignoring invalid rate-limit data of user {row['user_id']}: {row}")
+        monotonic_now = time.monotonic()
+        for row in chats:
+            try:
+                elapsed = (now - datetime.fromisoformat(row["last_command_usage"])).total_seconds()
+            except ValueError:
+                continue
+            self._chat_last_use.setdefault(row["chat_id"], monotonic_now - max(elapsed, 0.0))
+        logger.info(f"Rate limits restored for {len(users)} users and {len(chats)} chats")
+        self._admins.update(await db_service.get_admin_users())
+        self._started_chats.update(await db_service.get_started_chat_ids())
+
+    def is_admin(self, user_id: int) -> bool:
+        """Whether the user is a bot admin (not subject to any limit)."""
+        return user_id in self._admins
+
+    def set_admin(self, user_id: int, admin: bool = True) -> None:
+        """Keep the cached admin flag in line with a change saved in telegram_user."""
+        if admin:
+            self._admins.add(user_id)
+        else:
+            self._admins.discard(user_id)
+
+    async def is_chat_started(self, chat_id: int) -> bool:
+        """Whether /start has been used in the chat.
+
+        Only chats not started yet (or started by another process) are
+        looked up in the database.
+        """
+        if chat_id in self._started_chats:
+            return True
+        chat_state = await db_service.get_chat_state(chat_id)
+        if chat_state and chat_state.get("is_bot_started"):
+            self._started_chats.add(chat_id)
+            return True
+        return False
+
+    def mark_chat_started(self, chat_id: int) -> None:
+        """Cache a /start saved in telegram_chat_state."""
+        self._started_chats.add(chat_id)
+
+    def check_and_consume(self, user_id: int, operation_type: str) -> RateLimitResult:
+        """Check the cooldown and daily limit of an operation and, if allowed, count it."""
+        now = datetime.now()
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserLimits()
+
+        bucket = self._bucket(state, operation_type, now)
+        wait = bucket.delay()
+        if wait > 0:
+            self.denied_cooldown += 1
+            return RateLimitResult(False, RATE_LIMIT_COOLDOWN, math.ceil(wait))
+
+        if operation_type == OPERATION_TYPE_ADVANCED:
+            if state.day != now.date():
+                state.day = now.date()
+                state.advanced_today = 0
+            if state.advanced_today >= DAILY_LIMIT_ADVANCED_OPS:
+                self.denied_daily += 1
+                return RateLimitResult(False, RATE_LIMIT_DAILY)
+            state.advanced_today += 1
+
+        bucket.consume()
+        state.previous_op[operation_type] = state.last_op.get(operation_type)
+        state.last_op[operation_type] = now
+        state.cleared_op.discard(operation_type)
+        self.allowed += 1
+        self._mark_user(user_id)
+        return RateLimitResult(True, consumed_at=now)
+
+    def refund(self, user_id: int, operation_type: str) -> None:
+        """Give back an operation that was allowed but did not produce a result."""
+        state = self._users.get(user_id)
+        if state is None or operation_type not in state.previous_op:
+            return
+        bucket = state.buckets[operation_type]
+        bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+        previous = state.previous_op.pop(operation_type)
+        if previous is None:
+            state.last_op.pop(operation_type, None)
+            # The write-behind must clear the stored time, not keep it
+            state.cleared_op.add(operation_type)
+        else:
+            state.last_op[operation_type] = previous
+        if operation_type == OPERATION_TYPE_ADVANCED and state.advanced_today > 0:
+            state.advanced_today -= 1
+        self.refunded += 1
+        self._mark_user(user_id)
+
+    async def apply_queued_refunds(self) -> None:
+        """Apply the refunds job workers recorded with db_service.add_rate_limit_refund."""
+        try:
+            rows = await db_service.take_rate_limit_refunds()
+        except Exception as e:
+            logger.error(f"Could not read queued rate-limit refunds: {e}", exc_info=True)
+            return
+        for row in rows:
+            try:
+                consumed_at = datetime.fromisoformat(row["consumed_at"])
+            except ValueError:
+                logger.warning(f"Ignoring invalid rate-limit refund: {row}")
+                continue
+            self._refund_consumed(row["user_id"], row["operation_type"], consumed_at)
+        if rows:
+            logger.info(f"Applied {len(rows)} rate-limit refunds of queued operations")
+
+    def _refund_consumed(self, user_id: int, operation_type: str, consumed_at: datetime) -> None:
+        state = self._users.get(user_id)
+        if state is None:
+            return  # Evicted: nothing it counted is still in force
+        if state.last_op.get(operation_type) == consumed_at:
+            self.refund(user_id, operation_type)
+            return
+        # A later operation replaced it: only its daily count can be given back
+        if (
+            operation_type == OPERATION_TYPE_ADVANCED
+            and state.day == consumed_at.date()
+            and state.advanced_today > 0
+        ):
+            state.advanced_today -= 1
+            self.refunded += 1
+            self._mark_user(user_id)
+
+    def check_chat_cooldown(self, chat_id: int, seconds: float) -> RateLimitResult:
+        """Command cooldown shared by everyone in a chat; starts it when allowed."""
+        now = time.monotonic()
+        last_use = self._chat_last_use.get(chat_id)
+        if last_use is not None and now - last_use < seconds:
+            self.denied_cooldown += 1
+            return RateLimitResult(False, RATE_LIMIT_COOLDOWN, math.ceil(seconds - (now - last_use)))
+        self._chat_last_use[chat_id] = now
+        self.allowed += 1
+        self._pending_chats.add(chat_id)
+        self._ensure_writer()
+        return RateLimitResult(True)
+
+    async def flush(self) -> None:
+        """Wait until every pending change is written to the database."""
+        if self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "tracked_users": len(self._users),
+            "tracked_chats": len(self._chat_last_use),
+            "started_chats": len(self._started_chats),
+            "allowed": self.allowed,
+            "denied_cooldown": self.denied_cooldown,
+            "denied_daily_limit": self.denied_daily,
+            "refunded": self.refunded,
+            "pending_writes": len(self._pending_users) + len(self._pending_chats),
+            "write_errors": self.write_errors,
+        }
+
+    def _bucket(self, state: _UserLimits, operation_type: str, now: datetime) -> TokenBucket:
+        bucket = state.buckets.get(operation_type)
+        if bucket is None:
+            cooldown = COOLDOWN_SECONDS[operation_type]
+            bucket = state.buckets[operation_type] = TokenBucket(1 / cooldown, 1)
+            last_op = state.last_op.get(operation_type)
+            if last_op is not None:
+                elapsed = max((now - last_op).total_seconds(), 0.0)
+                bucket.tokens = min(1.0, elapsed / cooldown)
+        return bucket
+
+    def _mark_user(self, user_id: int) -> None:
+        self._pending_users.add(user_id)
+        self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+
+    def _user_row(self, user_id: int) -> tuple:
+        # None keeps the stored value unless the operation was refunded (see save_rate_limit_state)
+        state = self._users[user_id]
+        last_op = {
+            operation_type: state.last_op[operation_type].isoformat()
+            if operation_type in state.last_op else None
+            for operation_type in LAST_OP_COLUMNS
+        }
+        return (
+            user_id,
+            last_op[OPERATION_TYPE_TEXT_SIMPLE],
+            last_op[OPERATION_TYPE_ADVANCED],
+            state.advanced_today,
+            state.day.isoformat() if state.day else None,
+            OPERATION_TYPE_TEXT_SIMPLE in state.cleared_op,
+            OPERATION_TYPE_ADVANCED in state.cleared_op,
+        )
+
+    async def _write_pending(self) -> None:
+        # Changes made while a batch is being written go in the next batch
+        while self._pending_users or self._pending_chats:
+            user_ids, self._pending_users = self._pending_users, set()
+            chat_ids, self._pending_chats = self._pending_chats, set()
+            now, monotonic_now = datetime.now(), time.monotonic()
+            user_rows = [self._user_row(user_id) for user_id in user_ids if user_id in self._users]
+            chat_rows = [
+                (chat_id, (now - timedelta(seconds=monotonic_now - self._chat_last_use[chat_id])).isoformat())
+                for chat_id in chat_ids
+                if chat_id in self._chat_last_use
+            ]
+            try:
+                await db_service.save_rate_limit_state(user_rows, chat_rows)
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(
+                    f"Could not save rate limits of {len(user_rows)} users and {len(chat_rows)} chats: {e}",
+                    exc_info=True,
+                )
+                self._pending_users |= user_ids
+                self._pending_chats |= chat_ids
+                return
+        self._evict_idle()
+
+    def _evict_idle(self) -> None:
+        """Forget users and chats whose limits no longer restrict anything."""
+        now = datetime.now()
+        for user_id, state in list(self._users.items()):
+            if user_id in self._pending_users:
+                continue
+            counting = state.day == now.date() and state.advanced_today > 0
+            cooling = any(
+                (now - last_op).total_seconds() < COOLDOWN_SECONDS[operation_type]
+                for operation_type, last_op in state.last_op.items()
+            )
+            if not counting and not cooling:
+                del self._users[user_id]
+        cutoff = time.monotonic() - RATE_LIMIT_RESTORE_WINDOW_SECONDS
+        for chat_id, last_use in list(self._chat_last_use.items()):
+            if last_use < cutoff and chat_id not in self._pending_chats:
+                del self._chat_last_use[chat_id]
+
+
+rate_limit_service = RateLimitService()
@@ -0,0 +1,167 @@
+import asyncio
+import pickle
+from typing import Dict, List, Optional, Tuple
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from bot.services.database_service import db_service
+from bot.utils.constants import (
+    SCHEDULER_STORE_RETRY_BASE_SECONDS,
+    SCHEDULER_STORE_RETRY_MAX_SECONDS,
+    SCHEDULER_STORE_FLUSH_ATTEMPTS,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+class DatabaseJobStore(MemoryJobStore):
+    """APScheduler job store kept in the scheduler_job table of the bot database.
+
+    The scheduler calls job stores synchronously from the event loop, so the
+    jobs are served from memory and every change is written behind through
+    db_service's connection by a background task. A second, blocking SQLite
+    connection on the loop would deadlock against a statement of the shared
+    one that is waiting for the loop to finish.
+
+    A failed write keeps its changes pending and is retried with
+    exponential backoff.
+
+    Rows are (id, next_run_time, pickled job state), the same layout as
+    APScheduler's SQLAlchemyJobStore.
+    """
+
+    def __init__(self, rows: List[Dict], pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        """
+        Args:
+            rows: Stored jobs from db_service.get_scheduler_jobs(), restored on start
+        """
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+        self._rows = rows
+        # Pending writes: job id -> (next_run_time, job_state), or None to delete it
+        self._pending: Dict[str, Optional[Tuple[Optional[float], bytes]]] = {}
+        self._clear_pending = False
+        self._writer: Optional[asyncio.Task] = None
+        self._write_failures = 0
+        # Set by the writer after each write attempt; set by flush() to skip a backoff wait
+        self._attempted = asyncio.Event()
+        self._retry_now = asyncio.Event()
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        failed_job_ids = []
+        for row in self._rows:
+            try:
+                MemoryJobStore.add_job(self, self._reconstitute_job(row["job_state"]))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s" -- removing it', row["id"])
+                failed_job_ids.append(row["id"])
+        self._rows = []
+        for job_id in failed_job_ids:
+            self._write(job_id, None)
+
+    def add_job(self, job):
+        super().add_job(job)
+        self._write(job.id, self._serialize(job))
+
+    def update_job(self, job):
+        super().update_job(job)
+        self._write(job.id, self._serialize(job))
+
+    def remove_job(self, job_id):
+        super().remove_job(job_id)
+        self._write(job_id, None)
+
+    def remove_all_jobs(self):
+        super().remove_all_jobs()
+        self._pending.clear()
+        self._clear_pending = True
+        self._ensure_writer()
+
+    def shutdown(self):
+        # Only forget the jobs in memory; the stored ones are picked up on the next start
+        MemoryJobStore.remove_all_jobs(self)
+
+    async def flush(self) -> None:
+        """Wait until every pending change is written to the database.
+
+        Retries are made right away instead of after their backoff; gives up
+        (leaving the changes to the background writer) once
+        SCHEDULER_STORE_FLUSH_ATTEMPTS writes have failed.
+        """
+        failures_before = self._write_failures
+        while self._writer is not None and not self._writer.done():
+            if self._write_failures - failures_before >= SCHEDULER_STORE_FLUSH_ATTEMPTS:
+                logger.error(
+                    f"Could not flush {len(self._pending)} scheduler job changes after "
+                    f"{SCHEDULER_STORE_FLUSH_ATTEMPTS} failed writes"
+                )
+                return
+            self._attempted.clear()
+            self._retry_now.set()
+            attempted = asyncio.ensure_future(self._attempted.wait())
+            try:
+                await asyncio.wait({self._writer, attempted}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                attempted.cancel()
+
+    def _serialize(self, job: Job) -> Tuple[Optional[float], bytes]:
+        return (
+            datetime_to_utc_timestamp(job.next_run_time),
+            pickle.dumps(job.__getstate__(), self.pickle_protocol),
+        )
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        job_state = pickle.loads(job_state)
+        job_state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _write(self, job_id: str, row: Optional[Tuple[Optional[float], bytes]]) -> None:
+        self._pending[job_id] = row
+        self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        # Changes made while a batch is being written go in the next batch
+        failures = 0
+        while self._pending or self._clear_pending:
+            if await self._write_batch():
+                failures = 0
+                self._attempted.set()
+                continue
+            failures += 1
+            self._write_failures += 1
+            delay = min(
+                SCHEDULER_STORE_RETRY_MAX_SECONDS,
+                SCHEDULER_STORE_RETRY_BASE_SECONDS * 2 ** (failures - 1),
+            )
+            logger.warning(f"Retrying scheduler job store write in {delay}s")
+            self._retry_now.clear()
+            self._attempted.set()
+            try:
+                await asyncio.wait_for(self._retry_now.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _write_batch(self) -> bool:
+        batch, self._pending = self._pending, {}
+        clear, self._clear_pending = self._clear_pending, False
+        upserts = [(job_id, *row) for job_id, row in batch.items() if row is not None]
+        deleted_ids = [job_id for job_id, row in batch.items() if row is None]
+        try:
+            await db_service.save_scheduler_jobs(upserts, deleted_ids, clear)
+            return True
+        except Exception as e:
+            logger.error(f"Could not save {len(batch)} scheduler jobs: {e}", exc_info=True)
+            # Keep what was not changed again meanwhile, for the next write
+            self._pending = {**batch, **self._pending}
+            self._clear_pending = self._clear_pending or clear
+            return False
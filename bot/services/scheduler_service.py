@@ -1,11 +1,86 @@
+import pickle
+import re
+import time
+import uuid
 import pytz
+from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Dict, List
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_MISSED,
+)
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from bot.services.job_service import job_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.constants import (
+    SCRATCH_JANITOR_INTERVAL_MINUTES,
+    DAILY_PRESUMMARY_INTERVAL_MINUTES,
+    SCHEDULER_LAG_WARNING_SECONDS,
+    RATE_LIMIT_REFUND_POLL_SECONDS,
+    USAGE_BUDGET_REFRESH_SECONDS,
+    SCHEDULER_LEADER_LEASE_SECONDS,
+    SCHEDULER_LEADER_RENEW_SECONDS,
+)
 from bot.utils.logger import logger
 
 logger = logger.get_logger(__name__)
 
+DAILY_SUMMARY_JOB_PREFIX = "daily_summary_"
+DAILY_SUMMARY_RETRY_PREFIX = "daily_summary_retry_"
+# Jobs that are rebuilt on every boot and cannot be pickled (bound methods)
+MEMORY_JOBSTORE = "memory"
+# Background job asking the process that runs daily summaries to re-read a chat's hour
+DAILY_SUMMARY_SCHEDULE_JOB = "daily_summary_schedule"
+# scheduler_lease held by the one process that runs the daily summaries
+DAILY_SUMMARY_LEASE = "daily_summaries"
+
+
+def job_kind(job_id: str) -> str:
+    """Job id without its chat id: daily_summary_123 -> daily_summary"""
+    return re.sub(r"_-?\d+$", "", job_id)
+
+
+class _JobStats:
+    """Start lag, duration, outcomes and misfires of one kind of scheduled job."""
+
+    def __init__(self):
+        self.runs = 0
+        self.missed = 0
+        self.outcomes: Dict[str, int] = defaultdict(int)
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+
+    def record_run(self, lag: float, duration: float, outcome: str) -> None:
+        self.runs += 1
+        self.outcomes[outcome] += 1
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.duration_total += duration
+        self.duration_max = max(self.duration_max, duration)
+
+    def describe(self) -> str:
+        outcomes = ", ".join(f"{name} {count}" for name, count in sorted(self.outcomes.items()))
+        text = f"{self.runs} runs" + (f" ({outcomes})" if outcomes else "")
+        if self.missed:
+            text += f", {self.missed} missed"
+        if self.runs:
+            text += (
+                f", lag avg {self.lag_total / self.runs:.1f}s max {self.lag_max:.1f}s"
+                f", duration avg {self.duration_total / self.runs:.1f}s "
+                f"max {self.duration_max:.1f}s"
+            )
+        return text
+
 
 class SchedulerService:
     _instance = None
@@ -19,27 +94,80 @@ class SchedulerService:
     def __init__(self):
         if not self.initialized:
             self.scheduler = AsyncIOScheduler()
+            self.job_store = None  # Set up in start(), once the database path is known
+            # True only in the process holding the daily summary lease (see start())
+            self.runs_daily_summaries = False
+            self.lease_owner = f"{job_service.worker_id}:{uuid.uuid4().hex[:8]}"
+            self._lease_expires_at = 0.0
+            self.job_stats: Dict[str, _JobStats] = {}
+            self._started_at: Dict[str, float] = {}
+            self.scheduler.add_listener(
+                self._on_job_event,
+                EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED,
+            )
+            metrics_service.register_source("scheduler", self.get_metrics)
             self.initialized = True
 
-    async def start(self):
-        """Start the scheduler and load all configured daily summary jobs"""
+    async def start(self, daily_summaries: bool = True):
+        """Start the scheduler and load all configured daily summary jobs.
+
+        Several workers may share the database, but only the one holding the
+        daily summary lease schedules them (and applies schedule changes);
+        the others stand by and take over if its lease expires.
+
+        Args:
+            daily_summaries: False to only run this process's housekeeping jobs
+                (frontend process; a worker runs the daily summaries)
+        """
         logger.debug(f"=== SCHEDULER SERVICE START ===")
 
         try:
             if not self.scheduler.running:
                 logger.debug("Scheduler not running, initializing...")
 
+                leader = daily_summaries and await self._renew_lease()
+
+                # Daily summaries live in the bot database so a restart keeps their
+                # next run time and missed runs are caught up (within the grace time)
+                await self._configure_job_stores(leader)
+
+                # Read the configs BEFORE starting: the reconcile has to run before the
+                # scheduler's first wakeup, which is when missed runs are caught up
+                configs = await self._get_daily_summary_configs() if leader else None
+
                 # Start APScheduler FIRST
                 logger.debug("Starting APScheduler...")
                 self.scheduler.start()
+                self.runs_daily_summaries = leader
+                # Schedule changes are applied by the leader, whichever process it is
+                job_service.set_paused(DAILY_SUMMARY_SCHEDULE_JOB, not leader)
+
+                if leader:
+                    # THEN bring the stored daily summary jobs in line with the configs
+                    logger.debug("Reconciling daily summary jobs with the database...")
+                    self._reconcile_daily_summary_jobs(configs)
 
-                # THEN load all configured daily summary jobs
-                logger.debug("Loading daily summary jobs from database...")
-                await self._load_daily_summary_jobs()
+                    # Add intra-day pre-summarization (optional)
+                    self._add_presummary_job()
+                elif daily_summaries:
+                    logger.info("Daily summaries are run by another worker; standing by")
+
+                if daily_summaries:
+                    # Renew the lease, or take it over once its holder stops renewing
+                    self._add_leader_lease_job()
 
                 # Add heartbeat job
                 self._add_heartbeat_job()
 
+                # Add scratch space janitor
+                self._add_scratch_janitor_job()
+
+                # Refunds of queued operations, where the rate limits live
+                self._add_rate_limit_refund_job()
+
+                # Other processes' LLM usage, for the chat token budgets
+                self._add_usage_refresh_job()
+
                 # Log current jobs
                 jobs = self.get_scheduled_jobs()
                 logger.info(f"=== SCHEDULER STARTED - {len(jobs)} JOBS LOADED ===")
@@ -49,7 +177,7 @@ class SchedulerService:
                     )
                 else:
                     for job in jobs:
-                        logger.info(
+                        logger.debug(
                             f"-> Job Loaded: ID={job['id']}, Name='{job['name']}', Next Run (UTC): {job['next_run']}"
                         )
             else:
@@ -60,38 +188,125 @@ class SchedulerService:
             logger.error(f"Error starting scheduler: {e}", exc_info=True)
             raise
 
-    async def _load_daily_summary_jobs(self):
-        """Load all daily summary jobs from database configuration"""
-        logger.debug("=== LOADING DAILY SUMMARY JOBS ===")
-
+    async def _configure_job_stores(self, daily_summaries: bool):
+        """Database-backed store for daily summaries, memory store for the rest"""
+        # Import here to avoid circular imports
+        from bot.config import config
+        from bot.services.database_service import db_service
+        from bot.services.scheduler_job_store import DatabaseJobStore
+
+        jobstores = {MEMORY_JOBSTORE: MemoryJobStore()}
+        if daily_summaries:
+            self.job_store = DatabaseJobStore(await db_service.get_scheduler_jobs())
+            jobstores["default"] = self.job_store
+        self.scheduler.configure(
+            jobstores=jobstores,
+            job_defaults={
+                "misfire_grace_time": config.SCHEDULER_MISFIRE_GRACE_SECONDS,
+                "coalesce": config.SCHEDULER_COALESCE,
+            },
+        )
+
+    async def _get_daily_summary_configs(self):
+        """Chats with daily summaries enabled, or None if they could not be read"""
         try:
             # Import here to avoid circular imports
             from bot.services.database_service import db_service
 
-            # Get all chats with daily summaries enabled
             logger.debug("Querying database for daily summary configurations...")
-            configs = await db_service.get_all_daily_summary_configs()
+            return await db_service.get_all_daily_summary_configs()
+        except Exception as e:
+            logger.error(f"Failed to load daily summary jobs: {e}", exc_info=True)
+            return None
 
-            logger.info(f"Found {len(configs)} daily summary configurations")
-            jobs_created = 0
+    def _reconcile_daily_summary_jobs(self, configs):
+        """Bring the stored daily summary jobs in line with the database configuration.
 
-            # Create a job for each chat
-            for config in configs:
-                chat_id = config["chat_id"]
-                hour = config["daily_summary_hour"]
+        Only jobs that are missing, whose schedule changed or whose chat no
+        longer wants a summary are replaced or removed; the rest keep their
+        stored next run time, so a run missed while the bot was down is
+        still caught up.
+        """
+        logger.debug("=== RECONCILING DAILY SUMMARY JOBS ===")
 
-                logger.debug(f"Processing config - Chat: {chat_id}, Hour: {hour}")
+        # Without the configs, keep the stored jobs as they are
+        if configs is None:
+            return
 
-                if hour != "off":
+        try:
+            # Import here to avoid circular imports
+            from bot.config import config
+
+            wanted = {
+                f"{DAILY_SUMMARY_JOB_PREFIX}{chat['chat_id']}": chat
+                for chat in configs
+                if chat["daily_summary_hour"] != "off"
+            }
+            stored = {
+                job.id: job
+                for job in self.job_store.get_all_jobs()
+                if job.id.startswith(DAILY_SUMMARY_JOB_PREFIX)
+                and not job.id.startswith(DAILY_SUMMARY_RETRY_PREFIX)
+            }
+
+            added = updated = unchanged = failed = 0
+            for job_id, chat in wanted.items():
+                chat_id = chat["chat_id"]
+                hour = chat["daily_summary_hour"]
+                job = stored.get(job_id)
+                if job and self._schedule_matches(chat_id, hour, job):
+                    unchanged += 1
+                    # Stored jobs keep the options they were added with
+                    if (job.misfire_grace_time, job.coalesce) != (
+                        config.SCHEDULER_MISFIRE_GRACE_SECONDS,
+                        config.SCHEDULER_COALESCE,
+                    ):
+                        job.modify(
+                            misfire_grace_time=config.SCHEDULER_MISFIRE_GRACE_SECONDS,
+                            coalesce=config.SCHEDULER_COALESCE,
+                        )
+                    continue
+                try:
                     self.add_daily_summary_job(chat_id, hour)
-                    jobs_created += 1
+                except Exception:
+                    failed += 1
+                    continue
+                if job:
+                    updated += 1
                 else:
-                    logger.debug(f"Skipping chat {chat_id} - daily summary is off")
+                    added += 1
+
+            stale = [job_id for job_id in stored if job_id not in wanted]
+            for job_id in stale:
+                self.remove_daily_summary_job(int(job_id[len(DAILY_SUMMARY_JOB_PREFIX):]))
 
-            logger.info(f"Successfully created {jobs_created} daily summary jobs")
+            logger.info(
+                f"Daily summary jobs reconciled: {len(wanted)} configured, {unchanged} unchanged, "
+                f"{added} added, {updated} rescheduled, {len(stale)} removed, {failed} failed"
+            )
 
         except Exception as e:
-            logger.error(f"Failed to load daily summary jobs: {e}", exc_info=True)
+            logger.error(f"Failed to reconcile daily summary jobs: {e}", exc_info=True)
+
+    def _schedule_matches(self, chat_id: int, hour: str, job: Job) -> bool:
+        """Whether a stored job still follows the chat's configured schedule"""
+        if not hour.isdigit():
+            return False
+        return repr(job.trigger) == repr(self._daily_summary_trigger(chat_id, hour))
+
+    def _daily_summary_trigger(self, chat_id: int, hour: str) -> CronTrigger:
+        """Cron trigger for the specified hour (Madrid timezone), at this chat's
+        own offset so the chats of the same hour do not all start at once"""
+        # Import here to avoid circular imports
+        from bot.services.daily_summary_service import daily_summary_offset
+
+        offset = daily_summary_offset(chat_id)
+        return CronTrigger(
+            hour=int(hour),
+            minute=offset // 60,
+            second=offset % 60,
+            timezone=pytz.timezone("Europe/Madrid"),
+        )
 
     def add_daily_summary_job(self, chat_id: int, hour: str):
         """Add or update a daily summary job for a specific chat.
@@ -108,7 +323,7 @@ class SchedulerService:
             if not hour.isdigit() or not (0 <= int(hour) <= 23):
                 raise ValueError(f"Invalid hour format: {hour}. Must be 00-23")
 
-            job_id = f"daily_summary_{chat_id}"
+            job_id = f"{DAILY_SUMMARY_JOB_PREFIX}{chat_id}"
 
             # Check if scheduler is running
             if not self.scheduler.running:
@@ -117,22 +332,17 @@ class SchedulerService:
                 )
                 raise RuntimeError("Scheduler is not running")
 
-            # Create a cron trigger for the specified hour (Madrid timezone)
-            trigger = CronTrigger(
-                hour=int(hour), minute=0, timezone=pytz.timezone("Europe/Madrid")
-            )
-            logger.debug(f"Created cron trigger for {hour}:00 Madrid time")
-
             # Import here to avoid circular imports
-            from bot.services.daily_summary_service import send_daily_summary_for
+            from bot.services.daily_summary_service import (
+                send_daily_summary_for,
+                daily_summary_offset,
+            )
 
-            # Remove existing job if present
-            existing_job = self.scheduler.get_job(job_id)
-            if existing_job:
-                logger.debug(f"Removing existing job {job_id}")
-                self.scheduler.remove_job(job_id)
+            offset = daily_summary_offset(chat_id)
+            trigger = self._daily_summary_trigger(chat_id, hour)
+            logger.debug(f"Created cron trigger for {hour}:{offset // 60:02d}:{offset % 60:02d} Madrid time")
 
-            # Add the job
+            # Add the job (replacing the stored one, if any)
             job = self.scheduler.add_job(
                 send_daily_summary_for,
                 trigger=trigger,
@@ -143,7 +353,8 @@ class SchedulerService:
             )
 
             logger.info(
-                f"✅ Successfully added daily summary job for chat {chat_id} at {hour}:00"
+                f"✅ Successfully added daily summary job for chat {chat_id} at "
+                f"{hour}:{offset // 60:02d}:{offset % 60:02d}"
             )
             logger.debug(f"Job next run time: {job.next_run_time}")
 
@@ -163,6 +374,27 @@ class SchedulerService:
             )
             raise
 
+    def add_daily_summary_retry(self, chat_id: int, run_date: datetime, attempt: int, run_key: str):
+        """Schedule a one-off retry of a failed daily summary.
+
+        Args:
+            chat_id: The chat ID
+            run_date: When to retry (timezone-aware)
+            attempt: Number of the attempt that will run
+            run_key: Run the retry belongs to, for the run report
+        """
+        # Import here to avoid circular imports
+        from bot.services.daily_summary_service import retry_daily_summary_for
+
+        self.scheduler.add_job(
+            retry_daily_summary_for,
+            trigger=DateTrigger(run_date=run_date),
+            id=f"{DAILY_SUMMARY_RETRY_PREFIX}{chat_id}",
+            name=f"Daily summary retry for chat {chat_id}",
+            replace_existing=True,
+            args=[chat_id, attempt, run_key],
+        )
+
     def remove_daily_summary_job(self, chat_id: int):
         """Remove the daily summary job for a specific chat.
 
@@ -170,7 +402,7 @@ class SchedulerService:
             chat_id: The chat ID
         """
         try:
-            job_id = f"daily_summary_{chat_id}"
+            job_id = f"{DAILY_SUMMARY_JOB_PREFIX}{chat_id}"
 
             # Remove the job if it exists
             if self.scheduler.get_job(job_id):
@@ -179,6 +411,10 @@ class SchedulerService:
             else:
                 logger.debug(f"No daily summary job found for chat {chat_id}")
 
+            # And any pending retry
+            if self.scheduler.get_job(f"{DAILY_SUMMARY_RETRY_PREFIX}{chat_id}"):
+                self.scheduler.remove_job(f"{DAILY_SUMMARY_RETRY_PREFIX}{chat_id}")
+
         except Exception as e:
             logger.error(
                 f"Error removing daily summary job for chat {chat_id}: {e}",
@@ -204,6 +440,92 @@ class SchedulerService:
                 exc_info=True,
             )
 
+    async def schedule_daily_summary_update(self, chat_id: int, hour: str):
+        """Apply a chat's new daily summary hour, here or in the leader worker.
+
+        Args:
+            chat_id: The chat ID
+            hour: The new hour setting, already saved in chat_summary_config
+        """
+        if self.runs_daily_summaries:
+            self.update_daily_summary_job(chat_id, hour)
+        else:
+            # The leader reads the saved hour when it runs the job
+            await job_service.enqueue(DAILY_SUMMARY_SCHEDULE_JOB, {"chat_id": chat_id})
+            logger.info(f"Daily summary schedule change for chat {chat_id} handed to the leader worker")
+
+    async def flush(self):
+        """Wait until the job store has saved its pending changes, then hand
+        the daily summaries over to the next worker"""
+        if self.job_store is not None:
+            await self.job_store.flush()
+        if self.runs_daily_summaries:
+            # Import here to avoid circular imports
+            from bot.services.database_service import db_service
+
+            self.runs_daily_summaries = False
+            try:
+                await db_service.release_scheduler_lease(DAILY_SUMMARY_LEASE, self.lease_owner)
+            except Exception as e:
+                logger.error(f"Could not release the daily summary lease: {e}", exc_info=True)
+
+    async def _renew_lease(self) -> bool:
+        """Take or renew the daily summary lease; whether this process holds it"""
+        # Import here to avoid circular imports
+        from bot.services.database_service import db_service
+
+        now = time.time()
+        try:
+            held = await db_service.acquire_scheduler_lease(
+                DAILY_SUMMARY_LEASE, self.lease_owner, now, SCHEDULER_LEADER_LEASE_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Could not renew the daily summary lease: {e}", exc_info=True)
+            # Still ours until it expires, unless another worker got it by then
+            return now < self._lease_expires_at
+        if held:
+            self._lease_expires_at = now + SCHEDULER_LEADER_LEASE_SECONDS
+        return held
+
+    async def _maintain_leadership(self):
+        """Renew the daily summary lease; take over or step down when it changes hands"""
+        held = await self._renew_lease()
+        if held and not self.runs_daily_summaries:
+            await self._become_leader()
+        elif not held and self.runs_daily_summaries:
+            await self._step_down()
+
+    async def _become_leader(self):
+        """Load the stored daily summaries and start running them here"""
+        # Import here to avoid circular imports
+        from bot.services.database_service import db_service
+        from bot.services.scheduler_job_store import DatabaseJobStore
+
+        logger.info("Took over the daily summary lease; loading the stored daily summaries")
+        rows = await db_service.get_scheduler_jobs()
+        configs = await self._get_daily_summary_configs()
+        # Replaces the empty memory store APScheduler adds as "default" on start
+        self.scheduler.remove_jobstore("default")
+        self.job_store = DatabaseJobStore(rows)
+        self.scheduler.add_jobstore(self.job_store, "default")
+        self._reconcile_daily_summary_jobs(configs)
+        self._add_presummary_job()
+        self.runs_daily_summaries = True
+        job_service.set_paused(DAILY_SUMMARY_SCHEDULE_JOB, False)
+
+    async def _step_down(self):
+        """Stop running daily summaries: another worker holds the lease now"""
+        logger.warning("Lost the daily summary lease; another worker runs the daily summaries")
+        self.runs_daily_summaries = False
+        job_service.set_paused(DAILY_SUMMARY_SCHEDULE_JOB, True)
+        if self.scheduler.get_job("daily_presummary"):
+            self.scheduler.remove_job("daily_presummary")
+        self.scheduler.remove_jobstore("default")
+        self.scheduler.add_jobstore(MemoryJobStore(), "default")
+        # Next run times of the jobs that ran while this process was the leader
+        await self.job_store.flush()
+        self.job_store = None
+
     def stop(self):
         """Stop the scheduler"""
         try:
@@ -248,6 +570,7 @@ class SchedulerService:
                 trigger=trigger,
                 id="scheduler_heartbeat",
                 name="Scheduler Heartbeat",
+                jobstore=MEMORY_JOBSTORE,
                 replace_existing=True,
             )
 
@@ -256,11 +579,244 @@ class SchedulerService:
         except Exception as e:
             logger.error(f"Failed to add heartbeat job: {e}", exc_info=True)
 
+    def _add_scratch_janitor_job(self):
+        """Periodically remove scratch directories orphaned by crashed jobs"""
+        try:
+            from bot.services.scratch_service import scratch_service
+
+            self.scheduler.add_job(
+                func=scratch_service.cleanup_orphans,
+                trigger=IntervalTrigger(minutes=SCRATCH_JANITOR_INTERVAL_MINUTES),
+                id="scratch_janitor",
+                name="Scratch Space Janitor",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
+
+            logger.info(
+                f"Scratch janitor job added (every {SCRATCH_JANITOR_INTERVAL_MINUTES} minutes)"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to add scratch janitor job: {e}", exc_info=True)
+
+    def _add_rate_limit_refund_job(self):
+        """Apply the rate-limit refunds recorded by job workers (not in the worker role)"""
+        try:
+            # Import here to avoid circular imports
+            from bot.config import config
+            from bot.services.rate_limit_service import rate_limit_service
+
+            if config.PROCESS_ROLE == "worker":
+                return
+            self.scheduler.add_job(
+                func=rate_limit_service.apply_queued_refunds,
+                trigger=IntervalTrigger(seconds=RATE_LIMIT_REFUND_POLL_SECONDS),
+                id="rate_limit_refunds",
+                name="Rate Limit Refunds",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
+
+            logger.info(
+                f"Rate-limit refund job added (every {RATE_LIMIT_REFUND_POLL_SECONDS} seconds)"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to add rate-limit refund job: {e}", exc_info=True)
+
+    def _add_usage_refresh_job(self):
+        """Re-read today's tokens per chat where budgets are checked (not in the worker role)"""
+        try:
+            # Import here to avoid circular imports
+            from bot.config import config
+            from bot.services.usage_service import usage_service
+
+            if config.PROCESS_ROLE == "worker" or config.CHAT_DAILY_TOKEN_BUDGET <= 0:
+                return
+            self.scheduler.add_job(
+                func=usage_service.refresh_chat_tokens,
+                trigger=IntervalTrigger(seconds=USAGE_BUDGET_REFRESH_SECONDS),
+                id="usage_refresh",
+                name="Chat Token Usage Refresh",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
+
+            logger.info(
+                f"Usage refresh job added (every {USAGE_BUDGET_REFRESH_SECONDS} seconds)"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to add usage refresh job: {e}", exc_info=True)
+
+    def _add_leader_lease_job(self):
+        """Keep (or wait for) the lease on the daily summaries"""
+        try:
+            self.scheduler.add_job(
+                func=self._maintain_leadership,
+                trigger=IntervalTrigger(seconds=SCHEDULER_LEADER_RENEW_SECONDS),
+                id="daily_summary_lease",
+                name="Daily Summary Lease",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
+
+            logger.info(
+                f"Daily summary lease job added (every {SCHEDULER_LEADER_RENEW_SECONDS} seconds)"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to add daily summary lease job: {e}", exc_info=True)
+
+    def _add_presummary_job(self):
+        """Summarize new messages in windows during the day, if enabled"""
+        try:
+            from bot.config import config
+            from bot.services.daily_summary_service import presummarize_chats
+
+            if not config.DAILY_PRESUMMARY_ENABLED:
+                return
+
+            self.scheduler.add_job(
+                func=presummarize_chats,
+                trigger=IntervalTrigger(minutes=DAILY_PRESUMMARY_INTERVAL_MINUTES),
+                id="daily_presummary",
+                name="Daily Summary Pre-summarization",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
+
+            logger.info(
+                f"Pre-summarization job added (every {DAILY_PRESUMMARY_INTERVAL_MINUTES} minutes)"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to add pre-summarization job: {e}", exc_info=True)
+
     def _scheduler_heartbeat(self):
         """Log a heartbeat message to verify scheduler is alive"""
         jobs_count = len(self.scheduler.get_jobs())
-        logger.info(f"💓 Scheduler heartbeat - {jobs_count} jobs active")
+        missed = sum(stats.missed for stats in self.job_stats.values())
+        failed = sum(stats.outcomes.get("error", 0) for stats in self.job_stats.values())
+        logger.info(
+            f"💓 Scheduler heartbeat - {jobs_count} jobs active, "
+            f"{missed} missed and {failed} failed runs since start"
+        )
+        # Import here to avoid circular imports
+        from bot.config import config
+
+        if config.PROCESS_ROLE == "worker":
+            # /metrics is answered by the frontend; the worker's numbers are only in its logs
+            logger.info(f"Metrics: {metrics_service.snapshot()}")
         return
 
+    def _on_job_event(self, event):
+        """Record start lag, duration, outcome and misfires of every job run"""
+        try:
+            stats = self.job_stats.setdefault(job_kind(event.job_id), _JobStats())
+            now = time.time()
+            if event.code == EVENT_JOB_SUBMITTED:
+                self._started_at[event.job_id] = now
+            elif event.code == EVENT_JOB_MISSED:
+                # Submitted, but too late to run (beyond misfire_grace_time)
+                self._started_at.pop(event.job_id, None)
+                stats.missed += 1
+            else:
+                started_at = self._started_at.pop(event.job_id, now)
+                lag = max(0.0, started_at - event.scheduled_run_time.timestamp())
+                if lag > SCHEDULER_LAG_WARNING_SECONDS:
+                    logger.warning(f"Job {event.job_id} started {lag:.0f}s after its scheduled time")
+                if event.code == EVENT_JOB_ERROR:
+                    outcome = "error"
+                else:
+                    # Daily summaries return their outcome ("sent", "skipped", ...)
+                    outcome = event.retval if isinstance(event.retval, str) else "ok"
+                stats.record_run(lag, now - started_at, outcome)
+        except Exception as e:
+            logger.error(f"Could not record scheduler event: {e}", exc_info=True)
+
+    async def get_runs(self) -> List[Dict]:
+        """Scheduled runs ({id, name, next_run}), soonest first.
+
+        Runs of this process's scheduler, plus the daily summaries stored
+        in the database when another process (the leader worker) schedules them.
+        """
+        runs = [
+            {"id": job.id, "name": job.name, "next_run": job.next_run_time}
+            for job in self.scheduler.get_jobs()
+            if job.next_run_time is not None
+        ]
+        if not self.runs_daily_summaries:
+            # Import here to avoid circular imports
+            from bot.services.database_service import db_service
+
+            for row in await db_service.get_scheduled_job_runs():
+                try:
+                    name = pickle.loads(row["job_state"])["name"]
+                except Exception:
+                    name = row["id"]
+                runs.append({
+                    "id": row["id"],
+                    "name": name,
+                    "next_run": datetime.fromtimestamp(row["next_run_time"], pytz.UTC),
+                })
+        runs.sort(key=lambda run: run["next_run"])
+        return runs
+
+    @staticmethod
+    def get_hourly_load(runs: List[Dict], hours: int) -> List[Dict]:
+        """Daily summaries due in each of the next hours (Madrid time).
+
+        Each entry has the hour, the number of summaries and, once some
+        summaries have run in this process, the minutes they are expected
+        to keep the executor busy given DAILY_SUMMARY_CONCURRENCY.
+        """
+        # Import here to avoid circular imports
+        from bot.config import config
+        from bot.services.daily_summary_service import daily_summary_executor
+
+        madrid_tz = pytz.timezone("Europe/Madrid")
+        until = datetime.now(pytz.UTC) + timedelta(hours=hours)
+        counts: Dict[datetime, int] = defaultdict(int)
+        for run in runs:
+            if not run["id"].startswith(DAILY_SUMMARY_JOB_PREFIX) or run["next_run"] > until:
+                continue
+            hour = run["next_run"].astimezone(madrid_tz).replace(minute=0, second=0, microsecond=0)
+            counts[hour] += 1
+
+        average = daily_summary_executor.average_seconds()
+        concurrency = max(1, config.DAILY_SUMMARY_CONCURRENCY)
+        return [
+            {
+                "hour": hour,
+                "jobs": count,
+                "busy_minutes": count * average / concurrency / 60 if average is not None else None,
+            }
+            for hour, count in sorted(counts.items())
+        ]
+
+    def get_metrics(self) -> Dict:
+        metrics = {"jobs": len(self.scheduler.get_jobs()) if self.scheduler.running else 0}
+        for kind, stats in sorted(self.job_stats.items()):
+            metrics[kind] = stats.describe()
+        return metrics
+
 
 scheduler_service = SchedulerService()  # Single instance
+
+
+async def run_daily_summary_schedule_job(application, job):
+    """Background job: apply a chat's saved daily summary hour to this scheduler."""
+    if not scheduler_service.runs_daily_summaries:
+        raise RuntimeError("Daily summaries are not scheduled in this process")
+
+    # Import here to avoid circular imports
+    from bot.services.database_service import db_service
+
+    chat_id = job["payload"]["chat_id"]
+    chat_config = await db_service.get_chat_summary_config(chat_id)
+    scheduler_service.update_daily_summary_job(chat_id, chat_config.get("daily_summary_hour", "off"))
+
+
+job_service.register_handler(DAILY_SUMMARY_SCHEDULE_JOB, run_daily_summary_schedule_job)
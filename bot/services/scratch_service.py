@@ -0,0 +1,286 @@
+import asyncio
+import fcntl
+import os
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+from bot.utils.constants import (
+    SCRATCH_ADMISSION_TIMEOUT_SECONDS,
+    SCRATCH_ORPHAN_MAX_AGE_SECONDS,
+    SCRATCH_DECODED_AUDIO_BYTES_PER_SECOND,
+    SCRATCH_SHARED_POLL_SECONDS,
+)
+from bot.services.metrics_service import metrics_service
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+_JOB_DIR_PREFIX = "job-"
+# Directories being set up, renamed to job-* once their lock is held
+_PENDING_DIR_PREFIX = "pending-"
+# Held (flock) by the owning process for the whole job; holds the reserved bytes
+_LOCK_FILE = ".lock"
+
+
+class ScratchQuotaExceeded(Exception):
+    """Raised when a job cannot get scratch space within the admission timeout."""
+
+
+def _lock_file(path: str, mode: int) -> Optional[int]:
+    """Open path and flock it without blocking; returns the fd, or None if held elsewhere."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def estimate_media_bytes(
+    file_size: int, duration: Optional[int] = None, decoded_copies: int = 1
+) -> int:
+    """Scratch space a media job needs: the download, the compressed Opus
+    output (never larger than the download) and the decoded WAV copies.
+
+    Decoded audio is 16 kHz mono PCM, so its size depends on the duration,
+    not on the (compressed) download size.
+    """
+    if duration:
+        decoded = duration * SCRATCH_DECODED_AUDIO_BYTES_PER_SECOND
+    else:
+        decoded = file_size * 4  # Sin duración conocida: estimación conservadora
+    return 2 * file_size + decoded * decoded_copies
+
+
+class ScratchJob:
+    """Per-job directory inside the scratch root."""
+
+    def __init__(self, path: str, reserved_bytes: int, lock_fd: int):
+        self.path = path
+        self.reserved_bytes = reserved_bytes
+        self.lock_fd = lock_fd
+
+    def file(self, name: str) -> str:
+        """Path for a file inside the job directory."""
+        return os.path.join(self.path, name)
+
+    def bytes_used(self) -> int:
+        return _dir_size(self.path)
+
+
+class ScratchService:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self.root: Optional[str] = None
+            self.quota_bytes = 0
+            self.reserved_bytes = 0
+            self.peak_reserved_bytes = 0
+            self.rejected_jobs = 0
+            self.orphans_removed = 0
+            self._active: Dict[str, ScratchJob] = {}
+            # Names this process's job directories; PIDs repeat across containers
+            self.instance_id = uuid.uuid4().hex[:8]
+            self._condition: Optional[asyncio.Condition] = None
+            self.initialized = True
+
+    def initialize(self, root: str, quota_bytes: int):
+        """Create the scratch root and clear what previous runs left behind."""
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        os.makedirs(self.root, exist_ok=True)
+        metrics_service.register_source("scratch", self.get_metrics)
+        logger.info(
+            f"Scratch space at {self.root} with quota {quota_bytes / 1024 / 1024:.0f} MB"
+        )
+        self.cleanup_orphans()
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the loop that actually runs the handlers
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    @asynccontextmanager
+    async def job(self, reserve_bytes: int, label: str = "media") -> AsyncIterator[ScratchJob]:
+        """Reserve quota and provide a job directory that is always removed.
+
+        The quota is shared by every process using the same scratch root:
+        each job records its reservation in its lock file. Waits up to
+        SCRATCH_ADMISSION_TIMEOUT_SECONDS for jobs to free space. A single
+        job larger than the whole quota is capped to it so it can still run
+        alone.
+
+        Raises:
+            ScratchQuotaExceeded: if the space does not become available in time
+        """
+        if self.root is None:
+            raise RuntimeError("Scratch service not initialized")
+
+        reserve_bytes = min(max(reserve_bytes, 0), self.quota_bytes)
+        condition = self._get_condition()
+        deadline = time.monotonic() + SCRATCH_ADMISSION_TIMEOUT_SECONDS
+        async with condition:
+            while True:
+                others = self._reserved_by_other_processes()
+                if self.reserved_bytes + others + reserve_bytes <= self.quota_bytes:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected_jobs += 1
+                    logger.warning(
+                        f"Scratch admission rejected for {label}: needs {reserve_bytes} bytes, "
+                        f"{self.reserved_bytes} reserved here and {others} by other processes "
+                        f"of {self.quota_bytes}"
+                    )
+                    raise ScratchQuotaExceeded(
+                        f"No scratch space for {label} ({reserve_bytes} bytes)"
+                    )
+                # Other processes do not notify us, so check again every few seconds
+                try:
+                    await asyncio.wait_for(
+                        condition.wait(), timeout=min(remaining, SCRATCH_SHARED_POLL_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            self.reserved_bytes += reserve_bytes
+            self.peak_reserved_bytes = max(self.peak_reserved_bytes, self.reserved_bytes)
+
+        name = f"{self.instance_id}-{label}-{uuid.uuid4().hex[:12]}"
+        path = os.path.join(self.root, f"{_JOB_DIR_PREFIX}{name}")
+        scratch_job = None
+        try:
+            scratch_job = self._create_job_dir(name, path, reserve_bytes)
+            self._active[path] = scratch_job
+            logger.debug(f"Scratch job {path} started ({reserve_bytes} bytes reserved)")
+            yield scratch_job
+        finally:
+            self._active.pop(path, None)
+            shutil.rmtree(path, ignore_errors=True)
+            if scratch_job is not None:
+                os.close(scratch_job.lock_fd)
+            async with condition:
+                self.reserved_bytes -= reserve_bytes
+                condition.notify_all()
+            logger.debug(f"Scratch job {path} cleaned up")
+
+    def _create_job_dir(self, name: str, path: str, reserve_bytes: int) -> ScratchJob:
+        # Locked under a name the janitor leaves alone, then renamed: a job-*
+        # directory whose lock is free always belongs to a process that is gone
+        pending_path = os.path.join(self.root, f"{_PENDING_DIR_PREFIX}{name}")
+        os.makedirs(pending_path)
+        lock_fd = _lock_file(os.path.join(pending_path, _LOCK_FILE), fcntl.LOCK_EX)
+        try:
+            os.write(lock_fd, str(reserve_bytes).encode())
+            os.rename(pending_path, path)
+        except BaseException:
+            os.close(lock_fd)
+            shutil.rmtree(pending_path, ignore_errors=True)
+            raise
+        return ScratchJob(path, reserve_bytes, lock_fd)
+
+    def _foreign_job_dirs(self) -> Iterator[os.DirEntry]:
+        """Job directories of the scratch root that are not active jobs of this process."""
+        for entry in os.scandir(self.root):
+            if (
+                entry.is_dir()
+                and entry.name.startswith(_JOB_DIR_PREFIX)
+                and entry.path not in self._active
+            ):
+                yield entry
+
+    def _reserved_by_other_processes(self) -> int:
+        total = 0
+        for entry in self._foreign_job_dirs():
+            lock_path = os.path.join(entry.path, _LOCK_FILE)
+            try:
+                fd = _lock_file(lock_path, fcntl.LOCK_SH)
+                if fd is not None:
+                    os.close(fd)  # Nobody holds it: an orphan, it reserves nothing
+                    continue
+                with open(lock_path) as lock:
+                    total += int(lock.read() or 0)
+            except (OSError, ValueError):
+                continue
+        return total
+
+    def cleanup_orphans(self) -> int:
+        """Remove job directories whose owner is gone (crash, kill -9...).
+
+        Every live job holds an flock on the lock file inside its directory,
+        so a directory whose lock can be taken has no owner, whichever process
+        or container created it. Directories left half-created are removed
+        once older than SCRATCH_ORPHAN_MAX_AGE_SECONDS.
+        """
+        if self.root is None or not os.path.isdir(self.root):
+            return 0
+
+        removed = 0
+        for entry in self._foreign_job_dirs():
+            try:
+                fd = _lock_file(os.path.join(entry.path, _LOCK_FILE), fcntl.LOCK_EX)
+            except OSError:
+                continue
+            if fd is None:
+                continue  # A live job of another process
+            try:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            finally:
+                os.close(fd)
+            removed += 1
+            logger.info(f"Removed orphan scratch directory {entry.path}")
+
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or not entry.name.startswith(_PENDING_DIR_PREFIX):
+                continue
+            try:
+                if now - entry.stat().st_mtime < SCRATCH_ORPHAN_MAX_AGE_SECONDS:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+            logger.info(f"Removed orphan scratch directory {entry.path}")
+
+        self.orphans_removed += removed
+        return removed
+
+    def get_metrics(self) -> Dict[str, int]:
+        bytes_in_use = sum(job.bytes_used() for job in list(self._active.values()))
+        return {
+            "active_jobs": len(self._active),
+            "bytes_in_use": bytes_in_use,
+            "bytes_reserved": self.reserved_bytes,
+            "peak_bytes_reserved": self.peak_reserved_bytes,
+            "quota_bytes": self.quota_bytes,
+            "rejected_jobs": self.rejected_jobs,
+            "orphans_removed": self.orphans_removed,
+        }
+
+
+scratch_service = ScratchService()
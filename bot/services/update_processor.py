@@ -0,0 +1,127 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from bot.services.metrics_service import metrics_service
+from bot.utils.constants import UPDATE_MAX_IN_FLIGHT
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+def command_name(update: object) -> Optional[str]:
+    """Name of the bot command in an update ('/summarize@bot args' -> 'summarize')."""
+    if not isinstance(update, Update) or not update.message or not update.message.text:
+        return None
+    text = update.message.text
+    if not text.startswith("/"):
+        return None
+    parts = text[1:].split(maxsplit=1)
+    return parts[0].split("@", 1)[0].lower() if parts else None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates concurrently while keeping each chat's messages in order.
+
+    - At most `max_concurrent` updates run at once (global cap).
+    - Commands listed in `handler_limits` (e.g. summarize) have their own
+      cap and wait for it without taking a global slot, so heavy work can
+      never use up the slots that message ingestion needs.
+    - Any other update with a chat waits for the previous one of the same
+      chat to finish, so message_handler stores messages in arrival order.
+      Limited commands wait for the updates that arrived before them in
+      their chat (so /summarize sees the messages sent just before it) but
+      do not hold back the ones that come after.
+
+    The chat order is taken at the start of do_process_update. PTB starts
+    one task per update in arrival order and only suspends before this
+    point when UPDATE_MAX_IN_FLIGHT updates are pending.
+    """
+
+    def __init__(self, max_concurrent: int, handler_limits: Dict[str, int]):
+        super().__init__(UPDATE_MAX_IN_FLIGHT)
+        self.max_concurrent = max(1, max_concurrent)
+        self.handler_limits = {name: max(1, limit) for name, limit in handler_limits.items()}
+        self._global: Optional[asyncio.Semaphore] = None
+        self._handler_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._chat_tails: Dict[int, asyncio.Future] = {}
+        self._running = 0
+        self._running_by_handler: Dict[str, int] = defaultdict(int)
+        self.processed = 0
+
+    async def initialize(self) -> None:
+        self._global = asyncio.Semaphore(self.max_concurrent)
+        self._handler_semaphores = {
+            name: asyncio.Semaphore(limit) for name, limit in self.handler_limits.items()
+        }
+        metrics_service.register_source("updates", self.get_metrics)
+        logger.info(
+            f"Concurrent update processing: {self.max_concurrent} at once, "
+            f"handler caps {self.handler_limits}"
+        )
+
+    async def shutdown(self) -> None:
+        self._chat_tails.clear()
+
+    def _take_turn(self, chat_id: int, ordered: bool):
+        """Return (future to wait for, own future or None). Must not await."""
+        previous = self._chat_tails.get(chat_id)
+        if not ordered:
+            return previous, None
+        own = asyncio.get_running_loop().create_future()
+        self._chat_tails[chat_id] = own
+        return previous, own
+
+    def _end_turn(self, chat_id: int, own: Optional[asyncio.Future]) -> None:
+        if own is None:
+            return
+        own.set_result(None)
+        if self._chat_tails.get(chat_id) is own:
+            del self._chat_tails[chat_id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        command = command_name(update)
+        limited = command in self._handler_semaphores
+        chat = update.effective_chat if isinstance(update, Update) else None
+
+        previous, own = (None, None)
+        if chat is not None:
+            previous, own = self._take_turn(chat.id, ordered=not limited)
+
+        try:
+            if previous is not None:
+                # asyncio.wait never cancels (or raises from) the awaited future
+                await asyncio.wait({previous})
+            if limited:
+                async with self._handler_semaphores[command]:
+                    await self._run(coroutine, command)
+            else:
+                await self._run(coroutine, None)
+        finally:
+            if chat is not None:
+                self._end_turn(chat.id, own)
+
+    async def _run(self, coroutine: Awaitable[Any], command: Optional[str]) -> None:
+        async with self._global:
+            self._running += 1
+            if command:
+                self._running_by_handler[command] += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+                if command:
+                    self._running_by_handler[command] -= 1
+                self.processed += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {
+            "in_flight": self.current_concurrent_updates,
+            "running": self._running,
+            "chats_with_queue": len(self._chat_tails),
+            "processed": self.processed,
+        }
+        for name in self.handler_limits:
+            metrics[f"running_{name}"] = self._running_by_handler[name]
+        return metrics
@@ -0,0 +1,221 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from bot.services.database_service import db_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.constants import USAGE_WRITE_DELAY_SECONDS
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+# Counters stored per usage row, in llm_usage column order
+USAGE_COUNTERS = (
+    "calls", "prompt_tokens", "completion_tokens", "total_tokens",
+    "cost", "latency_seconds", "audio_seconds",
+)
+
+UsageKey = Tuple[str, int, int, str, str]  # (usage_date, chat_id, user_id, summary_type, model)
+
+
+@dataclass
+class UsageScope:
+    """Who an LLM call is made for. chat_id/user_id 0 means unknown."""
+
+    chat_id: int = 0
+    user_id: int = 0
+    summary_type: Optional[str] = None
+    # Models that answered within the scope; shared with nested scopes
+    models: List[str] = field(default_factory=list)
+
+
+# Set per command, job or daily summary; asyncio tasks inherit it from their creator
+_usage_scope: ContextVar[Optional[UsageScope]] = ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(**fields: Any) -> Iterator[UsageScope]:
+    """Attribute the LLM calls made inside the block (in this task) to a chat/user/type.
+
+    Fields that are not given are taken from the enclosing scope.
+    """
+    parent = _usage_scope.get()
+    scope = replace(parent, **fields) if parent is not None else UsageScope(**fields)
+    token = _usage_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _usage_scope.reset(token)
+
+
+def current_model() -> Optional[str]:
+    """Last model that answered in the current scope."""
+    scope = _usage_scope.get()
+    return scope.models[-1] if scope is not None and scope.models else None
+
+
+class UsageService:
+    """Token, cost, latency and audio metering of every LLM and Whisper call.
+
+    Calls are added up in memory per (day, chat, user, summary type, model)
+    and written in batches with additive upserts into llm_usage, so several
+    processes can share the table. Today's tokens per chat, checked against
+    the chat budget, are also kept in memory and re-read periodically by
+    refresh_chat_tokens() to pick up the other processes' usage.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self._pending: Dict[UsageKey, Dict[str, float]] = {}
+            self._writer: Optional[asyncio.Task] = None
+            self._writing = False
+            self._writing_batch: Dict[UsageKey, Dict[str, float]] = {}
+            # Tokens per chat on _chat_tokens_day: last read from llm_usage plus
+            # the batches this process has written since
+            self._chat_tokens: Dict[int, int] = {}
+            self._chat_tokens_day: Optional[str] = None
+            self.calls = 0
+            self.total_tokens = 0
+            self.audio_seconds = 0.0
+            self.calls_without_usage = 0
+            self.write_errors = 0
+            metrics_service.register_source("llm_usage", self.get_metrics)
+            self.initialized = True
+
+    def record_completion(self, model: str, usage: Optional[Dict], latency: float) -> None:
+        """Record a chat completion; usage is the `usage` block of the response."""
+        scope = _usage_scope.get()
+        if scope is not None:
+            scope.models.append(model)
+        if not usage:
+            self.calls_without_usage += 1
+            usage = {}
+        self._add(scope, model, {
+            "calls": 1,
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+            "total_tokens": usage.get("total_tokens") or 0,
+            "cost": usage.get("cost") or 0.0,
+            "latency_seconds": latency,
+        })
+
+    def record_transcription(self, model: str, audio_seconds: Optional[float], latency: float) -> None:
+        """Record a Whisper transcription of audio_seconds of audio."""
+        self._add(_usage_scope.get(), model, {
+            "calls": 1,
+            "latency_seconds": latency,
+            "audio_seconds": audio_seconds or 0.0,
+        })
+
+    def chat_tokens_today(self, chat_id: int) -> int:
+        """Tokens a chat used today, including those not written yet.
+
+        Other processes' usage is counted from the next refresh_chat_tokens().
+        """
+        today = date.today().isoformat()
+        stored = self._chat_tokens.get(chat_id, 0) if self._chat_tokens_day == today else 0
+        unwritten = sum(
+            counters.get("total_tokens", 0)
+            for batch in (self._pending, self._writing_batch)
+            for key, counters in batch.items()
+            if key[0] == today and key[1] == chat_id
+        )
+        return stored + int(unwritten)
+
+    async def refresh_chat_tokens(self) -> None:
+        """Read today's tokens per chat from llm_usage."""
+        today = date.today().isoformat()
+        try:
+            totals = await db_service.get_chat_usage_totals(today)
+        except Exception as e:
+            logger.error(f"Could not read today's usage per chat: {e}", exc_info=True)
+            return
+        self._chat_tokens, self._chat_tokens_day = totals, today
+
+    async def flush(self) -> None:
+        """Write everything recorded so far."""
+        if self._writer is not None and not self._writer.done():
+            if self._writing:
+                await asyncio.shield(self._writer)
+            else:
+                self._writer.cancel()
+                try:
+                    await self._writer
+                except asyncio.CancelledError:
+                    pass
+        await self._write_pending()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "total_tokens": self.total_tokens,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "calls_without_usage": self.calls_without_usage,
+            "pending_rows": len(self._pending),
+            "write_errors": self.write_errors,
+        }
+
+    def _add(self, scope: Optional[UsageScope], model: str, values: Dict[str, float]) -> None:
+        scope = scope or UsageScope()
+        key = (
+            date.today().isoformat(),
+            scope.chat_id,
+            scope.user_id,
+            scope.summary_type or "other",
+            model,
+        )
+        counters = self._pending.setdefault(key, {})
+        for name, value in values.items():
+            counters[name] = counters.get(name, 0) + value
+        self.calls += 1
+        self.total_tokens += int(values.get("total_tokens", 0))
+        self.audio_seconds += values.get("audio_seconds", 0.0)
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_later())
+
+    async def _write_later(self) -> None:
+        # Calls recorded meanwhile go in the same batch
+        await asyncio.sleep(USAGE_WRITE_DELAY_SECONDS)
+        await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        rows = [
+            (*key, *(counters.get(name, 0) for name in USAGE_COUNTERS))
+            for key, counters in batch.items()
+        ]
+        self._writing = True
+        self._writing_batch = batch
+        try:
+            await db_service.add_llm_usage(rows)
+            for key, counters in batch.items():
+                if key[0] == self._chat_tokens_day:
+                    self._chat_tokens[key[1]] = (
+                        self._chat_tokens.get(key[1], 0) + int(counters.get("total_tokens", 0))
+                    )
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Could not save {len(rows)} usage rows: {e}", exc_info=True)
+            # Keep them for the next write, merged with what was recorded meanwhile
+            for key, counters in batch.items():
+                merged = self._pending.setdefault(key, {})
+                for name, value in counters.items():
+                    merged[name] = merged.get(name, 0) + value
+        finally:
+            self._writing = False
+            self._writing_batch = {}
+
+
+usage_service = UsageService()
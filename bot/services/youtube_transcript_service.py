@@ -0,0 +1,106 @@
+import threading
+from typing import Tuple
+from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
+from bot.utils.cache_utils import TTLCache, SingleFlight
+from bot.utils.executors import run_in_thread_pool
+from bot.utils.constants import (
+    YOUTUBE_TRANSCRIPT_WORKERS,
+    YOUTUBE_TRANSCRIPT_TIMEOUT_SECONDS,
+    YOUTUBE_TRANSCRIPT_CACHE_TTL_SECONDS,
+    YOUTUBE_TRANSCRIPT_CACHE_MAX_ENTRIES,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+# youtube-transcript-api keeps a requests.Session per instance, so each worker
+# thread gets its own client instead of sharing one across threads.
+_thread_local = threading.local()
+
+
+def _get_api() -> YouTubeTranscriptApi:
+    api = getattr(_thread_local, "api", None)
+    if api is None:
+        api = YouTubeTranscriptApi()
+        _thread_local.api = api
+    return api
+
+
+def _fetch_transcript_sync(video_id: str, language: str) -> Tuple[str, str]:
+    """Blocking transcript download, executed in the transcript thread pool."""
+    transcript_list = _get_api().list(video_id)
+    transcripts = list(transcript_list)
+    if not transcripts:
+        raise NoTranscriptFound(video_id, [language], transcript_list)
+
+    available_languages = [t.language_code for t in transcripts]
+    logger.info(f"Available transcripts for video {video_id}: {available_languages}")
+
+    # Try to get the requested language first, fall back to first available
+    transcript = next(
+        (t for t in transcripts if t.language_code == language), transcripts[0]
+    )
+    transcript_data = transcript.fetch()
+    logger.debug(
+        f"Retrieved {len(transcript_data)} transcript entries ({transcript.language_code})"
+    )
+    return transcript.language_code, " ".join(entry.text for entry in transcript_data)
+
+
+class YouTubeTranscriptService:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self.initialized:
+            self.cache = TTLCache(
+                max_entries=YOUTUBE_TRANSCRIPT_CACHE_MAX_ENTRIES,
+                ttl_seconds=YOUTUBE_TRANSCRIPT_CACHE_TTL_SECONDS,
+            )
+            self.single_flight = SingleFlight()
+            self.initialized = True
+
+    async def get_transcript(self, video_id: str, language: str = "en") -> Tuple[str, str]:
+        """Get a video transcript without blocking the event loop.
+
+        Args:
+            video_id: YouTube video ID
+            language: Preferred transcript language
+
+        Returns:
+            Tuple of (language actually used, transcript text)
+
+        Raises:
+            asyncio.TimeoutError if YouTube does not answer in time, and the
+            youtube-transcript-api errors (NoTranscriptFound, VideoUnavailable...).
+        """
+        key = (video_id, language)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"Transcript cache hit for video {video_id} ({language})")
+            return cached
+
+        if self.single_flight.is_running(key):
+            logger.info(f"Joining in-flight transcript fetch for video {video_id}")
+        return await self.single_flight.run(key, lambda: self._fetch_and_cache(key))
+
+    async def _fetch_and_cache(self, key: Tuple[str, str]) -> Tuple[str, str]:
+        video_id, language = key
+        result = await run_in_thread_pool(
+            "youtube-transcripts",
+            YOUTUBE_TRANSCRIPT_WORKERS,
+            _fetch_transcript_sync,
+            video_id,
+            language,
+            timeout=YOUTUBE_TRANSCRIPT_TIMEOUT_SECONDS,
+        )
+        self.cache.set(key, result)
+        return result
+
+
+youtube_transcript_service = YouTubeTranscriptService()
@@ -1,3 +1,4 @@
+import os
 import re
 from typing import List
 
@@ -5,19 +6,124 @@ from typing import List
 YOUTUBE_REGEX = re.compile(
     r"(?:https?:\/\/)?(?:www\.)?(?:youtube\.com|youtu\.be)\/(?:watch\?v=)?(?:embed\/)?(?:v\/)?(?:shorts\/)?(?:live\/)?(?:[\w\-]{11})"
 )
+# Captures the 11-char video ID from watch, embed, v, shorts, live and youtu.be URLs
+YOUTUBE_VIDEO_ID_REGEX = re.compile(
+    r"(?:youtube(?:-nocookie)?\.com\/(?:watch\?(?:[^#\s]*&)?v=|embed\/|v\/|shorts\/|live\/)"
+    r"|youtu\.be\/)([\w\-]{11})(?![\w\-])"
+)
 ARTICLE_URL_REGEX = re.compile(r"https?:\/\/\S+")
 
 # Message handling
 CHUNK_SIZE = 4096  # Maximum characters per message
-PAUSE_BETWEEN_CHUNKS = 0.5  # Seconds between message chunks
+MESSAGE_CHUNK_SIZE = 4000  # Split size for long messages (room for the part indicator)
 MAX_RECENT_MESSAGES = 300  # Maximum messages to fetch for summarization
+MIN_THREAD_MESSAGES = 2  # A thread summary needs at least one reply
 
 # Export handling
-EXPORT_PROGRESS_BATCH_SIZE = 100  # Messages per progress log in export_chat
+EXPORT_PAGE_SIZE = 500  # Messages read and written per page in export_chat
+EXPORT_SCRATCH_RESERVE_BYTES = 50 * 1024 * 1024  # Scratch quota reserved per export (compressed)
+EXPORT_WRITE_WORKERS = 2  # Threads compressing and writing export pages
 
 # File handling
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB in bytes
 
+# Outbound messages (Telegram flood limits)
+PRIORITY_INTERACTIVE = 0  # Replies to a user action
+PRIORITY_BROADCAST = 1  # Scheduled summaries, admin notifications
+OUTBOUND_GLOBAL_RATE_PER_SECOND = 30
+OUTBOUND_GLOBAL_BURST = 30
+OUTBOUND_GROUP_RATE_PER_MINUTE = 20
+OUTBOUND_GROUP_BURST = 5  # Lets a split summary go out in one go
+OUTBOUND_PRIVATE_RATE_PER_SECOND = 1
+OUTBOUND_PRIVATE_BURST = 5
+OUTBOUND_MAX_RETRIES = 3  # Retries after RetryAfter before giving up
+
+# Update processing (concurrency caps live in Config)
+UPDATE_MAX_IN_FLIGHT = 1024  # Updates accepted from Telegram but not finished yet
+
+# Admin notifications
+NOTIFICATION_DIGEST_INTERVAL_SECONDS = 15 * 60  # Repeated alerts are grouped into one digest
+NOTIFICATION_DEDUP_WINDOW_SECONDS = 60 * 60  # An error is alerted individually once per window
+NOTIFICATION_RATE_PER_HOUR = 20  # Individual alerts (each goes to every admin)
+NOTIFICATION_BURST = 5
+NOTIFICATION_ADMIN_CACHE_SECONDS = 5 * 60
+NOTIFICATION_DETAILS_MAX_CHARS = 500
+NOTIFICATION_DIGEST_MAX_ITEMS = 20
+
+# Error capture
+ERROR_RING_BUFFER_SIZE = 200  # Recent error events kept in memory for /errors
+ERROR_PAYLOAD_MAX_CHARS = 300  # Message text / callback data stored per event
+ERROR_TRACEBACK_MAX_FRAMES = 8  # Innermost frames kept per event
+ERROR_LOG_SAMPLE_EVERY = 100  # A repeated error is logged in full once every N occurrences...
+ERROR_LOG_SAMPLE_SECONDS = 300  # ...or once per this many seconds, whichever comes first
+
+# Daily summaries (concurrency cap lives in Config)
+DAILY_SUMMARY_JITTER_WINDOW_SECONDS = 45 * 60  # Chats start spread over this part of their hour
+DAILY_SUMMARY_MAX_ATTEMPTS = 3
+DAILY_SUMMARY_RETRY_BASE_SECONDS = 300  # First retry 5 min later, then 10 min
+DAILY_SUMMARY_STALE_RUN_SECONDS = 3 * 3600  # A run not finished by then is reported as is
+SCHEDULER_LAG_WARNING_SECONDS = 60  # A job starting later than this after its scheduled time is logged
+SCHEDULER_UPCOMING_RUNS_SHOWN = 10  # Runs listed by /scheduler
+SCHEDULER_LOAD_FORECAST_HOURS = 24  # Hours ahead in the /scheduler load forecast
+SCHEDULER_STORE_RETRY_BASE_SECONDS = 1  # First retry of a failed job store write, then doubling
+SCHEDULER_STORE_RETRY_MAX_SECONDS = 60  # Cap on the wait between job store write retries
+SCHEDULER_STORE_FLUSH_ATTEMPTS = 3  # Failed writes flush() waits through before giving up
+SCHEDULER_LEADER_LEASE_SECONDS = 60  # A leader that stops renewing is replaced by another worker after this
+SCHEDULER_LEADER_RENEW_SECONDS = 20  # Renewal (and takeover attempt) interval of the daily summary lease
+DAILY_PRESUMMARY_INTERVAL_MINUTES = 60  # Pre-summarization pass (when enabled in Config)
+DAILY_PRESUMMARY_MIN_MESSAGES = 30  # Fewer new messages wait for the next pass (or go raw to the digest)
+
+# Durable background jobs (worker pool size lives in Config)
+JOB_MAX_ATTEMPTS = 3
+JOB_LEASE_SECONDS = 300  # Visibility timeout: a job whose worker stops renewing is picked up again
+JOB_RETRY_BASE_SECONDS = 30  # Backoff doubles on every failed attempt
+JOB_RETRY_MAX_SECONDS = 600
+JOB_POLL_INTERVAL_SECONDS = 2  # Also woken up right away by jobs enqueued in this process
+JOB_SHUTDOWN_GRACE_SECONDS = 10  # Running jobs not done by then are released back to the queue
+JOB_RETENTION_SECONDS = 7 * 24 * 3600  # Finished jobs are kept this long
+JOB_PURGE_INTERVAL_SECONDS = 3600
+
+# Scratch space for media jobs (root and quota live in Config)
+SCRATCH_ADMISSION_TIMEOUT_SECONDS = 120  # Max wait for quota before rejecting a job
+SCRATCH_ORPHAN_MAX_AGE_SECONDS = 6 * 3600  # Half-created job dirs older than this are orphans
+SCRATCH_SHARED_POLL_SECONDS = 2  # Re-check of the quota shared with other processes while waiting
+SCRATCH_JANITOR_INTERVAL_MINUTES = 15
+SCRATCH_DECODED_AUDIO_BYTES_PER_SECOND = 32000  # 16 kHz mono PCM s16le
+
+# YouTube transcripts
+YOUTUBE_TRANSCRIPT_WORKERS = 4  # Threads dedicated to youtube-transcript-api calls
+YOUTUBE_TRANSCRIPT_TIMEOUT_SECONDS = 30
+YOUTUBE_TRANSCRIPT_CACHE_TTL_SECONDS = 6 * 3600
+YOUTUBE_TRANSCRIPT_CACHE_MAX_ENTRIES = 256
+
+# Web articles
+ARTICLE_MAX_BYTES = 3 * 1024 * 1024  # Hard cap on downloaded HTML
+ARTICLE_FETCH_TIMEOUT_SECONDS = 30
+ARTICLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+ARTICLE_CACHE_MAX_ENTRIES = 128
+ARTICLE_CACHE_TTL_SECONDS = 24 * 3600  # How long validators are kept for revalidation
+ARTICLE_CACHE_FRESH_SECONDS = 600  # Served without revalidating during this window
+
+# Formatted lines of stored messages, reused by every summary of the chat
+FORMATTED_MESSAGE_CACHE_MAX_ENTRIES = 20000
+FORMATTED_MESSAGE_CACHE_TTL_SECONDS = 24 * 3600  # Stored messages are cleaned up after the daily summary
+ARTICLE_PARSE_WORKERS = 2  # Processes running readability
+ARTICLE_PARSE_TIMEOUT_SECONDS = 20
+
+# Documents (PDF/DOCX/TXT) text extraction
+DOCUMENT_PROCESS_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+DOCUMENT_PDF_PAGES_PER_TASK = 16  # Pages per parallel PDF extraction task
+DOCUMENT_PDF_TASKS_IN_FLIGHT = DOCUMENT_PROCESS_WORKERS * 2  # PDF page ranges submitted at a time
+DOCUMENT_EXTRACTION_TIMEOUT_SECONDS = 120  # Per task
+DOCUMENT_TEXT_BUDGET_CHUNKS = 8  # Stop extracting after this many model-sized chunks
+
+# Voice activity detection (ffmpeg silencedetect) before transcription
+VAD_NOISE_THRESHOLD_DB = -35  # Below this level audio is considered silence
+VAD_MIN_SILENCE_SECONDS = 0.6  # Shorter pauses are kept as part of speech
+VAD_PADDING_SECONDS = 0.2  # Margin kept around each speech region
+VAD_MIN_SAVED_RATIO = 0.05  # Skip re-encoding if less than 5% would be removed
+VAD_MAX_SEGMENTS = 500  # Above this the aselect expression gets too long
+
 # Supported MIME types
 SUPPORTED_AUDIO_TYPES: List[str] = [
     "audio/mpeg",
@@ -47,6 +153,14 @@ SUPPORTED_DOCUMENT_TYPES: List[str] = [
 COOLDOWN_TEXT_SIMPLE_SECONDS = 120  # 2 minutes
 COOLDOWN_ADVANCED_SECONDS = 600  # 10 minutes
 DAILY_LIMIT_ADVANCED_OPS = 5
+RATE_LIMIT_RESTORE_WINDOW_SECONDS = 24 * 3600  # Cooldowns older than this are not reloaded on start
+RATE_LIMIT_REFUND_POLL_SECONDS = 15  # How often refunds recorded by job workers are applied
+
+# LLM usage metering
+USAGE_WRITE_DELAY_SECONDS = 10  # Usage recorded within this delay is written in one batch
+USAGE_BUDGET_REFRESH_SECONDS = 60  # Re-read of today's per-chat tokens (other processes' usage)
+USAGE_REPORT_DEFAULT_DAYS = 7  # Period of /usage when no number of days is given
+USAGE_REPORT_TOP = 10  # Rows shown per grouping in /usage
 
 # Operation Types
 OPERATION_TYPE_TEXT_SIMPLE = "text_simple"
@@ -57,6 +171,7 @@ MSG_DAILY_LIMIT_REACHED = "Has alcanzado el límite diario de {limit} operacione
 MSG_COOLDOWN_ACTIVE = (
     "Machooo, espérate un poco antes de volver a usar el comando ({remaining}s)."
 )
+MSG_CHAT_BUDGET_REACHED = "Este chat ya ha gastado su cupo de resúmenes de hoy. Mañana más, figura."
 
 
 # Localization Labels for Configuration Interface
@@ -3,8 +3,8 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from bot.utils.logger import logger
 from bot.services.database_service import db_service
+from bot.services.rate_limit_service import rate_limit_service
 import random
-from datetime import datetime
 
 logger = logger.get_logger("utils.decorators")
 
@@ -70,39 +70,22 @@ def admin_command(func=None):
 
 
 def cooldown(seconds: int):
-    """Cooldown based on last_command_usage in chat state, skips for admin users"""
+    """Per-chat command cooldown kept by rate_limit_service, skips for admin users"""
 
     def decorator(func):
         @wraps(func)
         async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Check if user is admin first
-            user_id = update.effective_user.id
-            admin_users = await db_service.get_admin_users()
-            if user_id in admin_users:
+            if rate_limit_service.is_admin(update.effective_user.id):
                 return await func(update, context)
 
             # Continue with normal cooldown logic for non-admin users
-            chat_id = update.effective_chat.id
-            chat_state = await db_service.get_chat_state(chat_id)
-
-            current_time = datetime.now()
-            last_usage = (
-                datetime.fromisoformat(chat_state.get("last_command_usage"))
-                if chat_state.get("last_command_usage")
-                else None
-            )
-
-            if last_usage and (current_time - last_usage).total_seconds() < seconds:
-                remaining = int(seconds - (current_time - last_usage).total_seconds())
+            limit = rate_limit_service.check_chat_cooldown(update.effective_chat.id, seconds)
+            if not limit.allowed:
                 cooldown_message = random.choice(COOLDOWN_REPLIES)
-                await update.message.reply_text(f"{cooldown_message} ({remaining}s)")
+                await update.message.reply_text(f"{cooldown_message} ({limit.retry_after}s)")
                 return
 
-            # Update last_command_usage
-            await db_service.update_chat_state(
-                chat_id, {"last_command_usage": current_time.isoformat()}
-            )
-
             return await func(update, context)
 
         return wrapped
@@ -159,8 +142,7 @@ def bot_started():
             if not update.effective_chat:
                 return
             chat_id = update.effective_chat.id
-            chat_state = await db_service.get_chat_state(chat_id)
-            if not chat_state or not chat_state.get("is_bot_started"):
+            if not await rate_limit_service.is_chat_started(chat_id):
                 logger.warning(f"Bot not started for chat_id: {chat_id}")
                 await update.message.reply_text(
                     "Por favor, inicia el bot primero usando el comando /start"
@@ -0,0 +1,117 @@
+# bot/utils/document_utils.py
+"""
+Text extraction for PDF, DOCX and TXT documents.
+
+The parsing itself runs in the "documents" process pool (workers/document_worker.py).
+The helpers below fan the work out a few page ranges at a time and stop as
+soon as the text budget is met.
+"""
+
+import asyncio
+from collections import deque
+from typing import NamedTuple, Optional
+from bot.utils.executors import run_in_process_pool
+from bot.utils.constants import (
+    DOCUMENT_PROCESS_WORKERS,
+    DOCUMENT_PDF_PAGES_PER_TASK,
+    DOCUMENT_PDF_TASKS_IN_FLIGHT,
+    DOCUMENT_EXTRACTION_TIMEOUT_SECONDS,
+)
+from bot.utils.logger import logger
+from workers.document_worker import (
+    count_pdf_pages_sync,
+    extract_pdf_pages_sync,
+    extract_docx_text_sync,
+    read_text_file_sync,
+)
+
+logger = logger.get_logger(__name__)
+
+_POOL_NAME = "documents"
+
+
+class DocumentText(NamedTuple):
+    text: str
+    truncated: bool = False  # The text budget stopped the extraction early
+    pages_read: Optional[int] = None  # PDFs only
+    total_pages: Optional[int] = None  # PDFs only
+
+
+async def _run_in_document_pool(func, *args):
+    return await run_in_process_pool(
+        _POOL_NAME,
+        DOCUMENT_PROCESS_WORKERS,
+        func,
+        *args,
+        timeout=DOCUMENT_EXTRACTION_TIMEOUT_SECONDS,
+    )
+
+
+async def extract_pdf_text(path: str, char_budget: Optional[int] = None) -> DocumentText:
+    """Extract the text of a PDF in page order while ranges are parsed in parallel.
+
+    At most DOCUMENT_PDF_TASKS_IN_FLIGHT page ranges are submitted at a time,
+    so each range's timeout is spent parsing rather than queued behind the
+    rest of the document. Once char_budget characters have been produced the
+    pending ranges are cancelled.
+    """
+    total_pages = await _run_in_document_pool(count_pdf_pages_sync, path)
+    logger.info(f"PDF con {total_pages} páginas, extrayendo en rangos de {DOCUMENT_PDF_PAGES_PER_TASK}")
+
+    starts = iter(range(0, total_pages, DOCUMENT_PDF_PAGES_PER_TASK))
+    tasks = deque()
+
+    def submit_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            tasks.append(asyncio.ensure_future(
+                _run_in_document_pool(
+                    extract_pdf_pages_sync,
+                    path,
+                    start,
+                    start + DOCUMENT_PDF_PAGES_PER_TASK,
+                    char_budget,
+                )
+            ))
+
+    for _ in range(DOCUMENT_PDF_TASKS_IN_FLIGHT):
+        submit_next()
+
+    texts = []
+    extracted_chars = 0
+    pages_read = 0
+    try:
+        while tasks:
+            pages = await tasks.popleft()
+            submit_next()
+            for page_num, page_text in pages:
+                if page_text:
+                    texts.append(page_text)
+                extracted_chars += len(page_text)
+                pages_read = page_num + 1
+                if char_budget is not None and extracted_chars >= char_budget:
+                    logger.info(
+                        f"Presupuesto de texto alcanzado ({extracted_chars}/{char_budget} caracteres) "
+                        f"en la página {pages_read}/{total_pages}"
+                    )
+                    return DocumentText(
+                        "\n\n".join(texts), pages_read < total_pages, pages_read, total_pages
+                    )
+    finally:
+        # Rangos aún en cola no llegan a ejecutarse
+        for task in tasks:
+            task.cancel()
+    return DocumentText("\n\n".join(texts), False, total_pages, total_pages)
+
+
+async def extract_document_text(
+    path: str, kind: str, char_budget: Optional[int] = None
+) -> DocumentText:
+    """Extract up to char_budget characters from a pdf, docx or txt file."""
+    if kind == "pdf":
+        return await extract_pdf_text(path, char_budget)
+    if kind == "docx":
+        text, truncated = await _run_in_document_pool(extract_docx_text_sync, path, char_budget)
+    else:
+        text, truncated = await _run_in_document_pool(read_text_file_sync, path, char_budget)
+    return DocumentText(text, truncated)
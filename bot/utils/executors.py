@@ -0,0 +1,147 @@
+# bot/utils/executors.py
+"""
+Shared worker pools for blocking work that must stay off the event loop.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+_thread_pools: Dict[str, ThreadPoolExecutor] = {}
+_process_pools: Dict[str, ProcessPoolExecutor] = {}
+# Process pool work someone is still waiting for, per pool
+_pool_futures: Dict[ProcessPoolExecutor, Set[Future]] = {}
+# Pools replaced after a timeout, waiting for their work to finish -> name
+_retired_process_pools: Dict[ProcessPoolExecutor, str] = {}
+_reapers: Set[asyncio.Task] = set()
+_QUEUE_POLL_SECONDS = 0.05
+
+
+def get_thread_pool(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """Get (or lazily create) a bounded thread pool identified by name."""
+    pool = _thread_pools.get(name)
+    if pool is None:
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        _thread_pools[name] = pool
+        logger.info(f"Thread pool '{name}' created with {max_workers} workers")
+    return pool
+
+
+async def run_in_thread_pool(
+    name: str,
+    max_workers: int,
+    func: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+) -> Any:
+    """Run a blocking function in a named pool, optionally with a timeout.
+
+    On timeout the worker thread cannot be interrupted, but the caller is
+    released and the pool size bounds how many such threads can pile up.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_thread_pool(name, max_workers), func, *args)
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout=timeout)
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """Get (or lazily create) a bounded process pool identified by name.
+
+    Workers use the "spawn" start method so they never inherit the event loop,
+    sockets or locks of the bot process.
+    """
+    pool = _process_pools.get(name)
+    if pool is None:
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        _process_pools[name] = pool
+        logger.info(f"Process pool '{name}' created with {max_workers} workers")
+    return pool
+
+
+async def run_in_process_pool(
+    name: str,
+    max_workers: int,
+    func: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+) -> Any:
+    """Run a picklable top-level function in a named process pool.
+
+    Workers import the module of func, so it must not import the bot package
+    (see the workers package). The timeout starts when a worker picks the
+    task up (roughly: the executor hands over one task more than it has
+    workers). A worker that exceeds it cannot be interrupted: the pool is
+    retired, new work goes to a fresh pool and the old workers are terminated
+    once the work still waiting on them is done.
+    """
+    pool = get_process_pool(name, max_workers)
+    future = pool.submit(func, *args)
+    pending = _pool_futures.setdefault(pool, set())
+    pending.add(future)
+    wrapped = asyncio.wrap_future(future)
+    try:
+        if timeout is not None:
+            # The timeout covers the work, not the wait for a free worker
+            while not future.running() and not future.done():
+                await asyncio.wait({wrapped}, timeout=_QUEUE_POLL_SECONDS)
+        return await asyncio.wait_for(wrapped, timeout=timeout)
+    except asyncio.TimeoutError:
+        _retire_process_pool(name, pool)
+        raise
+    except asyncio.CancelledError:
+        future.cancel()  # Only possible while it is still queued
+        raise
+    finally:
+        # Nobody waits for the result any more, whatever the worker does with it
+        pending.discard(future)
+
+
+def _retire_process_pool(name: str, pool: ProcessPoolExecutor) -> None:
+    if _process_pools.get(name) is not pool:
+        return  # Already retired by another timeout
+    del _process_pools[name]
+    _retired_process_pools[pool] = name
+    logger.warning(f"Process pool '{name}' retired after a task timed out")
+    task = asyncio.get_running_loop().create_task(_terminate_when_idle(name, pool))
+    _reapers.add(task)
+    task.add_done_callback(_reapers.discard)
+
+
+async def _terminate_when_idle(name: str, pool: ProcessPoolExecutor) -> None:
+    # Work running on the healthy workers finishes (or times out) first
+    while _pool_futures.get(pool):
+        await asyncio.sleep(1)
+    _terminate_process_pool(name, pool)
+
+
+def _terminate_process_pool(name: str, pool: ProcessPoolExecutor) -> None:
+    _pool_futures.pop(pool, None)
+    _retired_process_pools.pop(pool, None)
+    # ProcessPoolExecutor has no public way to stop a busy worker
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    logger.info(f"Process pool '{name}' shut down ({len(processes)} workers terminated)")
+
+
+def shutdown_executors() -> None:
+    """Shut down every pool without waiting for running work."""
+    for name, pool in list(_thread_pools.items()):
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Thread pool '{name}' shut down")
+    _thread_pools.clear()
+    for name, pool in list(_process_pools.items()) + [
+        (name, pool) for pool, name in _retired_process_pools.items()
+    ]:
+        _terminate_process_pool(name, pool)
+    _process_pools.clear()
@@ -1,140 +1,166 @@
-import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional
 from telegram import Update
-from telegram.constants import MessageLimit
-from bot.utils.constants import PAUSE_BETWEEN_CHUNKS
 from bot.services.message_service import message_service
-import asyncio
 from datetime import datetime
 import pytz
+from bot.utils.cache_utils import TTLCache
+from bot.utils.constants import (
+    FORMATTED_MESSAGE_CACHE_MAX_ENTRIES,
+    FORMATTED_MESSAGE_CACHE_TTL_SECONDS,
+)
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+
+# Replied messages are quoted up to this many characters
+REPLY_CONTEXT_MAX_CHARS = 100
+
+MADRID_TZ = pytz.timezone("Europe/Madrid")
+
+
+class FormattedMessage(NamedTuple):
+    """The parts of a message's line in the summary prompt."""
+
+    source: tuple  # (user_name, created_at, message_text) the parts were built from
+    user_name: str
+    prefix: str  # "[HH:MM] Name"
+    text: str
+    reply_context: str  # Text shown when another message replies to this one
+    line: str  # Complete line, when the message is not a reply
+
+
+# (chat_id, telegram_message_id, user_id) -> FormattedMessage; message ids are
+# only unique within a chat. Entries are checked against their source, so a
+# renamed user or edited message is formatted again
+_formatted_messages = TTLCache(
+    max_entries=FORMATTED_MESSAGE_CACHE_MAX_ENTRIES,
+    ttl_seconds=FORMATTED_MESSAGE_CACHE_TTL_SECONDS,
+)
+
+
+def _display_name(message: Dict) -> str:
+    return (
+        message.get("first_name") or
+        message.get("username") or
+        f"User{message.get('user_id', 'Unknown')}"
+    )
+
+
+def format_message(message: Dict) -> FormattedMessage:
+    """Format one stored message, reusing the result of earlier calls."""
+    user_name = _display_name(message)
+    created_at = message.get("created_at")
+    message_text = message.get("message_text", "")
+    source = (user_name, created_at, message_text)
+    key = (message.get("chat_id"), message.get("telegram_message_id"), message.get("user_id"))
+    cached = _formatted_messages.get(key)
+    if cached is not None and cached.source == source:
+        return cached
+
+    # Format timestamp if available
+    timestamp_str = ""
+    if created_at:
+        try:
+            # Parse the timestamp and convert to Madrid timezone
+            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            local = dt.astimezone(MADRID_TZ)
+            timestamp_str = f"[{local.hour:02d}:{local.minute:02d}] "
+        except Exception as e:
+            logger.debug("Error parsing timestamp %s: %s", created_at, e)
+
+    # Truncate long replied messages for context
+    reply_context = message_text
+    if message_text and len(message_text) > REPLY_CONTEXT_MAX_CHARS:
+        reply_context = message_text[:REPLY_CONTEXT_MAX_CHARS] + "..."
+
+    prefix = f"{timestamp_str}{user_name}"
+    formatted = FormattedMessage(
+        source, user_name, prefix, message_text, reply_context, f"{prefix}: {message_text}"
+    )
+    _formatted_messages.set(key, formatted)
+    return formatted
 
 
 def format_recent_messages(recent_messages: List[Dict]) -> str:
-    """Format recent messages for summarization with enhanced context"""
-    logging.info(f"Formatting {len(recent_messages)} recent messages for summarization")
+    """Format recent messages for summarization with enhanced context.
+
+    Each message is formatted once (see format_message); building the
+    prompt only resolves replies and joins the lines.
+    """
+    logger.debug("Formatting %d recent messages for summarization", len(recent_messages))
 
     if not recent_messages:
         return "No messages to format"
 
-    # Create a lookup map for message IDs to resolve replies
-    message_lookup = {}
-    for msg in recent_messages:
-        message_lookup[msg["telegram_message_id"]] = msg
-
-    formatted_messages = []
-
-    # Process messages in chronological order
-    for message in recent_messages:
-        # Extract user info with fallback
-        user_name = (
-            message.get("first_name") or
-            message.get("username") or
-            f"User{message.get('user_id', 'Unknown')}"
-        )
-
-        # Format timestamp if available
-        timestamp_str = ""
-        if message.get("created_at"):
-            try:
-                # Parse the timestamp and convert to Madrid timezone
-                dt = datetime.fromisoformat(message["created_at"].replace('Z', '+00:00'))
-                madrid_tz = pytz.timezone("Europe/Madrid")
-                dt_madrid = dt.astimezone(madrid_tz)
-                timestamp_str = f"[{dt_madrid.strftime('%H:%M')}] "
-            except Exception as e:
-                logging.debug(f"Error parsing timestamp {message.get('created_at')}: {e}")
-
-        message_text = message.get("message_text", "")
-
-        # Handle reply references
-        if message.get("telegram_reply_to_message_id"):
-            reply_id = message["telegram_reply_to_message_id"]
-
-            # Try to resolve the replied message
-            if reply_id in message_lookup:
-                replied_msg = message_lookup[reply_id]
-                replied_user = (
-                    replied_msg.get("first_name") or
-                    replied_msg.get("username") or
-                    f"User{replied_msg.get('user_id', 'Unknown')}"
-                )
-                replied_text = replied_msg.get("message_text", "")
-
-                # Truncate long replied messages for context
-                if len(replied_text) > 100:
-                    replied_text = replied_text[:100] + "..."
-
-                formatted_message = (
-                    f"{timestamp_str}{user_name} "
-                    f"(replying to {replied_user}: \"{replied_text}\"): {message_text}"
-                )
-            else:
-                # Fallback if we can't resolve the reply
-                formatted_message = (
-                    f"{timestamp_str}{user_name} "
-                    f"(replying to message #{reply_id}): {message_text}"
-                )
+    formatted = [format_message(message) for message in recent_messages]
+    # Message IDs of this window, to resolve replies
+    by_id = {
+        message["telegram_message_id"]: entry
+        for message, entry in zip(recent_messages, formatted)
+    }
+
+    lines = []
+    for message, entry in zip(recent_messages, formatted):
+        reply_id = message.get("telegram_reply_to_message_id")
+        if not reply_id:
+            lines.append(entry.line)
+            continue
+        replied = by_id.get(reply_id)
+        if replied is not None:
+            lines.append(
+                f"{entry.prefix} "
+                f"(replying to {replied.user_name}: \"{replied.reply_context}\"): {entry.text}"
+            )
         else:
-            formatted_message = f"{timestamp_str}{user_name}: {message_text}"
-
-        formatted_messages.append(formatted_message)
+            # Fallback if we can't resolve the reply
+            lines.append(f"{entry.prefix} (replying to message #{reply_id}): {entry.text}")
 
     # Add conversation metadata
-    total_messages = len(formatted_messages)
-    unique_users = len(set(
-        msg.get("first_name") or msg.get("username") or f"User{msg.get('user_id', 'Unknown')}"
-        for msg in recent_messages
-    ))
+    total_messages = len(lines)
+    unique_users = len({entry.user_name for entry in formatted})
 
     # Create the formatted output with context header
-    result = f"=== CONVERSATION CONTEXT ===\n"
-    result += f"Total messages: {total_messages}\n"
-    result += f"Participants: {unique_users}\n"
-    result += f"=== MESSAGES ===\n\n"
-    result += "\n".join(formatted_messages)
-
-    logging.info(f"Formatted conversation: {len(result)} chars, {total_messages} messages, {unique_users} participants")
+    result = (
+        "=== CONVERSATION CONTEXT ===\n"
+        f"Total messages: {total_messages}\n"
+        f"Participants: {unique_users}\n"
+        "=== MESSAGES ===\n\n"
+    ) + "\n".join(lines)
+
+    logger.info(
+        "Formatted conversation: %d chars, %d messages, %d participants",
+        len(result), total_messages, unique_users,
+    )
     return result
 
 
+def append_model_info(text: str) -> str:
+    """Add the model that generated the text to its end, if known.
+
+    The model comes from the current usage scope, so concurrent summaries
+    each report their own.
+    """
+    from bot.services.usage_service import current_model
+
+    model = current_model()
+    if model:
+        return f"{text}\n\n_Generado con {model}_"
+    return text
+
+
 async def send_long_message(update: Update, text: str) -> None:
     """Split and send long messages respecting Telegram's limits with Markdown formatting
 
     This function maintains backward compatibility with the existing interface
     while leveraging the improved message_service functionality.
     """
-    from bot.services.openai_service import openai_service
-    
     chat_id = update.effective_chat.id
-    
-    # Add model info to the end of the message if available
-    if hasattr(openai_service, 'last_used_model') and openai_service.last_used_model:
-        text = f"{text}\n\n_Generado con {openai_service.last_used_model}_"
+    text = append_model_info(text)
 
-    # Use the improved message_service with Markdown support
+    # message_service splits on paragraph/sentence boundaries and sanitizes Markdown,
+    # so every part goes out in a single request
     success = await message_service.send_message(chat_id, text, parse_mode="Markdown")
 
     if not success:
-        # Fallback to basic reply if message_service fails
-        logging.warning(f"Message service failed for chat {chat_id}, using fallback")
-        try:
-            chunks = [
-                text[i : i + MessageLimit.MAX_TEXT_LENGTH]
-                for i in range(0, len(text), MessageLimit.MAX_TEXT_LENGTH)
-            ]
-
-            for chunk in chunks:
-                await update.message.reply_text(chunk, parse_mode="Markdown")
-                if len(chunks) > 1:
-                    await asyncio.sleep(PAUSE_BETWEEN_CHUNKS)
-        except Exception as e:
-            logging.error(f"Fallback also failed for chat {chat_id}: {e}")
-            # If Markdown fails, try without formatting
-            try:
-                for chunk in chunks:
-                    await update.message.reply_text(chunk)
-                    if len(chunks) > 1:
-                        await asyncio.sleep(PAUSE_BETWEEN_CHUNKS)
-            except Exception as e2:
-                logging.error(f"Plain text fallback also failed for chat {chat_id}: {e2}")
-                raise
+        raise RuntimeError(f"Could not send message to chat {chat_id}")
@@ -1,15 +1,61 @@
 # bot/utils/logger.py
 
+import atexit
+import json
 import logging
+import queue
 import sys
 import os
+from datetime import datetime, timezone
 
 # ¡Importante! Añadir TimedRotatingFileHandler
-from logging.handlers import TimedRotatingFileHandler
-from typing import Dict
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors (LOG_FORMAT=json)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves the formatting to the listener thread.
+
+    The stock prepare() formats the whole record (traceback included) in
+    the caller's thread so it can be pickled; the queue here never leaves
+    the process, so only the message arguments are merged (they may be
+    mutated after the call) and exceptions are rendered by the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
 class Logger:
     _instance = None
@@ -24,6 +70,7 @@ class Logger:
             cls._instance.log_format = "%(asctime)s - %(name)s - %(levelname)s - [%(name)s:%(lineno)d] - %(funcName)s() - %(message)s"
             # Ya no necesitamos max_file_size, pero sí backup_count
             cls._instance.backup_count = 7  # 7 días de historial
+            cls._instance._listener: Optional[QueueListener] = None
             cls._instance._init_logger()
         return cls._instance
 
@@ -34,17 +81,24 @@ class Logger:
             self.log_dir.mkdir(parents=True, exist_ok=True)
             log_level_name = os.getenv("LOG_LEVEL", "INFO").upper()
             self.log_level = getattr(logging, log_level_name, logging.INFO)
+            log_format_name = os.getenv("LOG_FORMAT", "text").lower()
+            formatter = (
+                JsonFormatter()
+                if log_format_name == "json"
+                else logging.Formatter(self.log_format)
+            )
 
             root_logger = logging.getLogger()
             root_logger.setLevel(self.log_level)
 
+            # main() re-initializes after loading .env: close the previous listener and files
+            self.shutdown()
             if root_logger.hasHandlers():
                 root_logger.handlers.clear()
 
             # 1. Handler para la consola (sin cambios)
             console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setFormatter(logging.Formatter(self.log_format))
-            root_logger.addHandler(console_handler)
+            console_handler.setFormatter(formatter)
 
             # 2. Handler de archivo principal (bot.log) con rotación diaria
             main_file_handler = TimedRotatingFileHandler(
@@ -54,8 +108,7 @@ class Logger:
                 backupCount=self.backup_count,  # Mantiene 7 archivos de log antiguos (bot.log.2023-10-26, etc.)
                 encoding="utf-8",
             )
-            main_file_handler.setFormatter(logging.Formatter(self.log_format))
-            root_logger.addHandler(main_file_handler)
+            main_file_handler.setFormatter(formatter)
 
             # 3. Handler de archivo para errores (errors.log) con rotación diaria
             error_file_handler = TimedRotatingFileHandler(
@@ -66,8 +119,21 @@ class Logger:
                 encoding="utf-8",
             )
             error_file_handler.setLevel(logging.ERROR)  # Solo captura ERROR y CRITICAL
-            error_file_handler.setFormatter(logging.Formatter(self.log_format))
-            root_logger.addHandler(error_file_handler)
+            error_file_handler.setFormatter(formatter)
+
+            # Los handlers escriben desde un hilo propio: el event loop solo encola el record
+            log_queue = queue.SimpleQueue()
+            self._listener = QueueListener(
+                log_queue,
+                console_handler,
+                main_file_handler,
+                error_file_handler,
+                respect_handler_level=True,
+            )
+            self._listener.start()
+            atexit.unregister(self.shutdown)
+            atexit.register(self.shutdown)
+            root_logger.addHandler(_DeferredQueueHandler(log_queue))
 
             # Silenciar librerías externas
             logging.getLogger("apscheduler").setLevel(logging.WARNING)
@@ -75,7 +141,7 @@ class Logger:
             logging.getLogger("httpx").setLevel(logging.WARNING)
 
             root_logger.info("=== DAILY-ROTATING LOGGING SYSTEM INITIALIZED ===")
-            root_logger.info(f"Log level set to: {log_level_name}")
+            root_logger.info(f"Log level set to: {log_level_name}, format: {log_format_name}")
             root_logger.info(
                 f"Logs will be rotated daily at midnight. Keeping {self.backup_count} days of history."
             )
@@ -88,6 +154,14 @@ class Logger:
                 f"Error initializing file-based logger: {e}. Falling back to console logging."
             )
 
+    def shutdown(self) -> None:
+        """Write out the queued records and stop the logging thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
     def get_logger(self, name: str) -> logging.Logger:
         """Gets a logger instance. Configuration is inherited from the root."""
         if name not in self._loggers:
@@ -0,0 +1,148 @@
+# bot/utils/markdown_utils.py
+"""
+Splitting and sanitizing text for Telegram's legacy Markdown parse mode.
+
+The scanner follows the Bot API rules for parse_mode="Markdown": *bold*,
+_italic_, `code`, ```pre``` and [text](url); entities do not nest, their
+content is taken literally up to the closing marker, and '_', '*', '`' and
+'[' outside an entity can be escaped with a backslash. Any marker that would
+not form a complete entity is escaped, so Telegram never answers
+"can't parse entities" and each chunk goes out in a single request.
+"""
+
+import bisect
+import re
+from typing import List, Optional, Tuple
+
+_MARKERS = "_*`["
+_SENTENCE_END_RE = re.compile(r"[.!?…][)\"'»]*\s+")
+
+# (separator regex, minimum fill ratio of the chunk before accepting it)
+_BOUNDARIES = (
+    (re.compile(r"\n\s*\n"), 0.3),  # Paragraph
+    (re.compile(r"\n"), 0.5),  # Line
+    (_SENTENCE_END_RE, 0.5),  # Sentence
+    (re.compile(r"\s+"), 0.7),  # Word
+)
+
+
+def _entity_end(text: str, i: int) -> Optional[int]:
+    """Return the index just past the entity starting at text[i], or None."""
+    c = text[i]
+    if text.startswith("```", i):
+        close = text.find("```", i + 3)
+        return None if close == -1 else close + 3
+    if c == "[":
+        close = text.find("]", i + 1)
+        if close == -1 or not text.startswith("(", close + 1):
+            return None
+        url_end = text.find(")", close + 2)
+        if url_end == -1 or url_end == close + 2:
+            return None
+        return url_end + 1
+    close = text.find(c, i + 1)
+    return None if close == -1 else close + 1
+
+
+def entity_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of every well-formed Markdown entity in text."""
+    spans = []
+    i = 0
+    length = len(text)
+    while i < length:
+        c = text[i]
+        if c == "\\" and i + 1 < length and text[i + 1] in _MARKERS:
+            i += 2
+            continue
+        if c in _MARKERS:
+            end = _entity_end(text, i)
+            if end is not None:
+                spans.append((i, end))
+                i = end
+                continue
+        i += 1
+    return spans
+
+
+def sanitize_markdown(text: str) -> str:
+    """Escape every marker that does not open a complete entity."""
+    result = []
+    i = 0
+    length = len(text)
+    while i < length:
+        c = text[i]
+        if c == "\\" and i + 1 < length and text[i + 1] in _MARKERS:
+            result.append(text[i:i + 2])
+            i += 2
+            continue
+        if c in _MARKERS:
+            end = _entity_end(text, i)
+            if end is not None:
+                result.append(text[i:end])
+                i = end
+                continue
+            result.append("\\" + c)
+            i += 1
+            continue
+        result.append(c)
+        i += 1
+    return "".join(result)
+
+
+def _inside_span(position: int, spans: List[Tuple[int, int]]) -> bool:
+    # Spans are sorted and disjoint: only the last one starting before position matters
+    index = bisect.bisect_left(spans, (position,)) - 1
+    return index >= 0 and spans[index][0] < position < spans[index][1]
+
+
+def _find_boundary(text: str, start: int, limit: int, spans: List[Tuple[int, int]]) -> int:
+    """Best cut position in text[start:start + limit] that is not inside an entity."""
+    window_end = start + limit
+    for separator, min_fill in _BOUNDARIES:
+        best = None
+        for match in separator.finditer(text, start, window_end):
+            cut = match.end()
+            if cut - start >= limit * min_fill and not _inside_span(cut, spans):
+                best = cut
+        if best is not None:
+            return best
+    # Nothing better: hard cut, still avoiding entities when possible
+    for cut in range(window_end, start + limit // 2, -1):
+        if not _inside_span(cut, spans):
+            return cut
+    return window_end
+
+
+def split_message(text: str, limit: int, parse_mode: Optional[str] = None) -> List[str]:
+    """Split text on paragraph, line, sentence and word boundaries.
+
+    With parse_mode="Markdown" cuts avoid well-formed entities and every
+    chunk is sanitized, so it can be sent as-is. Escaping adds characters,
+    so a chunk is measured after sanitizing and cut shorter if needed.
+    """
+    is_markdown = (parse_mode or "").lower() == "markdown"
+    spans = entity_spans(text) if is_markdown else []
+    chunks = []
+    start = 0
+    while start < len(text):
+        window = limit
+        while True:
+            if len(text) - start <= window:
+                cut = len(text)
+            else:
+                cut = _find_boundary(text, start, window, spans)
+            chunk = text[start:cut].strip()
+            if is_markdown:
+                chunk = sanitize_markdown(chunk)
+            if len(chunk) <= limit or window <= 1:
+                break
+            window = max(1, window - (len(chunk) - limit))
+        if chunk:
+            chunks.append(chunk)
+        start = cut
+    return chunks
+
+
+def strip_markdown_escapes(text: str) -> str:
+    """Undo the escapes added by sanitize_markdown, for sending as plain text."""
+    return re.sub(r"\\([_*`\[])", r"\1", text)
@@ -1,6 +1,20 @@
 import logging
 import asyncio
 import os
+import re
+from typing import List, Optional, Tuple
+from bot.utils.constants import (
+    VAD_NOISE_THRESHOLD_DB,
+    VAD_MIN_SILENCE_SECONDS,
+    VAD_PADDING_SECONDS,
+    VAD_MIN_SAVED_RATIO,
+    VAD_MAX_SEGMENTS,
+)
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_PROGRESS_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+_SILENCE_START_RE = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end: (-?\d+(?:\.\d+)?)")
 
 
 def get_file_size(file_path):
@@ -102,3 +116,240 @@ async def extract_audio(input_path, output_path, timeout: int = 300):
     except Exception as e:
         logging.error(f"Error in extract_audio: {str(e)}")
         raise
+
+
+class SpeechTimeline:
+    """Map between the trimmed (speech-only) audio and the original timeline.
+
+    Segments are (start, end) pairs in seconds of the original audio, in the
+    same order they were concatenated into the trimmed file. Times in the
+    trimmed audio (e.g. Whisper segment times) are translated back with
+    to_original(), skipping over the silences that were cut:
+
+    >>> timeline = SpeechTimeline([(2.0, 5.0), (10.0, 12.0)], 15.0)
+    >>> timeline.to_original(1.0), timeline.to_original(3.0), timeline.to_original(4.0)
+    (3.0, 5.0, 11.0)
+    >>> timeline.to_original_segments([(2.5, 4.5)])
+    [(4.5, 11.5)]
+    >>> timeline.to_original(9.0), timeline.removed_seconds
+    (12.0, 10.0)
+    """
+
+    def __init__(self, segments: List[Tuple[float, float]], original_duration: float):
+        self.segments = segments
+        self.original_duration = original_duration
+        # Where each segment starts in the trimmed audio
+        self._offsets = []
+        offset = 0.0
+        for start, end in segments:
+            self._offsets.append(offset)
+            offset += end - start
+        self.speech_duration = offset
+
+    @property
+    def removed_seconds(self) -> float:
+        return max(self.original_duration - self.speech_duration, 0.0)
+
+    def to_original(self, trimmed_seconds: float) -> float:
+        """Translate a time in the trimmed audio to the original audio.
+
+        A time on the joint between two segments maps to the end of the
+        earlier one; times past the trimmed audio map to the last speech end.
+        """
+        if not self.segments:
+            return trimmed_seconds
+        for (start, end), offset in zip(self.segments, self._offsets):
+            if trimmed_seconds <= offset + (end - start):
+                return start + max(trimmed_seconds - offset, 0.0)
+        return self.segments[-1][1]
+
+    def to_original_segments(
+        self, segments: List[Tuple[float, float]]
+    ) -> List[Tuple[float, float]]:
+        """Translate (start, end) pairs of the trimmed audio to the original audio."""
+        return [(self.to_original(start), self.to_original(end)) for start, end in segments]
+
+
+async def _run_ffmpeg(cmd: List[str], timeout: int, action: str) -> str:
+    """Run ffmpeg and return its stderr, raising on timeout or failure."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        raise TimeoutError(f"{action} timed out after {timeout} seconds")
+
+    stderr_text = stderr.decode(errors="replace")
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed with error: {stderr_text}")
+    return stderr_text
+
+
+def _hms_to_seconds(match) -> float:
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+async def detect_speech_segments(
+    input_path, timeout: int = 300
+) -> Tuple[List[Tuple[float, float]], float]:
+    """Detect speech regions locally with ffmpeg's silencedetect filter.
+
+    Returns:
+        Tuple of (speech segments in seconds, total duration in seconds)
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-i",
+        input_path,
+        "-af",
+        f"silencedetect=noise={VAD_NOISE_THRESHOLD_DB}dB:d={VAD_MIN_SILENCE_SECONDS}",
+        "-f",
+        "null",
+        "-",
+    ]
+    stderr_text = await _run_ffmpeg(cmd, timeout, "Speech detection")
+
+    duration = 0.0
+    duration_match = _DURATION_RE.search(stderr_text)
+    if duration_match:
+        duration = _hms_to_seconds(duration_match)
+    progress_matches = list(_PROGRESS_TIME_RE.finditer(stderr_text))
+    if progress_matches:
+        # El contenedor puede no declarar duración (p. ej. notas de voz OGG)
+        duration = max(duration, _hms_to_seconds(progress_matches[-1]))
+
+    silences = []
+    silence_start = None
+    for line in stderr_text.splitlines():
+        start_match = _SILENCE_START_RE.search(line)
+        if start_match:
+            silence_start = max(float(start_match.group(1)), 0.0)
+            continue
+        end_match = _SILENCE_END_RE.search(line)
+        if end_match and silence_start is not None:
+            silences.append((silence_start, float(end_match.group(1))))
+            silence_start = None
+    if silence_start is not None:
+        # Silencio que llega hasta el final del audio
+        silences.append((silence_start, duration))
+
+    segments = []
+    cursor = 0.0
+    for silence_begin, silence_end in silences:
+        if silence_begin > cursor:
+            segments.append((cursor, silence_begin))
+        cursor = max(cursor, silence_end)
+    if cursor < duration:
+        segments.append((cursor, duration))
+
+    # Add padding around speech and merge regions that now overlap
+    padded = []
+    for start, end in segments:
+        start = max(start - VAD_PADDING_SECONDS, 0.0)
+        end = min(end + VAD_PADDING_SECONDS, duration) if duration else end
+        if end - start < 0.1:
+            continue
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], max(padded[-1][1], end))
+        else:
+            padded.append((start, end))
+
+    return padded, duration
+
+
+async def trim_to_speech(
+    input_path, output_path, timeout: int = 300
+) -> Optional[SpeechTimeline]:
+    """Write only the speech regions of input_path into output_path (WAV PCM).
+
+    Returns:
+        SpeechTimeline describing the trimmed audio, or None when trimming
+        is not worth it and the original file should be used unchanged.
+        Audio where no speech is detected is also left unchanged: VAD often
+        misses speech over music or noise, so Whisper gets the full audio.
+    """
+    try:
+        segments, duration = await detect_speech_segments(input_path, timeout)
+        if duration <= 0:
+            logging.info("VAD skipped: could not determine audio duration")
+            return None
+
+        if not segments:
+            logging.info(f"VAD found no speech in {duration:.1f}s of audio, using full audio")
+            return None
+
+        timeline = SpeechTimeline(segments, duration)
+
+        saved_ratio = timeline.removed_seconds / duration
+        if saved_ratio < VAD_MIN_SAVED_RATIO or len(segments) > VAD_MAX_SEGMENTS:
+            logging.info(
+                f"VAD skipped: {len(segments)} segments, only {saved_ratio:.1%} silence"
+            )
+            return None
+
+        selection = "+".join(
+            f"between(t,{start:.3f},{end:.3f})" for start, end in segments
+        )
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i",
+            input_path,
+            "-vn",
+            "-af",
+            f"aselect='{selection}',asetpts=N/SR/TB",
+            "-acodec",
+            "pcm_s16le",
+            "-ac",
+            "1",
+            "-ar",
+            "16000",
+            output_path,
+        ]
+        await _run_ffmpeg(cmd, timeout, "Speech trimming")
+
+        logging.info(
+            f"VAD kept {timeline.speech_duration:.1f}s of {duration:.1f}s "
+            f"({len(segments)} segments, {saved_ratio:.1%} removed)"
+        )
+        return timeline
+
+    except Exception as e:
+        logging.error(f"Error in trim_to_speech: {str(e)}")
+        raise
+
+
+async def remove_silences(input_path, output_path) -> Optional[SpeechTimeline]:
+    """VAD pre-pass used by the media handlers.
+
+    Never fails: if speech detection breaks, the caller simply transcribes
+    the untouched audio.
+    """
+    try:
+        timeline = await trim_to_speech(input_path, output_path)
+        if timeline is not None:
+            logging.info(
+                f"VAD removed {timeline.removed_seconds:.1f}s of silence, "
+                f"output size: {get_file_size(output_path)}"
+            )
+        return timeline
+    except Exception as e:
+        logging.warning(f"VAD pre-pass failed, using full audio: {e}")
+        return None
+
+
+def log_speech_times(
+    timeline: Optional[SpeechTimeline], segments: List[Tuple[float, float]]
+) -> None:
+    """Log where the transcribed speech lies in the original audio."""
+    if timeline is None or not segments:
+        return
+    original = timeline.to_original_segments(segments)
+    logging.info(
+        f"Transcribed {len(original)} segments spanning {original[0][0]:.1f}s-"
+        f"{original[-1][1]:.1f}s of the original {timeline.original_duration:.1f}s audio"
+    )
@@ -0,0 +1,159 @@
+# bot/utils/progress_reporter.py
+"""
+Progress feedback for long operations, shown by editing a single wait message.
+
+Stages are events: stage() returns immediately and the edit happens in a
+background task. Edits are coalesced so the message changes at most once per
+interval; a stage that is replaced before its turn is simply never shown.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from telegram import Message
+from telegram.error import TelegramError
+from bot.config import config
+from bot.constants import PROGRESS_MESSAGES
+from bot.services.message_service import message_service
+from bot.services.metrics_service import metrics_service
+from bot.utils.logger import logger
+
+logger = logger.get_logger(__name__)
+
+# Stage name -> [count, total seconds, max seconds], across all reporters
+_stage_stats: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+_edit_stats = {"edits": 0, "coalesced_stages": 0}
+
+
+def get_progress_metrics() -> Dict[str, float]:
+    metrics: Dict[str, float] = dict(_edit_stats)
+    for stage, (count, total, maximum) in sorted(_stage_stats.items()):
+        key = stage.lower()
+        metrics[f"{key}_count"] = count
+        metrics[f"{key}_avg_seconds"] = round(total / count, 2) if count else 0.0
+        metrics[f"{key}_max_seconds"] = round(maximum, 2)
+    return metrics
+
+
+metrics_service.register_source("progress", get_progress_metrics)
+
+
+class ProgressReporter:
+    """Reports the stages of one operation through its wait message.
+
+    Usage:
+        progress = ProgressReporter(wait_message)
+        progress.stage("DOWNLOADING")       # never blocks
+        ...
+        await progress.finish(summary)      # replaces the wait message
+    """
+
+    def __init__(self, message: Message, min_interval: Optional[float] = None):
+        self.message = message
+        self.min_interval = (
+            config.PROGRESS_EDIT_INTERVAL_SECONDS if min_interval is None else min_interval
+        )
+        self.timings: Dict[str, float] = {}
+        self._started_at = time.monotonic()
+        self._last_edit_at = self._started_at  # Sending the wait message counts as an edit
+        self._shown_text = message.text
+        self._pending_text: Optional[str] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stage: Optional[str] = None
+        self._stage_started_at = self._started_at
+        self._closed = False
+        self._followers: List["ProgressReporter"] = []
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        return self._stage
+
+    def add_follower(self, reporter: "ProgressReporter") -> None:
+        """Mirror this reporter's stages on another one (a request sharing the work)."""
+        self._followers.append(reporter)
+        if self._stage is not None:
+            reporter.stage(self._stage)
+
+    def stage(self, key: str) -> None:
+        """Enter a new stage (a PROGRESS_MESSAGES key). Returns immediately."""
+        for follower in self._followers:
+            follower.stage(key)
+        if self._closed or key == self._stage:
+            return
+        self._end_stage()
+        self._stage = key
+        self._stage_started_at = time.monotonic()
+
+        if self._pending_text is not None:
+            _edit_stats["coalesced_stages"] += 1
+        self._pending_text = PROGRESS_MESSAGES.get(key, key)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def finish(self, text: str, parse_mode: Optional[str] = "Markdown") -> bool:
+        """Replace the wait message with the final result.
+
+        Returns:
+            True if the whole text was delivered, False otherwise
+        """
+        await self._close()
+        return await message_service.replace_message(self.message, text, parse_mode)
+
+    async def fail(self, text: str) -> None:
+        """Replace the wait message with an error text (plain, no parse mode)."""
+        await self._close()
+        try:
+            await self.message.edit_text(text)
+        except TelegramError as e:
+            logger.warning(f"Could not show error in wait message: {e}")
+
+    async def _close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._end_stage()
+        self.timings["TOTAL"] = time.monotonic() - self._started_at
+        self._record(self.timings)
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+    def _end_stage(self) -> None:
+        if self._stage is None:
+            return
+        elapsed = time.monotonic() - self._stage_started_at
+        self.timings[self._stage] = self.timings.get(self._stage, 0.0) + elapsed
+
+    @staticmethod
+    def _record(timings: Dict[str, float]) -> None:
+        for stage, seconds in timings.items():
+            stats = _stage_stats[stage]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        logger.debug(
+            "Progress timings: "
+            + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+        )
+
+    async def _flush(self) -> None:
+        """Apply the latest pending stage, waiting out the edit interval first."""
+        while self._pending_text is not None:
+            wait = self._last_edit_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)  # Runs in its own task; the operation keeps going
+
+            text, self._pending_text = self._pending_text, None
+            if text is None or text == self._shown_text:
+                continue
+            try:
+                await self.message.edit_text(text)
+                self._shown_text = text
+                _edit_stats["edits"] += 1
+            except TelegramError as e:
+                logger.debug(f"Could not update progress message: {e}")
+            self._last_edit_at = time.monotonic()
@@ -0,0 +1,55 @@
+# bot/utils/rate_limit_utils.py
+"""
+Rate limiting primitives. Like cache_utils, these are plain in-memory
+structures meant to be used from the event loop thread.
+"""
+
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0  # Set by server-side backoff (e.g. RetryAfter)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def delay(self, now: Optional[float] = None, tokens: float = 1) -> float:
+        """Seconds until `tokens` can be consumed (0 if available right now)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < tokens:
+            wait = max(wait, (tokens - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, now: Optional[float] = None, tokens: float = 1) -> bool:
+        """Take tokens if available; returns False without consuming otherwise."""
+        now = time.monotonic() if now is None else now
+        if self.delay(now, tokens) > 0:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def block_for(self, seconds: float) -> None:
+        """Refuse tokens for `seconds`; afterwards only one request may go at once."""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = min(1, self.capacity)
+        self.updated_at = self.blocked_until  # No refill while blocked
+
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        """True when the bucket is full again and can be discarded."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
@@ -0,0 +1,8 @@
+"""
+Entry points for the process pools (see bot/utils/executors.py).
+
+Pool workers are spawned, so they import the module of the function they
+run. These modules live outside the bot package and import nothing from it:
+importing bot would load the whole application in every worker, including
+the log queue listener and its rotating file handlers.
+"""
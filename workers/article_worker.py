@@ -0,0 +1,28 @@
+# workers/article_worker.py
+import logging
+from typing import Optional
+from readability import parse
+
+logger = logging.getLogger(__name__)
+
+
+def extract_article(html: str) -> Optional[str]:
+    """Run readability on the HTML (executed in the parse process pool).
+
+    readability drives a JS engine that only works on a process main thread,
+    so it cannot go to a thread pool.
+    """
+    article = parse(html)
+
+    # Get title and content
+    article_title = article.title or "Sin título"
+    article_content = article.text_content or article.content or ""
+
+    logger.debug(f"Article title: '{article_title}' (length: {len(article_title)})")
+    logger.debug(f"Article content length: {len(article_content)} chars")
+
+    if not article_content.strip():
+        return None
+
+    # Format content for summarization
+    return f"Title: {article_title}\n\nContent: {article_content}"
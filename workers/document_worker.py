@@ -0,0 +1,151 @@
+# workers/document_worker.py
+"""
+Text extraction for PDF, DOCX and TXT documents, run in the "documents"
+process pool (see bot/utils/document_utils.py).
+
+Each function receives a file path, maps it read-only and parses straight
+from the mapping through a memoryview, so the document is never copied
+into Python bytes.
+"""
+
+import io
+import logging
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+import PyPDF2
+from docx import Document
+
+logger = logging.getLogger(__name__)
+
+
+class _MemoryViewReader(io.RawIOBase):
+    """Seekable raw reader over a memoryview (readinto copies only what is asked)."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        chunk = self._view[self._pos:self._pos + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self._pos += size
+        return size
+
+    def close(self) -> None:
+        self._view = None
+        super().close()
+
+
+@contextmanager
+def _mapped_reader(path: str) -> Iterator[io.BufferedReader]:
+    """Open a file as a buffered, seekable stream backed by mmap."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BufferedReader(_MemoryViewReader(memoryview(b"")))
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            reader = io.BufferedReader(_MemoryViewReader(view))
+            try:
+                yield reader
+            finally:
+                # Every export of the mapping must be released before it closes
+                reader.close()
+                view.release()
+
+
+def count_pdf_pages_sync(path: str) -> int:
+    with _mapped_reader(path) as stream:
+        return len(PyPDF2.PdfReader(stream).pages)
+
+
+def extract_pdf_pages_sync(
+    path: str, start: int, end: int, char_budget: Optional[int] = None
+) -> List[Tuple[int, str]]:
+    """Extract pages [start, end) of a PDF, stopping once char_budget is reached."""
+    pages = []
+    extracted_chars = 0
+    with _mapped_reader(path) as stream:
+        reader = PyPDF2.PdfReader(stream)
+        for page_num in range(start, min(end, len(reader.pages))):
+            try:
+                page_text = reader.pages[page_num].extract_text() or ""
+            except Exception as e:
+                logger.warning(f"Error al procesar página {page_num + 1}: {e}")
+                continue
+            pages.append((page_num, page_text))
+            extracted_chars += len(page_text)
+            if char_budget is not None and extracted_chars >= char_budget:
+                break
+    return pages
+
+
+def extract_docx_text_sync(path: str, char_budget: Optional[int] = None) -> Tuple[str, bool]:
+    """Extract paragraphs and table rows from a DOCX file.
+
+    Returns:
+        Tuple of (text, whether char_budget stopped the extraction early)
+    """
+    text_content = []
+    extracted_chars = 0
+    with _mapped_reader(path) as stream:
+        doc = Document(stream)
+
+        # Procesar párrafos
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                text_content.append(paragraph.text)
+                extracted_chars += len(paragraph.text)
+            if char_budget is not None and extracted_chars >= char_budget:
+                return "\n\n".join(text_content), True
+
+        # Procesar tablas
+        for i, table in enumerate(doc.tables):
+            try:
+                for row in table.rows:
+                    row_text = " | ".join(
+                        cell.text.strip() for cell in row.cells if cell.text.strip()
+                    )
+                    if row_text:
+                        text_content.append(row_text)
+                        extracted_chars += len(row_text)
+            except Exception as e:
+                logger.warning(f"Error al procesar tabla {i + 1}: {e}")
+                continue
+            if char_budget is not None and extracted_chars >= char_budget:
+                return "\n\n".join(text_content), i + 1 < len(doc.tables)
+
+    return "\n\n".join(text_content), False
+
+
+def read_text_file_sync(path: str, char_budget: Optional[int] = None) -> Tuple[str, bool]:
+    """Read a text file; returns (text, whether it was cut at char_budget)."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        if char_budget is None:
+            return f.read(), False
+        text = f.read(char_budget + 1)
+    return text[:char_budget], len(text) > char_budget